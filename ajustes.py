@@ -0,0 +1,121 @@
+"""
+Ajustes que se pueden cambiar desde /config sin volver a flashear.
+
+Cada ajuste se declara con (clave, defecto, mínimo, máximo); el tipo del
+valor por defecto decide cómo se valida:
+    bool  -> true/false
+    int   -> entero entre mínimo y máximo
+    list  -> lista de [nombre, pin, pin] (las zonas), pines entre mínimo y máximo
+Además se pueden pedir pares (a, b) que tienen que cumplir a < b, y una
+función comprobar(valores) para lo que depende de varios ajustes o del
+hardware (qué pin sirve para qué): recibe la foto nueva y lanza
+ErrorAjuste si algo no cierra.
+
+`valores` es una foto de los ajustes vigentes: nunca se modifica, se
+reemplaza entera en cada cambio y se incrementa `version`. El JSON de
+GET /config se arma una vez por versión. Se guarda en la flash igual que
+la calibración (temporal + rename), así un corte de luz no deja el
+archivo a medias.
+"""
+import json
+import os
+
+ARCHIVO = 'ajustes.json'
+
+
+class ErrorAjuste(ValueError):
+    pass
+
+
+def _validar(clave, defecto, minimo, maximo, v):
+    if isinstance(defecto, bool):
+        if not isinstance(v, bool):
+            raise ErrorAjuste('%s: se espera true o false' % clave)
+        return v
+    if isinstance(defecto, int):
+        if isinstance(v, bool) or not isinstance(v, int):
+            raise ErrorAjuste('%s: se espera un entero' % clave)
+        if not minimo <= v <= maximo:
+            raise ErrorAjuste('%s: fuera de rango (%d a %d)' % (clave, minimo, maximo))
+        return v
+    # Zonas: [[nombre, pin del sensor, pin del relé], ...]
+    if not isinstance(v, list) or not v:
+        raise ErrorAjuste('%s: se espera una lista no vacía' % clave)
+    zonas = []
+    for z in v:
+        if (not isinstance(z, list) or len(z) != 3 or not isinstance(z[0], str)
+                or not all(isinstance(p, int) and minimo <= p <= maximo for p in z[1:])):
+            raise ErrorAjuste('%s: cada zona es ["nombre", pin_suelo, pin_rele]' % clave)
+        zonas.append((z[0], z[1], z[2]))
+    return zonas
+
+
+class Ajustes:
+    def __init__(self, esquema, orden=(), archivo=ARCHIVO, comprobar=None):
+        self.archivo = archivo
+        self.esquema = {c: (d, mi, ma) for c, d, mi, ma in esquema}
+        self.orden = orden
+        self.comprobar = comprobar
+        self.valores = {c: d for c, d, _, _ in esquema}
+        self.version = 0
+        self._json = None
+        self._version_json = -1
+        self._extra = None
+
+    def cargar(self):
+        """Lee el archivo; si falta o no valida quedan los valores por defecto."""
+        try:
+            with open(self.archivo) as f:
+                datos = json.load(f)
+            self.valores = self.validar(datos['valores'])
+            self.version = int(datos['version'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return self.valores
+
+    def validar(self, cambios):
+        """Devuelve la foto nueva (vigentes + cambios) o lanza ErrorAjuste."""
+        if not isinstance(cambios, dict):
+            raise ErrorAjuste('se espera un objeto JSON')
+        nuevos = dict(self.valores)
+        for clave, v in cambios.items():
+            if clave not in self.esquema:
+                raise ErrorAjuste('%s: ajuste desconocido' % clave)
+            defecto, minimo, maximo = self.esquema[clave]
+            nuevos[clave] = _validar(clave, defecto, minimo, maximo, v)
+        for a, b in self.orden:
+            if nuevos[a] >= nuevos[b]:
+                raise ErrorAjuste('%s tiene que ser menor que %s' % (a, b))
+        if self.comprobar is not None:
+            self.comprobar(nuevos)
+        return nuevos
+
+    def defecto(self, clave):
+        return self.esquema[clave][0]
+
+    def actualizar(self, cambios):
+        """Valida, guarda en la flash y recién ahí reemplaza la foto."""
+        nuevos = self.validar(cambios)
+        if nuevos == self.valores:
+            return self.valores
+        self.guardar(nuevos, self.version + 1)
+        self.valores = nuevos
+        self.version += 1
+        return nuevos
+
+    def guardar(self, valores, version):
+        tmp = self.archivo + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': version, 'valores': valores}, f)
+        os.rename(tmp, self.archivo)
+
+    def json(self, extra=None):
+        """JSON de GET /config (bytes), armado una sola vez por versión."""
+        if self._version_json != self.version or extra != self._extra:
+            datos = {'version': self.version, 'values': self.valores}
+            if extra:
+                datos.update(extra)
+            self._json = json.dumps(datos).encode()
+            self._version_json = self.version
+            self._extra = extra
+        return self._json
@@ -0,0 +1,111 @@
+"""
+Archivos estáticos del dashboard guardados en la flash.
+
+La página ya no se arma con str.format() en cada pedido: se manda tal cual
+está en www/ leyendo bloques de tamaño fijo, así no se reserva un string de
+varios KB por cliente. Los valores en vivo los completa el fetch("/data").
+
+Si existe una copia .gz (generada en la PC con tools/comprimir_assets.py)
+y el navegador acepta gzip, se manda esa copia sin comprimir nada acá.
+"""
+import binascii
+from peticiones import encabezado, responder
+import bitacora
+
+DIR_WWW = 'www'
+TAM_BLOQUE = 512  # bytes leídos de la flash por cada write
+
+# ruta URL -> (archivo en www/, Content-Type)
+RUTAS = {
+    '/': ('index.html', 'text/html; charset=utf-8'),
+    '/index.html': ('index.html', 'text/html; charset=utf-8'),
+}
+
+# Buffer reutilizado para todos los envíos
+_buf = bytearray(TAM_BLOQUE)
+_vista = memoryview(_buf)
+# archivo -> (tamaño, etag), calculado una sola vez al arrancar.
+# None si el archivo no existe (p. ej. no se generó el .gz).
+_info = {}
+
+
+def _calcular_info(nombre):
+    ruta = DIR_WWW + '/' + nombre
+    crc = 0
+    tam = 0
+    with open(ruta, 'rb') as f:
+        while True:
+            n = f.readinto(_buf)
+            if not n:
+                break
+            crc = binascii.crc32(_vista[:n], crc)
+            tam += n
+    return tam, '"%08x-%x"' % (crc & 0xFFFFFFFF, tam)
+
+
+def info(nombre):
+    """
+    Devuelve (tamaño, etag) del archivo, calculándolo la primera vez,
+    o None si el archivo no está en la flash.
+    """
+    if nombre in _info:
+        return _info[nombre]
+    try:
+        datos = _calcular_info(nombre)
+    except OSError:
+        datos = None
+    _info[nombre] = datos
+    return datos
+
+
+def precargar():
+    """Calcula los ETag al arrancar para que el primer pedido no pague la lectura."""
+    for nombre, _ in RUTAS.values():
+        if info(nombre) is None:
+            bitacora.aviso("⚠️ Falta el archivo estático", nombre)
+        info(nombre + '.gz')
+
+
+async def servir(writer, path, if_none_match, accept_encoding='', keep_alive=False):
+    """
+    Envía el archivo asociado a `path`, comprimido si hay copia .gz y el
+    cliente lo acepta (404 si falta en la flash). Devuelve False si la ruta
+    no es un archivo estático.
+    """
+    ruta = RUTAS.get(path)
+    if ruta is None:
+        return False
+    nombre, tipo = ruta
+    encoding = ''
+    datos = None
+    if 'gzip' in accept_encoding:
+        datos = info(nombre + '.gz')
+        if datos is not None:
+            nombre += '.gz'
+            encoding = 'Content-Encoding: gzip\r\n'
+    if datos is None:
+        datos = info(nombre)
+    if datos is None:
+        responder(writer, 404, 'text/plain', 'Falta %s en la flash' % nombre, keep_alive=keep_alive)
+        await writer.drain()
+        return True
+    tam, etag = datos
+
+    # El navegador ya tiene esta versión: no se reenvía el cuerpo
+    if if_none_match == etag:
+        writer.write(encabezado(304, extra='ETag: %s\r\nVary: Accept-Encoding\r\n' % etag,
+                                keep_alive=keep_alive).encode())
+        await writer.drain()
+        return True
+
+    writer.write(encabezado(200, tipo, tam,
+                            '%sETag: %s\r\nVary: Accept-Encoding\r\nCache-Control: no-cache\r\n' % (encoding, etag),
+                            keep_alive).encode())
+    with open(DIR_WWW + '/' + nombre, 'rb') as f:
+        while True:
+            n = f.readinto(_buf)
+            if not n:
+                break
+            writer.write(_vista[:n])
+            await writer.drain()
+    return True
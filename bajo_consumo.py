@@ -0,0 +1,151 @@
+"""
+Modo de bajo consumo para equipos a batería o con panel solar.
+
+En vez de quedar despierto leyendo el suelo cada medio segundo, el
+equipo duerme entre ciclos: se despierta por timer, lee el suelo y el
+DHT11, corre el control de la bomba y vuelve a dormir. El Wi-Fi se
+prende solo uno de cada tantos ciclos (ver riego.py).
+
+Con deepsleep la RAM se pierde y la placa arranca de cero en cada
+despertar. Lo que el control necesita para seguir y las lecturas que
+todavía no pasaron a la flash viajan en la memoria del RTC (2 KB en el
+ESP32; sobrevive al deepsleep pero no a un corte de luz):
+
+    cabecera  '<4sBBHIIII'  'RIEG', versión, zonas, muestras, ciclo,
+                            ms despierto, ms con Wi-Fi, ms dormido
+    por zona  '<BBiiI'      humedad, muestras secas, filtro y ruido del
+                            sensor (x16), último apagado (time.time(), 0 = nunca)
+    consumo   '<iII24I'     ver consumo.Consumo.estado()
+    clima     '<Iff'        ver evapotranspiracion.Evapotranspiracion.estado()
+    muestras  registros de registro.FORMATO (12 bytes) hasta llenar
+
+Los tiempos despierto/Wi-Fi/dormido se acumulan para estimar el ciclo de
+trabajo y la corriente promedio.
+"""
+import struct
+import time
+from registro import FORMATO, TAM_REGISTRO
+
+MAGIA = b'RIEG'
+VERSION = 2
+CABECERA = '<4sBBHIIII'
+ZONA = '<BBiiI'
+CONSUMO = '<iII24I'
+CLIMA = '<Iff'
+TAM_CABECERA = struct.calcsize(CABECERA)
+TAM_ZONA = struct.calcsize(ZONA)
+TAM_CONSUMO = struct.calcsize(CONSUMO)
+TAM_CLIMA = struct.calcsize(CLIMA)
+TAM_RTC = 2048
+MAX_ACUMULADO = 0x7FFFFFFF  # al pasarlo se dividen a la mitad los tres tiempos
+MAX_APAGADA_S = 86400  # tope de min_off_ms en riego.AJUSTES (un día)
+
+
+class EstadoRTC:
+    def __init__(self, zonas=1):
+        self.zonas = zonas
+        self._muestras_desde = TAM_CABECERA + zonas * TAM_ZONA + TAM_CONSUMO + TAM_CLIMA
+        self.capacidad = (TAM_RTC - self._muestras_desde) // TAM_REGISTRO
+        self._buf = bytearray(self._muestras_desde + self.capacidad * TAM_REGISTRO)
+        self.muestras = 0
+        self.ciclo = 0
+        self.despierto_ms = 0
+        self.wifi_ms = 0
+        self.dormido_ms = 0
+
+    def cargar(self, memoria, zonas_riego, consumo, et):
+        """
+        Restaura el estado guardado por guardar(). Devuelve False si no
+        hay nada válido (arranque en frío, corte de luz u otra versión).
+        """
+        if len(memoria) < TAM_CABECERA:
+            return False
+        (magia, version, zonas, muestras, self.ciclo, self.despierto_ms, self.wifi_ms,
+         self.dormido_ms) = struct.unpack_from(CABECERA, memoria)
+        if (magia != MAGIA or version != VERSION or zonas != self.zonas
+                or len(memoria) < self._muestras_desde + muestras * TAM_REGISTRO):
+            self.ciclo = self.despierto_ms = self.wifi_ms = self.dormido_ms = 0
+            return False
+        n = min(len(memoria), len(self._buf))
+        self._buf[:n] = memoria[:n]
+        self.muestras = muestras
+        ahora = time.time()
+        i = TAM_CABECERA
+        for zona in zonas_riego:
+            humedad, zona.muestras_secas, filtrado, ruido, apagada = struct.unpack_from(ZONA, memoria, i)
+            zona.humedad = humedad
+            zona.sensor.restaurar(filtrado, ruido)
+            if apagada and 0 <= ahora - apagada < MAX_APAGADA_S:
+                # Los ticks vuelven a 0 en cada despertar: se rearma desde la hora del RTC.
+                # Más viejo ya cumplió cualquier MIN_TIEMPO_APAGADA (y no entra en ticks_add)
+                zona.apagada = time.ticks_add(time.ticks_ms(), -1000 * (ahora - apagada))
+            i += TAM_ZONA
+        valores = struct.unpack_from(CONSUMO, memoria, i)
+        consumo.restaurar(valores[0], valores[1], valores[2], valores[3:])
+        et.restaurar(*struct.unpack_from(CLIMA, memoria, i + TAM_CONSUMO))
+        return True
+
+    def guardar(self, zonas_riego, consumo, et):
+        """Arma el contenido para RTC().memory() (se copia, no se reserva nada grande)."""
+        struct.pack_into(CABECERA, self._buf, 0, MAGIA, VERSION, self.zonas, self.muestras,
+                         self.ciclo, self.despierto_ms, self.wifi_ms, self.dormido_ms)
+        ahora = time.time()
+        i = TAM_CABECERA
+        for zona in zonas_riego:
+            apagada = 0
+            if zona.apagada is not None:
+                apagada = ahora - time.ticks_diff(time.ticks_ms(), zona.apagada) // 1000
+            filtrado, ruido = zona.sensor.estado()
+            struct.pack_into(ZONA, self._buf, i, min(max(zona.humedad, 0), 255),
+                             min(zona.muestras_secas, 255), filtrado, ruido, apagada)
+            i += TAM_ZONA
+        hora, total, ultimo, horas = consumo.estado()
+        struct.pack_into(CONSUMO, self._buf, i, hora, total, ultimo, *horas)
+        struct.pack_into(CLIMA, self._buf, i + TAM_CONSUMO, *et.estado())
+        return memoryview(self._buf)[:self._muestras_desde + self.muestras * TAM_REGISTRO]
+
+    def agregar(self, t, tipo, suelo=0, temp=None, hum=None, extra=0):
+        """Mismos argumentos que registro.Registro.agregar. False si está lleno."""
+        if self.muestras == self.capacidad:
+            return False
+        struct.pack_into(FORMATO, self._buf, self._muestras_desde + self.muestras * TAM_REGISTRO,
+                         t, tipo, suelo,
+                         -32768 if temp is None else temp,
+                         -32768 if hum is None else hum,
+                         min(extra, 0xFFFF))
+        self.muestras += 1
+        return True
+
+    def registros(self):
+        """(t, tipo, suelo, temp, hum, extra) de cada muestra guardada, en orden."""
+        for k in range(self.muestras):
+            yield struct.unpack_from(FORMATO, self._buf, self._muestras_desde + k * TAM_REGISTRO)
+
+    def vaciar(self):
+        self.muestras = 0
+
+    def sumar(self, despierto, wifi, dormido):
+        """Acumula los ms de un ciclo en cada estado."""
+        self.despierto_ms += despierto
+        self.wifi_ms += wifi
+        self.dormido_ms += dormido
+        # Solo importa la proporción: al acercarse al tope se escala todo
+        while max(self.despierto_ms, self.wifi_ms, self.dormido_ms) > MAX_ACUMULADO:
+            self.despierto_ms //= 2
+            self.wifi_ms //= 2
+            self.dormido_ms //= 2
+
+    def ciclo_trabajo(self):
+        """Fracción del tiempo que estuvo despierto (None sin datos)."""
+        total = self.despierto_ms + self.wifi_ms + self.dormido_ms
+        if not total:
+            return None
+        return (self.despierto_ms + self.wifi_ms) / total
+
+    def corriente_ma(self, despierto_ma, wifi_ma, dormido_ma):
+        """Corriente promedio proyectada con el consumo de cada estado."""
+        total = self.despierto_ms + self.wifi_ms + self.dormido_ms
+        if not total:
+            return None
+        return (self.despierto_ms * despierto_ma + self.wifi_ms * wifi_ma
+                + self.dormido_ms * dormido_ma) / total
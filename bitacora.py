@@ -0,0 +1,35 @@
+"""
+Mensajes por consola con niveles.
+
+Cada print() por la UART cuesta tiempo; con un nivel más alto los mensajes
+de menor nivel se descartan con una sola comparación (los argumentos se
+pasan sin formatear, así no se arma ningún string si no se muestra).
+"""
+
+DEBUG = 10
+INFO = 20
+AVISO = 30
+ERROR = 40
+NADA = 100
+
+nivel = INFO
+
+
+def debug(*args):
+    if nivel <= DEBUG:
+        print(*args)
+
+
+def info(*args):
+    if nivel <= INFO:
+        print(*args)
+
+
+def aviso(*args):
+    if nivel <= AVISO:
+        print(*args)
+
+
+def error(*args):
+    if nivel <= ERROR:
+        print(*args)
@@ -0,0 +1,95 @@
+"""
+Calibración del sensor de humedad del suelo.
+
+La curva es lineal por tramos entre puntos (lectura del ADC, % de humedad):
+como mínimo seco (0 %) y húmedo (100 %), más los intermedios que se
+quieran. Los puntos se guardan en la flash y a partir de ellos se arma
+una tabla de bytes, así convertir una lectura es un solo acceso
+indexado, sin divisiones ni floats.
+
+La tabla tiene una entrada cada 2**DESPLAZAMIENTO cuentas del ADC de
+12 bits (1 KB en vez de 4 KB).
+"""
+import json
+import os
+
+ARCHIVO = 'calibracion.json'
+MAX_ADC = 4095        # 12 bits
+DESPLAZAMIENTO = 2    # tabla[lectura >> 2]
+
+# Valores de fábrica (los 1023/430 de 10 bits pasados a 12 bits)
+SECO_DEFECTO = 4095
+HUMEDO_DEFECTO = 1720
+
+
+class Calibracion:
+    def __init__(self, archivo=ARCHIVO):
+        self.archivo = archivo
+        self.puntos = [(SECO_DEFECTO, 0), (HUMEDO_DEFECTO, 100)]
+        self.tabla = bytearray((MAX_ADC >> DESPLAZAMIENTO) + 1)
+        self.cargar()
+
+    def cargar(self):
+        try:
+            with open(self.archivo) as f:
+                puntos = [(int(a), int(b)) for a, b in json.load(f)['puntos']]
+            if len(puntos) >= 2:
+                self.puntos = puntos
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # sin archivo o corrupto: quedan los valores de fábrica
+        self.armar_tabla()
+
+    def guardar(self):
+        # Escribimos a un temporal y renombramos para no dejar el archivo a medias
+        tmp = self.archivo + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'puntos': self.puntos}, f)
+        os.rename(tmp, self.archivo)
+
+    def fijar_punto(self, lectura, porcentaje):
+        """Agrega o reemplaza el punto de ese porcentaje y rearma la tabla."""
+        puntos = [p for p in self.puntos if p[1] != porcentaje]
+        puntos.append((lectura, porcentaje))
+        if len(puntos) < 2:
+            return False
+        self.puntos = puntos
+        self.armar_tabla()
+        return True
+
+    def restablecer(self):
+        self.puntos = [(SECO_DEFECTO, 0), (HUMEDO_DEFECTO, 100)]
+        self.armar_tabla()
+
+    def _interpolar(self, lectura, puntos):
+        # puntos ordenados por lectura; fuera del rango se usa el extremo
+        if lectura <= puntos[0][0]:
+            return puntos[0][1]
+        for k in range(1, len(puntos)):
+            x1, y1 = puntos[k]
+            if lectura <= x1:
+                x0, y0 = puntos[k - 1]
+                if x1 == x0:
+                    return y1
+                return y0 + (y1 - y0) * (lectura - x0) / (x1 - x0)
+        return puntos[-1][1]
+
+    def armar_tabla(self):
+        # Dos % capturados con la misma lectura se promedian: si no, la
+        # curva salta de uno al otro y deja de ser monótona
+        juntos = {}
+        for lectura, porcentaje in self.puntos:
+            juntos.setdefault(lectura, []).append(porcentaje)
+        puntos = sorted((x, sum(ys) / len(ys)) for x, ys in juntos.items())
+        medio = (1 << DESPLAZAMIENTO) // 2
+        for k in range(len(self.tabla)):
+            v = int(self._interpolar((k << DESPLAZAMIENTO) + medio, puntos) + 0.5)
+            self.tabla[k] = 0 if v < 0 else 100 if v > 100 else v
+
+    def porcentaje(self, lectura):
+        return self.tabla[lectura >> DESPLAZAMIENTO]
+
+    def cuentas_por_punto(self):
+        """Cuántas cuentas del ADC equivalen a 1 % (para pasar el ruido a %)."""
+        lecturas = [p[0] for p in self.puntos]
+        porcentajes = [p[1] for p in self.puntos]
+        return max(1, abs(max(lecturas) - min(lecturas))) / max(1, max(porcentajes) - min(porcentajes))
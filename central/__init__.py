@@ -0,0 +1,19 @@
+"""
+Central: junta en una PC los datos de varios ESP32 de riego.
+
+No se sube a la placa. Corre con CPython 3.8+ y NumPy:
+
+    python -m central sondear 192.168.0.50 192.168.0.51 --datos datos/
+    python -m central colector --puerto 8000 --datos datos/
+    python -m central secas --datos datos/ --umbral 40
+    python -m central resumen --datos datos/ --paso 3600
+
+- sondeo.py: consulta /data de todos los equipos a la vez, con una
+  conexión keep-alive por equipo.
+- colector.py: recibe los lotes que mandan los equipos (envio.py) y
+  los guarda en el mismo almacén.
+- almacen.py: guarda cada muestra por columnas (un archivo binario por
+  campo), solo agregando al final; se lee con numpy.memmap sin cargar
+  todo en memoria.
+- consultas.py: consultas sobre toda la flota hechas con NumPy.
+"""
@@ -0,0 +1,66 @@
+"""python -m central {sondear,colector,secas,ultimas,resumen} ... (ver central/__init__.py)"""
+import argparse
+import asyncio
+import json
+
+from .almacen import Almacen
+
+
+def _mostrar(filas):
+    for f in filas:
+        print(json.dumps(f, ensure_ascii=False))
+
+
+async def _colector(almacen, puerto):
+    from .colector import Colector
+    servidor = await Colector(almacen).servir('0.0.0.0', puerto)
+    print('Colector escuchando en el puerto %d (POST /ingest)' % puerto)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def main():
+    p = argparse.ArgumentParser(prog='python -m central', description='Datos de una flota de ESP32 de riego')
+    comun = argparse.ArgumentParser(add_help=False)
+    comun.add_argument('--datos', default='datos', help='directorio del almacén')
+    sub = p.add_subparsers(dest='comando', required=True)
+
+    s = sub.add_parser('sondear', parents=[comun], help='consultar /data de los equipos y guardar')
+    s.add_argument('equipos', nargs='+', help='host o host:puerto de cada ESP32')
+    s.add_argument('--periodo', type=float, default=10, help='segundos entre vueltas')
+    s.add_argument('--vueltas', type=int, help='cantidad de vueltas (por defecto, sin fin)')
+    s.add_argument('--simultaneos', type=int, default=64, help='pedidos a la vez como máximo')
+
+    s = sub.add_parser('colector', parents=[comun], help='recibir los lotes que mandan los equipos (envio.py)')
+    s.add_argument('--puerto', type=int, default=8000)
+
+    s = sub.add_parser('secas', parents=[comun], help='zonas con la última lectura debajo del umbral')
+    s.add_argument('--umbral', type=int, default=55)
+
+    sub.add_parser('ultimas', parents=[comun], help='última lectura de cada zona')
+
+    s = sub.add_parser('resumen', parents=[comun], help='humedad, bomba y agua por equipo e intervalo')
+    s.add_argument('--paso', type=int, default=3600, help='segundos por intervalo')
+    s.add_argument('--desde', type=int, default=0, help='time.time() inicial')
+
+    a = p.parse_args()
+    almacen = Almacen(a.datos)
+    if a.comando == 'sondear':
+        from .sondeo import Sondeador
+        asyncio.run(Sondeador(a.equipos, almacen, a.periodo, a.simultaneos).correr(a.vueltas))
+        return
+    if a.comando == 'colector':
+        asyncio.run(_colector(almacen, a.puerto))
+        return
+
+    from . import consultas
+    if a.comando == 'secas':
+        _mostrar(consultas.zonas_secas(almacen, a.umbral))
+    elif a.comando == 'ultimas':
+        _mostrar(consultas.ultimas(almacen))
+    else:
+        _mostrar(consultas.resumen(almacen, a.paso, a.desde))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Almacén por columnas de las muestras de la flota.
+
+Cada campo va en su propio archivo (<campo>.col) con enteros
+little-endian de tamaño fijo, uno por muestra, en el mismo orden en
+todos los archivos. Agregar es escribir al final de cada archivo; leer es
+mapear los archivos con numpy.memmap, así una consulta solo toca las
+columnas que usa.
+
+Si se corta la luz a mitad de una escritura algún archivo puede quedar
+más largo que los otros: al abrir se recortan todos al más corto.
+
+Los nombres de los equipos van en dispositivos.json (el archivo de la
+columna `dispositivo` guarda el índice).
+"""
+import json
+import os
+import sys
+from array import array
+
+SIN_DATO = -32768  # igual que historial.SIN_DATO en el ESP32
+
+# (campo, dtype de NumPy)
+COLUMNAS = (
+    ('t', '<u4'),              # time.time() de la central
+    ('dispositivo', '<u2'),
+    ('zona', 'u1'),
+    ('suelo', '<i2'),          # % (SIN_DATO si no hay)
+    ('temp', '<i2'),           # °C
+    ('hum', '<i2'),            # %
+    ('bomba', 'u1'),           # 1 = relé encendido
+    ('agua_24h_ml', '<i4'),
+)
+
+
+def _tam(dtype):
+    return int(dtype[-1])
+
+
+def _codigo_array(dtype):
+    """Código de array con el mismo tamaño y signo que el dtype."""
+    for c in ('BHILQ' if 'u' in dtype else 'bhilq'):
+        if array(c).itemsize == _tam(dtype):
+            return c
+    raise RuntimeError('no hay tipo de array para ' + dtype)
+
+
+def _entero(v):
+    return SIN_DATO if v is None else int(round(v))
+
+
+class Almacen:
+    def __init__(self, directorio):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._pendiente = {}
+        for campo, dtype in COLUMNAS:
+            self._pendiente[campo] = array(_codigo_array(dtype))
+        self.dispositivos = []
+        try:
+            with open(self._ruta_dispositivos()) as f:
+                self.dispositivos = json.load(f)
+        except (OSError, ValueError):
+            pass
+        self._indices = {d: i for i, d in enumerate(self.dispositivos)}
+        self._recortar()
+
+    def _ruta(self, campo):
+        return os.path.join(self.directorio, campo + '.col')
+
+    def _ruta_dispositivos(self):
+        return os.path.join(self.directorio, 'dispositivos.json')
+
+    def _recortar(self):
+        """Deja todas las columnas con la misma cantidad de muestras."""
+        largos = []
+        for campo, dtype in COLUMNAS:
+            try:
+                largos.append(os.path.getsize(self._ruta(campo)) // _tam(dtype))
+            except OSError:
+                largos.append(0)
+        n = min(largos)
+        for (campo, dtype), largo in zip(COLUMNAS, largos):
+            if largo != n or not os.path.exists(self._ruta(campo)):
+                with open(self._ruta(campo), 'ab') as f:
+                    f.truncate(n * _tam(dtype))
+        self.cantidad = n
+
+    def indice(self, dispositivo):
+        """Índice del equipo (lo agrega a dispositivos.json si es nuevo)."""
+        i = self._indices.get(dispositivo)
+        if i is None:
+            i = len(self.dispositivos)
+            self.dispositivos.append(dispositivo)
+            self._indices[dispositivo] = i
+            tmp = self._ruta_dispositivos() + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.dispositivos, f)
+            os.replace(tmp, self._ruta_dispositivos())
+        return i
+
+    def agregar(self, t, dispositivo, datos):
+        """Una fila por zona de una respuesta de /data."""
+        zonas = datos.get('zones') or [{'soil': datos.get('soil'), 'pump': False}]
+        for z, zona in enumerate(zonas):
+            self.agregar_fila(t, dispositivo, z, zona.get('soil'), datos.get('temp'), datos.get('hum'),
+                              zona.get('pump'), datos.get('water_24h_ml') or 0)
+
+    def agregar_fila(self, t, dispositivo, zona, suelo, temp, hum, bomba, agua_24h_ml=0):
+        p = self._pendiente
+        p['t'].append(int(t))
+        p['dispositivo'].append(self.indice(dispositivo))
+        p['zona'].append(zona)
+        p['suelo'].append(_entero(suelo))
+        p['temp'].append(_entero(temp))
+        p['hum'].append(_entero(hum))
+        p['bomba'].append(1 if bomba else 0)
+        p['agua_24h_ml'].append(int(agua_24h_ml))
+
+    def volcar(self):
+        """Escribe lo pendiente al final de cada columna."""
+        n = len(self._pendiente['t'])
+        if not n:
+            return 0
+        for campo, _ in COLUMNAS:
+            a = self._pendiente[campo]
+            if sys.byteorder != 'little':
+                a.byteswap()
+            with open(self._ruta(campo), 'ab') as f:
+                a.tofile(f)
+            del a[:]
+        self.cantidad += n
+        return n
+
+    def columnas(self, *campos):
+        """
+        Arrays de NumPy (memmap de solo lectura) con las columnas pedidas,
+        o todas si no se pide ninguna.
+        """
+        import numpy as np
+        campos = campos or [c for c, _ in COLUMNAS]
+        tipos = dict(COLUMNAS)
+        salida = {}
+        for campo in campos:
+            if self.cantidad == 0:
+                salida[campo] = np.zeros(0, tipos[campo])
+            else:
+                salida[campo] = np.memmap(self._ruta(campo), tipos[campo], 'r', shape=(self.cantidad,))
+        return salida
@@ -0,0 +1,161 @@
+"""
+Colector de los lotes que mandan los ESP32 (ver envio.py en la placa).
+
+Recibe POST /ingest con una trama por pedido, guarda las muestras en el
+almacén y contesta {"ack": n}: el equipo descarta todo lo que tenga
+secuencia <= n. Una trama repetida (el ack se perdió y el equipo la
+reenvió) se confirma de nuevo sin volver a guardarla. La última
+época y secuencia de cada equipo se guardan en acks.json para seguir
+deduplicando después de reiniciar la central; si llega otra época el
+equipo empezó la secuencia de nuevo y se deja de comparar con el ack
+viejo. Las tramas de la versión 1 (sin época) se siguen aceptando.
+
+El equipo manda su hora en X-Time. Si difiere de la de la central en
+más de TOLERANCIA_RELOJ segundos (RTC sin NTP, o NTP con la época 2000
+de MicroPython), los tiempos de la trama se corren en esa diferencia.
+"""
+import asyncio
+import json
+import os
+import struct
+import time
+import zlib
+
+# Igual que envio.CABECERA y registro.FORMATO en la placa
+CABECERA = '<2sBBIIH'
+TAM_CABECERA = struct.calcsize(CABECERA)
+CABECERA_V1 = '<2sBBIH'
+TAM_CABECERA_V1 = struct.calcsize(CABECERA_V1)
+FORMATO = '<IBBhhH'
+TAM_REGISTRO = struct.calcsize(FORMATO)
+COMPRIMIDO = 1
+MUESTRA, BOMBA_ON, BOMBA_OFF = 0, 1, 2
+TOLERANCIA_RELOJ = 300  # s de diferencia con la hora del equipo que se dejan pasar
+
+
+class ErrorTrama(ValueError):
+    pass
+
+
+def decodificar(trama):
+    """(época, secuencia, [(t, tipo, zona, suelo, temp, hum, extra), ...]); época None en la versión 1"""
+    if len(trama) < TAM_CABECERA_V1:
+        raise ErrorTrama('trama corta')
+    magia, version = struct.unpack_from('<2sB', trama)
+    if magia != b'RG' or version not in (1, 2):
+        raise ErrorTrama('formato desconocido')
+    if version == 1:
+        _, _, banderas, seq, cantidad = struct.unpack_from(CABECERA_V1, trama)
+        epoca, datos = None, trama[TAM_CABECERA_V1:]
+    else:
+        if len(trama) < TAM_CABECERA:
+            raise ErrorTrama('trama corta')
+        _, _, banderas, epoca, seq, cantidad = struct.unpack_from(CABECERA, trama)
+        datos = trama[TAM_CABECERA:]
+    if banderas & COMPRIMIDO:
+        try:
+            datos = zlib.decompress(datos)
+        except zlib.error as e:
+            raise ErrorTrama(str(e))
+    if len(datos) != cantidad * TAM_REGISTRO:
+        raise ErrorTrama('largo incorrecto')
+    registros = []
+    for t, tipo, suelo, temp, hum, extra in struct.iter_unpack(FORMATO, datos):
+        registros.append((t, tipo & 0x0F, tipo >> 4, suelo, temp, hum, extra))
+    return epoca, seq, registros
+
+
+class Colector:
+    def __init__(self, almacen):
+        self.almacen = almacen
+        self._ruta_acks = os.path.join(almacen.directorio, 'acks.json')
+        try:
+            with open(self._ruta_acks) as f:
+                self.acks = json.load(f)
+        except (OSError, ValueError):
+            self.acks = {}
+        for dispositivo, ack in self.acks.items():
+            if not isinstance(ack, list):
+                self.acks[dispositivo] = [None, ack]  # acks.json de antes de las épocas
+        self._bomba = {}   # (equipo, zona) -> 1/0 según el último evento
+        self.tramas = 0
+        self.muestras = 0
+        self.repetidas = 0
+        self.reinicios = 0
+
+    def recibir(self, dispositivo, trama, hora=None):
+        """
+        Guarda la trama y devuelve el ack para el equipo. `hora` es la del
+        equipo al mandarla (X-Time), para corregir su reloj.
+        """
+        epoca, seq, registros = decodificar(trama)
+        ultima_epoca, ultimo = self.acks.get(dispositivo, (epoca, 0))
+        if epoca != ultima_epoca:
+            # Se borró la cola del equipo o perdió cola/seq: secuencia nueva
+            self.reinicios += 1
+            ultimo = 0
+        if seq <= ultimo:
+            self.repetidas += 1
+            return ultimo
+        corrimiento = 0
+        if hora is not None and abs(time.time() - hora) > TOLERANCIA_RELOJ:
+            corrimiento = int(time.time()) - hora
+        for t, tipo, zona, suelo, temp, hum, extra in registros:
+            t += corrimiento
+            if tipo == BOMBA_ON:
+                self._bomba[dispositivo, zona] = 1
+            elif tipo == BOMBA_OFF:
+                self._bomba[dispositivo, zona] = 0
+            elif tipo == MUESTRA:
+                # Los lotes no traen el agua de 24 h: queda en 0
+                self.almacen.agregar_fila(t, dispositivo, zona, suelo, temp, hum,
+                                          self._bomba.get((dispositivo, zona), 0))
+                self.muestras += 1
+        self.almacen.volcar()
+        # Si el equipo tuvo que tirar tramas por falta de lugar, la
+        # secuencia salta: se acepta igual
+        self.acks[dispositivo] = [epoca, seq]
+        tmp = self._ruta_acks + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.acks, f)
+        os.replace(tmp, self._ruta_acks)
+        self.tramas += 1
+        return seq
+
+    async def atender(self, reader, writer):
+        try:
+            cabecera = await reader.readuntil(b'\r\n\r\n')
+            lineas = cabecera.decode('latin-1').split('\r\n')
+            metodo, ruta = lineas[0].split(' ')[:2]
+            largo = 0
+            dispositivo = hora = None
+            for linea in lineas[1:]:
+                nombre, _, valor = linea.partition(':')
+                nombre = nombre.strip().lower()
+                if nombre == 'content-length':
+                    largo = int(valor)
+                elif nombre == 'x-device':
+                    dispositivo = valor.strip()
+                elif nombre == 'x-time':
+                    try:
+                        hora = int(valor)
+                    except ValueError:
+                        pass  # sin hora del equipo: los tiempos quedan como vienen
+            if metodo != 'POST' or ruta != '/ingest' or not dispositivo:
+                estado, cuerpo = '404 Not Found', '{"error": "POST /ingest con X-Device"}'
+            else:
+                trama = await reader.readexactly(largo)
+                try:
+                    estado, cuerpo = '200 OK', '{"ack": %d}' % self.recibir(dispositivo, trama, hora)
+                except ErrorTrama as e:
+                    estado, cuerpo = '400 Bad Request', json.dumps({'error': str(e)})
+            writer.write(('HTTP/1.0 %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s'
+                          % (estado, len(cuerpo), cuerpo)).encode())
+            await writer.drain()
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def servir(self, host='0.0.0.0', puerto=8000):
+        return await asyncio.start_server(self.atender, host, puerto)
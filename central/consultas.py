@@ -0,0 +1,94 @@
+"""
+Consultas sobre toda la flota, vectorizadas con NumPy.
+
+Todas trabajan sobre las columnas mapeadas del almacén (sin recorrer
+muestra por muestra en Python) y devuelven listas de diccionarios
+listas para imprimir o pasar a JSON.
+"""
+import numpy as np
+
+from .almacen import SIN_DATO
+
+
+def _ultimas(col, desde=0):
+    """Posición de la última muestra de cada (equipo, zona) con t >= desde."""
+    clave = col['dispositivo'].astype(np.int64) << 8 | col['zona']
+    validas = np.flatnonzero(col['t'] >= desde)
+    clave = clave[validas]
+    # np.unique sobre el arreglo invertido da la primera aparición = la última
+    _, pos = np.unique(clave[::-1], return_index=True)
+    return validas[len(clave) - 1 - pos]
+
+
+def ultimas(almacen, desde=0):
+    """Última lectura de cada zona de cada equipo."""
+    col = almacen.columnas()
+    i = _ultimas(col, desde)
+    return _filas(almacen, col, i)
+
+
+def zonas_secas(almacen, umbral, desde=0):
+    """Zonas cuya última lectura está por debajo de `umbral` %."""
+    col = almacen.columnas()
+    i = _ultimas(col, desde)
+    suelo = col['suelo'][i]
+    i = i[(suelo != SIN_DATO) & (suelo < umbral)]
+    return _filas(almacen, col, i[np.argsort(col['suelo'][i], kind='stable')])
+
+
+def _filas(almacen, col, i):
+    t, d, z, s, b = (col[c][i].tolist() for c in ('t', 'dispositivo', 'zona', 'suelo', 'bomba'))
+    return [{'device': almacen.dispositivos[d[k]], 'zone': z[k], 't': t[k],
+             'soil': None if s[k] == SIN_DATO else s[k], 'pump': bool(b[k])}
+            for k in range(len(i))]
+
+
+def resumen(almacen, paso=3600, desde=0, hasta=None):
+    """
+    Por equipo y por intervalo de `paso` segundos: humedad mínima,
+    promedio y máxima (todas sus zonas), fracción de muestras con la
+    bomba encendida y agua de las últimas 24 h al final del intervalo.
+    """
+    col = almacen.columnas()
+    t = col['t']
+    sel = t >= desde
+    if hasta is not None:
+        sel &= t < hasta
+    sel &= col['suelo'] != SIN_DATO
+    t = t[sel].astype(np.int64)
+    if not len(t):
+        return []
+    dispositivo = col['dispositivo'][sel].astype(np.int64)
+    suelo = col['suelo'][sel].astype(np.float64)
+    bomba = col['bomba'][sel]
+    agua = col['agua_24h_ml'][sel]
+
+    intervalo = t // paso
+    base = intervalo.min()
+    ancho = int(intervalo.max() - base) + 1
+    grupo = dispositivo * ancho + (intervalo - base)
+    grupos, inversa, cant = np.unique(grupo, return_inverse=True, return_counts=True)
+    suma = np.bincount(inversa, weights=suelo)
+    encendida = np.bincount(inversa, weights=bomba)
+    minimo = np.full(len(grupos), np.inf)
+    np.minimum.at(minimo, inversa, suelo)
+    maximo = np.full(len(grupos), -np.inf)
+    np.maximum.at(maximo, inversa, suelo)
+    # Agua al final de cada intervalo: la muestra más nueva de cada grupo
+    orden = np.lexsort((t, inversa))
+    ultima = orden[np.r_[np.flatnonzero(np.diff(inversa[orden])), len(orden) - 1]]
+
+    filas = []
+    for k, g in enumerate(grupos.tolist()):
+        d, iv = divmod(g, ancho)
+        filas.append({
+            'device': almacen.dispositivos[d],
+            'start': int((base + iv) * paso),
+            'samples': int(cant[k]),
+            'soil_min': float(minimo[k]),
+            'soil_mean': round(float(suma[k] / cant[k]), 1),
+            'soil_max': float(maximo[k]),
+            'pump_fraction': round(float(encendida[k] / cant[k]), 3),
+            'water_24h_ml': int(agua[ultima[k]]),
+        })
+    return filas
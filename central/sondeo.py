@@ -0,0 +1,134 @@
+"""
+Sondeo de /data en toda la flota.
+
+Cada equipo tiene una sola conexión keep-alive que se reutiliza en cada
+vuelta (el ESP32 atiende pocos clientes a la vez, y abrir una conexión
+por pedido le cuesta más que contestar). Si la conexión se cae se
+reabre en la vuelta siguiente. Todos los equipos se consultan a la par
+con asyncio, con un tope de pedidos simultáneos.
+
+Las muestras se guardan con el "device" de /data (el unique_id del ESP32,
+el mismo X-Device que usa el colector), así un equipo es uno solo aunque
+cambie de IP o llegue por los dos caminos. Con un firmware que no lo
+manda queda host:puerto.
+"""
+import asyncio
+import json
+import time
+
+
+class ErrorEquipo(Exception):
+    pass
+
+
+class Equipo:
+    """Cliente HTTP/1.1 mínimo con keep-alive contra un ESP32."""
+
+    def __init__(self, direccion, timeout=5):
+        host, _, puerto = direccion.partition(':')
+        self.direccion = direccion
+        self.host = host
+        self.puerto = int(puerto or 80)
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self.pedidos = 0
+        self.fallas = 0
+        self.conexiones = 0
+
+    async def _conectar(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.puerto), self.timeout)
+        self.conexiones += 1
+
+    def cerrar(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _pedir(self, ruta):
+        self._writer.write(('GET %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n\r\n'
+                            % (ruta, self.host)).encode())
+        await self._writer.drain()
+        cabecera = await self._reader.readuntil(b'\r\n\r\n')
+        lineas = cabecera.decode('latin-1').split('\r\n')
+        estado = int(lineas[0].split(' ')[1])
+        largo = None
+        cerrar = False
+        for linea in lineas[1:]:
+            nombre, _, valor = linea.partition(':')
+            nombre = nombre.strip().lower()
+            if nombre == 'content-length':
+                largo = int(valor)
+            elif nombre == 'connection':
+                cerrar = valor.strip().lower() == 'close'
+        if largo is None:
+            cuerpo = await self._reader.read()
+            cerrar = True
+        else:
+            cuerpo = await self._reader.readexactly(largo)
+        if cerrar:
+            self.cerrar()
+        if estado != 200:
+            raise ErrorEquipo('%s%s: HTTP %d' % (self.direccion, ruta, estado))
+        return cuerpo
+
+    async def pedir(self, ruta='/data'):
+        """Cuerpo de la respuesta; reintenta una vez con conexión nueva."""
+        self.pedidos += 1
+        for intento in range(2):
+            reutilizada = self._writer is not None
+            try:
+                if not reutilizada:
+                    await self._conectar()
+                return await asyncio.wait_for(self._pedir(ruta), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError,
+                    asyncio.LimitOverrunError, ValueError, IndexError) as e:
+                self.cerrar()
+                # Una conexión vieja puede haberla cerrado el ESP32 por
+                # inactividad: eso solo merece un reintento
+                if not reutilizada or intento:
+                    self.fallas += 1
+                    raise ErrorEquipo('%s: %s' % (self.direccion, e or type(e).__name__))
+
+
+class Sondeador:
+    def __init__(self, direcciones, almacen, periodo=10, simultaneos=64, timeout=5):
+        self.equipos = [Equipo(d, timeout) for d in direcciones]
+        self.almacen = almacen
+        self.periodo = periodo
+        self._tope = asyncio.Semaphore(simultaneos)
+        self.vueltas = 0
+        self.ultimo_error = {}
+
+    async def _sondear(self, equipo, t):
+        async with self._tope:
+            try:
+                datos = json.loads(await equipo.pedir('/data'))
+            except (ErrorEquipo, ValueError) as e:
+                self.ultimo_error[equipo.direccion] = str(e)
+                return False
+        self.almacen.agregar(t, datos.get('device') or equipo.direccion, datos)
+        self.ultimo_error.pop(equipo.direccion, None)
+        return True
+
+    async def vuelta(self):
+        """Consulta todos los equipos una vez; devuelve cuántos contestaron."""
+        t = int(time.time())
+        resultados = await asyncio.gather(*[self._sondear(e, t) for e in self.equipos])
+        self.almacen.volcar()
+        self.vueltas += 1
+        return sum(resultados)
+
+    async def correr(self, vueltas=None):
+        """Una vuelta cada `periodo` segundos (para siempre si vueltas es None)."""
+        proxima = time.monotonic()
+        try:
+            while vueltas is None or self.vueltas < vueltas:
+                ok = await self.vuelta()
+                print('%s: %d/%d equipos' % (time.strftime('%H:%M:%S'), ok, len(self.equipos)))
+                proxima += self.periodo
+                await asyncio.sleep(max(0, proxima - time.monotonic()))
+        finally:
+            for e in self.equipos:
+                e.cerrar()
@@ -0,0 +1,119 @@
+"""
+Codificador JSON sobre un bytearray reutilizable.
+
+En vez de armar strings con % y join (que dejan basura en el heap en cada
+pedido), los valores se escriben directo en un buffer preasignado: los
+enteros se pasan a dígitos en el lugar y None se escribe como null.
+Para respuestas largas (p. ej. el historial) se vuelca el buffer al
+writer cada vez que se llena y se sigue escribiendo desde el principio.
+El buffer no crece solo: si algo no entra se lanza BufferLleno antes de
+pasarse del final (se agranda a propósito con agrandar()).
+"""
+
+
+class BufferLleno(Exception):
+    pass
+
+
+class BufferJSON:
+    def __init__(self, tam=512):
+        self.buf = bytearray(tam)
+        self.mv = memoryview(self.buf)
+        self.n = 0
+
+    def agrandar(self, tam):
+        """Pasa a un buffer de al menos `tam` bytes; lo escrito se conserva."""
+        if tam > len(self.buf):
+            buf = bytearray(tam)
+            buf[:self.n] = self.mv[:self.n]
+            self.buf = buf
+            self.mv = memoryview(buf)
+
+    def _lugar(self, m):
+        if self.n + m > len(self.buf):
+            raise BufferLleno('faltan %d bytes' % (self.n + m - len(self.buf)))
+
+    def reiniciar(self):
+        self.n = 0
+
+    def contenido(self):
+        """Lo escrito hasta ahora (vista sobre el buffer, sin copiar)."""
+        return self.mv[:self.n]
+
+    def libre(self):
+        return len(self.buf) - self.n
+
+    def crudo(self, datos):
+        """Copia bytes tal cual (claves, llaves, comas...)."""
+        m = len(datos)
+        self._lugar(m)
+        self.buf[self.n:self.n + m] = datos
+        self.n += m
+
+    def entero(self, v):
+        """Escribe un entero en decimal sin crear un str intermedio."""
+        # Contamos los dígitos y los escribimos de atrás para adelante
+        negativo = v < 0
+        if negativo:
+            v = -v
+        digitos = 1
+        x = v
+        while x >= 10:
+            x //= 10
+            digitos += 1
+        self._lugar(digitos + negativo)
+        if negativo:
+            self.buf[self.n] = 45  # '-'
+            self.n += 1
+        i = self.n + digitos - 1
+        while True:
+            self.buf[i] = 48 + v % 10
+            v //= 10
+            if not v:
+                break
+            i -= 1
+        self.n += digitos
+
+    def decimal(self, v):
+        """Escribe un número con un decimal (p. ej. el ruido del sensor)."""
+        d = int(v * 10 + (0.5 if v >= 0 else -0.5))
+        if d < 0:
+            self.crudo(b'-')
+            d = -d
+        self.entero(d // 10)
+        self._lugar(2)
+        self.buf[self.n] = 46  # '.'
+        self.buf[self.n + 1] = 48 + d % 10
+        self.n += 2
+
+    def valor(self, v, nulo=None):
+        """Entero o null (si v es None o igual a `nulo`)."""
+        if v is None or v == nulo:
+            self.crudo(b'null')
+        else:
+            self.entero(v)
+
+    def booleano(self, v):
+        self.crudo(b'true' if v else b'false')
+
+    def texto(self, s):
+        """String entre comillas (se escapan comillas y barras)."""
+        b = s.encode()
+        self._lugar(2 * len(b) + 2)  # peor caso: todo escapado
+        self.buf[self.n] = 34
+        self.n += 1
+        for c in b:
+            if c == 34 or c == 92:
+                self.buf[self.n] = 92
+                self.n += 1
+            self.buf[self.n] = c
+            self.n += 1
+        self.buf[self.n] = 34
+        self.n += 1
+
+    async def volcar(self, writer):
+        """Manda lo escrito por `writer` y deja el buffer vacío para seguir."""
+        if self.n:
+            writer.write(self.mv[:self.n])
+            self.n = 0
+            await writer.drain()
@@ -0,0 +1,70 @@
+"""
+Contabilidad de agua de la bomba.
+
+El volumen se estima con el caudal configurado (ml/s) y el tiempo que la
+bomba estuvo encendida. El consumo de las últimas 24 horas se lleva en 24
+casilleros de una hora: al cambiar de hora se vacía el casillero que
+sale de la ventana y se lo resta del total, así cada actualización es O(1)
+y no hace falta guardar cada riego.
+"""
+from array import array
+
+HORAS = 24
+
+
+class Consumo:
+    def __init__(self, caudal_ml_s, presupuesto_diario_ml):
+        self.caudal_ml_s = caudal_ml_s
+        self.presupuesto_diario_ml = presupuesto_diario_ml
+        self._horas = array('I', bytes(4 * HORAS))  # ml por hora
+        self._hora = -1        # hora (time.time() // 3600) del casillero actual
+        self.ml_24h = 0        # suma de los 24 casilleros
+        self.ml_total = 0      # desde el arranque (más lo restaurado del registro)
+        self.ml_ultimo_ciclo = 0
+
+    def ml(self, ms):
+        """Volumen estimado para `ms` milisegundos de bomba encendida."""
+        return ms * self.caudal_ml_s // 1000
+
+    def _avanzar(self, t):
+        hora = t // 3600
+        if hora <= self._hora:
+            return
+        # Se vacían las horas que quedaron fuera de la ventana (como mucho 24)
+        pasos = min(hora - self._hora, HORAS) if self._hora >= 0 else HORAS
+        for k in range(1, pasos + 1):
+            i = (hora - pasos + k) % HORAS
+            self.ml_24h -= self._horas[i]
+            self._horas[i] = 0
+        self._hora = hora
+
+    def registrar(self, t, ms):
+        """Suma un ciclo de `ms` milisegundos terminado en el tiempo `t` (segundos)."""
+        self._avanzar(t)
+        ml = self.ml(ms)
+        if t // 3600 == self._hora:
+            self._horas[self._hora % HORAS] += ml
+            self.ml_24h += ml
+        self.ml_total += ml
+        self.ml_ultimo_ciclo = ml
+        return ml
+
+    def disponible(self, t, ms_en_curso=0):
+        """
+        ml que quedan del presupuesto de las últimas 24 h, descontando un
+        ciclo en curso de `ms_en_curso` milisegundos.
+        """
+        self._avanzar(t)
+        return self.presupuesto_diario_ml - self.ml_24h - self.ml(ms_en_curso)
+
+    def estado(self):
+        """(hora, ml_total, ml_ultimo_ciclo, ml por hora), para seguir después de un deepsleep."""
+        return self._hora, self.ml_total, self.ml_ultimo_ciclo, self._horas
+
+    def restaurar(self, hora, ml_total, ml_ultimo_ciclo, horas):
+        self._hora = hora
+        self.ml_total = ml_total
+        self.ml_ultimo_ciclo = ml_ultimo_ciclo
+        for i in range(HORAS):
+            self._horas[i] = horas[i]
+        self.ml_24h = sum(self._horas)
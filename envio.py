@@ -0,0 +1,320 @@
+"""
+Envío de lecturas a un colector (ver central/colector.py).
+
+Sin nadie consultando /data las lecturas se perdían, y mandar una por
+pedido gasta radio. Acá cada registro (el mismo formato de 12 bytes de
+registro.py) se junta en un lote; cuando el lote se llena o pasa
+edad_maxima segundos se cierra en una trama:
+
+    'RG' | versión (2) | banderas (1) | época (4) | secuencia (4) | cantidad (2) | registros
+
+(little-endian; bandera 1 = registros comprimidos con zlib, si la placa
+tiene el módulo deflate). Cada trama va en un solo POST cuando hay Wi-Fi;
+el colector contesta {"ack": n} y se descartan todas las tramas con
+secuencia <= n. Si falla se reintenta con espera exponencial.
+
+La época es un número al azar que se elige cada vez que la secuencia
+vuelve a empezar (se borró cola/ o no se pudo leer cola/seq): con otra
+época el colector deja de comparar con el ack viejo, si no confirmaría
+tramas nuevas como repetidas y se perderían. El POST lleva además la
+hora del equipo (X-Time) para que el colector corrija los tiempos si el
+reloj de la placa no está en hora.
+
+Las tramas esperan en RAM (como mucho max_ram); las más viejas se pasan
+a la flash y sobreviven a un reinicio. Si también se llena la flash se
+tira la más vieja y se cuenta en `descartadas`. Si la flash no deja
+escribir (llena o rota) las tramas siguen en RAM, hasta el doble de
+max_ram; la falla se avisa con al_fallar_flash(e) y nunca sale de acá.
+"""
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import os
+import struct
+import time
+import bitacora
+from registro import FORMATO, TAM_REGISTRO
+
+try:
+    import deflate  # MicroPython 1.21+
+    import io
+except ImportError:
+    deflate = None
+    try:
+        import zlib  # CPython (simulador)
+    except ImportError:
+        zlib = None
+
+CABECERA = '<2sBBIIH'
+TAM_CABECERA = struct.calcsize(CABECERA)
+VERSION = 2
+COMPRIMIDO = 1
+
+ESPERA_MINIMA = 2000      # ms antes del primer reintento
+ESPERA_MAXIMA = 300000    # tope de la espera entre reintentos (5 minutos)
+TIMEOUT = 10              # segundos por POST
+
+
+def _comprimir(datos):
+    if deflate is not None:
+        b = io.BytesIO()
+        with deflate.DeflateIO(b, deflate.ZLIB) as d:
+            d.write(datos)
+        return b.getvalue()
+    if zlib is not None:
+        return zlib.compress(datos)
+    return None
+
+
+class Enviador:
+    def __init__(self, url, dispositivo, red, por_lote=32, max_ram=8, max_archivos=64,
+                 edad_maxima=300, directorio='cola', al_fallar_flash=None):
+        # url: 'http://host[:puerto]/ruta'
+        resto = url.split('://', 1)[-1]
+        hostpuerto, _, ruta = resto.partition('/')
+        self.host, _, puerto = hostpuerto.partition(':')
+        self.puerto = int(puerto or 80)
+        self.ruta = '/' + ruta
+        self.dispositivo = dispositivo
+        self.red = red                # wifi.ConexionWiFi
+        self.max_ram = max_ram
+        self.max_archivos = max_archivos
+        self.edad_maxima = edad_maxima
+        self.directorio = directorio
+        self.al_fallar_flash = al_fallar_flash  # función que recibe el OSError
+        self._lote = bytearray(por_lote * TAM_REGISTRO)
+        self._usado = 0
+        self._t_lote = 0              # time.time() del primer registro del lote
+        self._ram = []                # [(secuencia, trama)], de la más vieja a la más nueva
+        self._flash = []              # secuencias guardadas en la flash, ordenadas
+        self.seq = 1
+        self.epoca = 0
+        self.enviadas = 0
+        self.descartadas = 0
+        self.fallas = 0
+        self._abrir()
+
+    def _ruta(self, seq):
+        return '%s/%08d.bin' % (self.directorio, seq)
+
+    def _abrir(self):
+        try:
+            nombres = os.listdir(self.directorio)
+        except OSError:
+            os.mkdir(self.directorio)
+            nombres = []
+        for nombre in nombres:
+            if nombre.endswith('.bin'):
+                self._flash.append(int(nombre[:-4]))
+        self._flash.sort()
+        # cola/seq: "secuencia época" (los de antes solo tenían la secuencia)
+        try:
+            with open(self.directorio + '/seq') as f:
+                partes = f.read().split()
+            self.seq = int(partes[0])
+            self.epoca = int(partes[1])
+        except (OSError, ValueError, IndexError):
+            pass
+        if self._flash:
+            self.seq = max(self.seq, self._flash[-1] + 1)
+        if not self.epoca:
+            # Secuencia nueva (o de origen dudoso): otra época para el colector
+            self.epoca = int.from_bytes(os.urandom(4), 'little') or 1
+            try:
+                self._guardar_seq()
+            except OSError as e:
+                self._falla_flash(e)  # se vuelve a intentar al cerrar el lote
+
+    def _falla_flash(self, e):
+        if self.al_fallar_flash is not None:
+            self.al_fallar_flash(e)
+
+    def _guardar_seq(self):
+        with open(self.directorio + '/seq', 'w') as f:
+            f.write('%d %d' % (self.seq, self.epoca))
+
+    def pendientes(self):
+        return len(self._ram) + len(self._flash) + (1 if self._usado else 0)
+
+    def agregar(self, t, tipo, suelo=0, temp=None, hum=None, extra=0):
+        """Mismos argumentos que registro.Registro.agregar."""
+        if not self._usado:
+            self._t_lote = t
+        struct.pack_into(FORMATO, self._lote, self._usado, t, tipo, suelo,
+                         -32768 if temp is None else temp,
+                         -32768 if hum is None else hum,
+                         min(extra, 0xFFFF))
+        self._usado += TAM_REGISTRO
+        if self._usado == len(self._lote):
+            self.cerrar_lote()
+
+    def corregir_hora(self, corrimiento):
+        """
+        El reloj se movió `corrimiento` segundos (NTP): corre lo que está en
+        el lote abierto. Las tramas ya cerradas quedan como están.
+        """
+        for i in range(0, self._usado, TAM_REGISTRO):
+            struct.pack_into('<I', self._lote, i, struct.unpack_from('<I', self._lote, i)[0] + corrimiento)
+        self._t_lote += corrimiento
+
+    def cerrar_lote(self):
+        if not self._usado:
+            return
+        registros = bytes(memoryview(self._lote)[:self._usado])
+        comprimidos = _comprimir(registros)
+        banderas = 0
+        if comprimidos is not None and len(comprimidos) < len(registros):
+            registros = comprimidos
+            banderas = COMPRIMIDO
+        trama = struct.pack(CABECERA, b'RG', VERSION, banderas, self.epoca, self.seq,
+                            self._usado // TAM_REGISTRO) + registros
+        self._ram.append((self.seq, trama))
+        self.seq += 1
+        self._usado = 0
+        try:
+            self._guardar_seq()
+            if len(self._ram) > self.max_ram:
+                # Sin red hace rato: la más vieja pasa a la flash
+                self._a_flash()
+        except OSError as e:
+            self._falla_flash(e)
+            # La trama sigue en RAM; con la flash llena por mucho tiempo
+            # se tira la más vieja para no quedarse sin memoria
+            if len(self._ram) > 2 * self.max_ram:
+                self._ram.pop(0)
+                self.descartadas += 1
+
+    def _a_flash(self):
+        """Pasa la trama más vieja de la RAM a la flash (si falla, queda en RAM)."""
+        seq, trama = self._ram[0]
+        ruta = self._ruta(seq)
+        try:
+            with open(ruta, 'wb') as f:
+                f.write(trama)
+        except OSError:
+            # Un archivo a medias no se podría mandar nunca
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            raise
+        self._ram.pop(0)
+        self._flash.append(seq)
+        if len(self._flash) > self.max_archivos:
+            self.descartadas += 1
+            try:
+                os.remove(self._ruta(self._flash.pop(0)))
+            except OSError as e:
+                self._falla_flash(e)
+
+    def guardar(self):
+        """
+        Cierra el lote y pasa a la flash lo que hay en RAM (antes de apagar).
+        Lo que la flash no acepta queda en RAM.
+        """
+        self.cerrar_lote()
+        try:
+            while self._ram:
+                self._a_flash()
+        except OSError as e:
+            self._falla_flash(e)
+
+    def _siguiente(self):
+        """
+        La trama más vieja (las de la flash son anteriores a las de RAM), o
+        None si no queda ninguna. Una que no se puede leer se da por perdida.
+        """
+        while self._flash:
+            seq = self._flash[0]
+            try:
+                with open(self._ruta(seq), 'rb') as f:
+                    return seq, f.read()
+            except OSError as e:
+                self._falla_flash(e)
+                self._flash.pop(0)
+                self.descartadas += 1
+        return self._ram[0] if self._ram else None
+
+    def _confirmar(self, ack):
+        while self._flash and self._flash[0] <= ack:
+            seq = self._flash.pop(0)
+            self.enviadas += 1
+            try:
+                os.remove(self._ruta(seq))
+            except OSError as e:
+                # Si vuelve después de un reinicio el colector la toma por repetida
+                self._falla_flash(e)
+        while self._ram and self._ram[0][0] <= ack:
+            self._ram.pop(0)
+            self.enviadas += 1
+
+    async def _post(self, trama):
+        """Manda una trama; devuelve el ack del colector o None."""
+        reader, writer = await asyncio.open_connection(self.host, self.puerto)
+        try:
+            writer.write(('POST %s HTTP/1.0\r\nHost: %s\r\nX-Device: %s\r\nX-Time: %d\r\n'
+                          'Content-Type: application/octet-stream\r\nContent-Length: %d\r\n\r\n'
+                          % (self.ruta, self.host, self.dispositivo, time.time(), len(trama))).encode())
+            writer.write(trama)
+            await writer.drain()
+            # HTTP/1.0: el colector cierra al terminar; la respuesta es corta
+            respuesta = b''
+            while len(respuesta) < 256:
+                parte = await reader.read(256 - len(respuesta))
+                if not parte:
+                    break
+                respuesta += parte
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        if not respuesta.startswith(b'HTTP/1.') or respuesta[9:12] != b'200':
+            return None
+        # Cuerpo: {"ack": n}
+        i = respuesta.find(b'"ack"')
+        if i < 0:
+            return None
+        return int(respuesta[respuesta.index(b':', i) + 1:].strip(b' }\r\n'))
+
+    async def _enviar_siguiente(self):
+        """Manda la trama más vieja. Devuelve True si el colector la confirmó."""
+        siguiente = self._siguiente()
+        if siguiente is None:
+            return True
+        seq, trama = siguiente
+        try:
+            ack = await asyncio.wait_for(self._post(trama), TIMEOUT)
+        except Exception as e:  # OSError, timeout, respuesta rota
+            bitacora.debug("Envío falló:", e)
+            ack = None
+        if ack is None or ack < seq:
+            self.fallas += 1
+            return False
+        self._confirmar(ack)
+        return True
+
+    async def enviar_pendientes(self):
+        """
+        Cierra el lote y manda todo lo pendiente mientras el colector
+        conteste (modo de bajo consumo: el Wi-Fi está prendido un rato).
+        Devuelve False si quedó algo sin mandar.
+        """
+        self.cerrar_lote()
+        while self._ram or self._flash:
+            if not self.red.conectada() or not await self._enviar_siguiente():
+                return False
+        return True
+
+    async def tarea(self):
+        espera = ESPERA_MINIMA
+        while True:
+            if self._usado and time.time() - self._t_lote >= self.edad_maxima:
+                self.cerrar_lote()
+            if not (self._ram or self._flash) or not self.red.conectada():
+                await asyncio.sleep_ms(1000)
+                continue
+            if not await self._enviar_siguiente():
+                await asyncio.sleep_ms(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA)
+                continue
+            espera = ESPERA_MINIMA
@@ -0,0 +1,83 @@
+"""
+Demanda de agua estimada con el DHT11 (evapotranspiración).
+
+Sin radiación ni viento solo quedan temperatura y humedad del aire, que
+es lo que usa la fórmula de Romanenko:
+
+    ET (mm/día) = 0.0018 * (25 + T)² * (100 - HR) / 30
+
+Cada lectura se suma a dos medias móviles exponenciales en el tiempo,
+una corta (1 hora) y una larga (4 horas): una cuenta y dos exp() por
+muestra, sin guardar el historial. Con una subida pareja la corta queda
+adelante de la larga, y la diferencia da la tendencia; proyectándola
+`horizonte` segundos se afloja ya al caer la tarde y no recién de noche.
+
+demanda() = ET proyectada / referencia, acotada entre minimo y maximo:
+1 es un día típico y menos de 1 deja regar después (ver
+riego.actualizar_et).
+"""
+import math
+
+
+def tasa(temp, hum):
+    """ET de referencia en mm/día (Romanenko) para temp en °C y hum en %."""
+    return 0.0018 * (25 + temp) ** 2 * max(0, 100 - hum) / 30
+
+
+class Evapotranspiracion:
+    def __init__(self, referencia=4, corto_s=3600, largo_s=14400, horizonte_s=3600,
+                 minimo=0.5, maximo=1.5):
+        self.referencia = referencia    # mm/día de un día típico (demanda = 1)
+        self.corto_s = corto_s
+        self.largo_s = largo_s
+        self.horizonte_s = horizonte_s
+        self.minimo = minimo
+        self.maximo = maximo
+        self.corto = None               # mm/día, media de la última hora
+        self.largo = None               # mm/día, media de las últimas 4 horas
+        self._t = None                  # time.time() de la última lectura
+
+    def observar(self, t, temp, hum):
+        """Suma una lectura del DHT11 (se ignora si falta alguno de los dos)."""
+        if temp is None or hum is None:
+            return
+        et = tasa(temp, hum)
+        if self._t is None or t - self._t > self.largo_s:
+            # Primera lectura o un hueco largo: se empieza de nuevo
+            self.corto = self.largo = et
+        elif t > self._t:
+            dt = t - self._t
+            self.corto += (et - self.corto) * (1 - math.exp(-dt / self.corto_s))
+            self.largo += (et - self.largo) * (1 - math.exp(-dt / self.largo_s))
+        else:
+            return
+        self._t = t
+
+    def proyectada(self):
+        """
+        ET esperada dentro de `horizonte` segundos (None sin datos). Con
+        una rampa de pendiente p la corta atrasa corto_s * p y la larga
+        largo_s * p, así que p = (corto - largo) / (largo_s - corto_s).
+        """
+        if self.corto is None:
+            return None
+        pendiente = (self.corto - self.largo) / (self.largo_s - self.corto_s)
+        return max(0.0, self.corto + pendiente * (self.corto_s + self.horizonte_s))
+
+    def demanda(self):
+        p = self.proyectada()
+        if p is None:
+            return None
+        return min(max(p / self.referencia, self.minimo), self.maximo)
+
+    def estado(self):
+        """(t, corto, largo), para seguir después de un deepsleep (0 = sin datos)."""
+        if self._t is None:
+            return 0, 0.0, 0.0
+        return self._t, self.corto, self.largo
+
+    def restaurar(self, t, corto, largo):
+        if t:
+            self._t = t
+            self.corto = corto
+            self.largo = largo
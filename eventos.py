@@ -0,0 +1,86 @@
+"""
+Server-Sent Events: el dashboard abre /events una sola vez y el ESP32 le
+empuja cada lectura nueva, en lugar de un fetch("/data") por cliente cada
+3 segundos (conexión TCP, headers y cierre en cada uno).
+
+Cada mensaje se arma una sola vez y se manda igual a todos los
+suscriptores. La cantidad de suscriptores está acotada y el que no
+alcanza a recibir dentro de TIMEOUT se desconecta, así un cliente lento
+no frena al resto.
+"""
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+
+class Difusor:
+    def __init__(self, maximo=4, timeout=2):
+        self.maximo = maximo
+        self.timeout = timeout  # segundos para que un cliente acepte un mensaje
+        self.clientes = []
+        self._mensaje = None
+        self._nuevo = asyncio.Event()
+
+    def hay_clientes(self):
+        return len(self.clientes) > 0
+
+    def publicar(self, datos):
+        """
+        Encola `datos` (JSON en bytes o una vista de un BufferJSON) para todos
+        los suscriptores. Se copia una sola vez, el buffer de origen queda libre.
+        """
+        self._mensaje = b'data: ' + bytes(datos) + b'\n\n'
+        self._nuevo.set()
+
+    async def atender(self, reader, writer):
+        """
+        Suscribe al cliente y se queda esperando hasta que se desconecte.
+        Si ya hay `maximo` suscriptores responde 503 para que el navegador
+        vuelva a consultar /data.
+        """
+        if len(self.clientes) >= self.maximo:
+            writer.write(b'HTTP/1.1 503 Service Unavailable\r\n'
+                         b'Retry-After: 30\r\n'
+                         b'Connection: close\r\n\r\n')
+            await writer.drain()
+            return
+        writer.write(b'HTTP/1.1 200 OK\r\n'
+                     b'Content-Type: text/event-stream\r\n'
+                     b'Cache-Control: no-store\r\n'
+                     b'Connection: keep-alive\r\n\r\n')
+        if self._mensaje is not None:
+            writer.write(self._mensaje)
+        await writer.drain()
+        self.clientes.append(writer)
+        try:
+            # El cliente no manda nada más: read() vuelve vacío al cerrarse
+            while writer in self.clientes:
+                if not await reader.read(64):
+                    break
+        except Exception:
+            pass
+        finally:
+            self._quitar(writer)
+
+    def _quitar(self, writer):
+        if writer in self.clientes:
+            self.clientes.remove(writer)
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def tarea(self):
+        """Reparte cada mensaje publicado a todos los suscriptores."""
+        while True:
+            await self._nuevo.wait()
+            self._nuevo.clear()
+            mensaje = self._mensaje
+            for writer in list(self.clientes):
+                try:
+                    writer.write(mensaje)
+                    await asyncio.wait_for(writer.drain(), self.timeout)
+                except Exception:
+                    # Lento o desconectado: se lo saca para no frenar a los demás
+                    self._quitar(writer)
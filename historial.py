@@ -0,0 +1,225 @@
+"""
+Historial de lecturas en buffers circulares de tamaño fijo.
+
+Cada campo se guarda en su propio array compacto (no dicts ni tuplas), así
+la memoria ocupada se conoce de antemano y no crece con el tiempo.
+
+Hay dos tipos de nivel:
+ - Historial: muestras crudas, 9 bytes por muestra
+   (4 tiempo + 1 suelo + 2 temp + 2 hum).
+ - Resumen: un registro por intervalo fijo (1 minuto, 1 hora...) con
+   cantidad, mínimo, máximo y suma de cada campo, 34 bytes por registro.
+   Se actualiza en O(1) por muestra con acumuladores.
+
+Las consultas largas ("últimos 7 días") usan el nivel más grueso que
+alcance la resolución pedida en vez de recorrer miles de muestras crudas.
+"""
+import time
+from array import array
+from peticiones import encabezado
+
+# Valor guardado cuando el DHT11 no tiene lectura (temp/hum = None)
+SIN_DATO = -32768
+
+# Índice de cada campo en las consultas
+SUELO = 0
+TEMP = 1
+HUM = 2
+
+BYTES_POR_MUESTRA = 9
+BYTES_POR_RESUMEN = 4 + 3 * (2 + 2 + 2 + 4)
+
+# Agregados que se pueden pedir a un Resumen
+PROMEDIO = 'mean'
+MINIMO = 'min'
+MAXIMO = 'max'
+
+
+class _Anillo:
+    """Lógica común del buffer circular: tiempos, índices y búsqueda."""
+
+    def __init__(self, capacidad, resolucion):
+        self.capacidad = capacidad
+        self.resolucion = resolucion  # segundos entre registros
+        self.t = array('I', bytes(4 * capacidad))  # segundos (time.time())
+        self.inicio = 0  # índice del registro más viejo
+        self.n = 0       # cantidad de registros guardados
+
+    def __len__(self):
+        return self.n
+
+    def _siguiente(self):
+        """Índice donde escribir el próximo registro, pisando el más viejo si está lleno."""
+        if self.n < self.capacidad:
+            i = (self.inicio + self.n) % self.capacidad
+            self.n += 1
+        else:
+            i = self.inicio
+            self.inicio = (self.inicio + 1) % self.capacidad
+        return i
+
+    def indice(self, k):
+        """Posición en los arrays del k-ésimo registro (0 = el más viejo)."""
+        return (self.inicio + k) % self.capacidad
+
+    def buscar(self, desde):
+        """Primer registro (orden lógico) con tiempo >= desde. Búsqueda binaria."""
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.t[self.indice(mid)] < desde:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def recorrer(self, desde=0, paso=0):
+        """
+        Genera los índices de los registros con tiempo >= desde, tomando a lo
+        sumo uno cada `paso` segundos (paso=0 devuelve todos).
+        """
+        proximo = desde
+        for k in range(self.buscar(desde), self.n):
+            i = self.indice(k)
+            t = self.t[i]
+            if t >= proximo:
+                yield i
+                proximo = t + paso if paso > 0 else t
+
+    def ultimo_tiempo(self):
+        if self.n == 0:
+            return 0
+        return self.t[self.indice(self.n - 1)]
+
+
+class Historial(_Anillo):
+    def __init__(self, capacidad, resolucion):
+        super().__init__(capacidad, resolucion)
+        self.suelo = array('B', bytes(capacidad))      # % de humedad del suelo
+        self.temp = array('h', bytes(2 * capacidad))   # °C
+        self.hum = array('h', bytes(2 * capacidad))    # % de humedad ambiente
+
+    def agregar(self, t, suelo, temp, hum):
+        i = self._siguiente()
+        self.t[i] = t
+        self.suelo[i] = suelo
+        self.temp[i] = SIN_DATO if temp is None else temp
+        self.hum[i] = SIN_DATO if hum is None else hum
+
+    def valor(self, i, campo, agregado=PROMEDIO):
+        # Una muestra cruda es su propio mínimo, máximo y promedio
+        if campo == SUELO:
+            return self.suelo[i]
+        if campo == TEMP:
+            return self.temp[i]
+        return self.hum[i]
+
+
+class Resumen(_Anillo):
+    """Registros de cantidad/mínimo/máximo/suma por intervalo de `resolucion` segundos."""
+
+    def __init__(self, capacidad, resolucion):
+        super().__init__(capacidad, resolucion)
+        # Un array por campo (suelo, temp, hum) y por agregado
+        self.cant = [array('H', bytes(2 * capacidad)) for _ in range(3)]
+        self.minimo = [array('h', bytes(2 * capacidad)) for _ in range(3)]
+        self.maximo = [array('h', bytes(2 * capacidad)) for _ in range(3)]
+        self.suma = [array('i', bytes(4 * capacidad)) for _ in range(3)]
+        # Acumuladores del intervalo en curso
+        self._intervalo = -1
+        self._cant = [0, 0, 0]
+        self._min = [0, 0, 0]
+        self._max = [0, 0, 0]
+        self._suma = [0, 0, 0]
+
+    def agregar(self, t, suelo, temp, hum):
+        intervalo = t - t % self.resolucion
+        if intervalo != self._intervalo:
+            if self._intervalo >= 0:
+                self._volcar()
+            self._intervalo = intervalo
+            self._cant[SUELO] = self._cant[TEMP] = self._cant[HUM] = 0
+        self._acumular(SUELO, suelo)
+        self._acumular(TEMP, temp)
+        self._acumular(HUM, hum)
+
+    def _acumular(self, campo, v):
+        if v is None:
+            return
+        if self._cant[campo] == 0:
+            self._min[campo] = self._max[campo] = v
+            self._suma[campo] = 0
+        elif v < self._min[campo]:
+            self._min[campo] = v
+        elif v > self._max[campo]:
+            self._max[campo] = v
+        self._cant[campo] += 1
+        self._suma[campo] += v
+
+    def _volcar(self):
+        """Guarda el intervalo terminado como un registro del buffer."""
+        i = self._siguiente()
+        self.t[i] = self._intervalo
+        for c in (SUELO, TEMP, HUM):
+            self.cant[c][i] = self._cant[c]
+            self.minimo[c][i] = self._min[c]
+            self.maximo[c][i] = self._max[c]
+            self.suma[c][i] = self._suma[c]
+
+    def valor(self, i, campo, agregado=PROMEDIO):
+        n = self.cant[campo][i]
+        if n == 0:
+            return SIN_DATO
+        if agregado == MINIMO:
+            return self.minimo[campo][i]
+        if agregado == MAXIMO:
+            return self.maximo[campo][i]
+        return (self.suma[campo][i] + n // 2) // n
+
+
+def elegir_nivel(niveles, paso):
+    """
+    Devuelve el nivel más grueso cuya resolución alcanza para `paso` segundos.
+    `niveles` va del más fino (muestras crudas) al más grueso.
+    """
+    for nivel in reversed(niveles):
+        if nivel.resolucion <= paso:
+            return nivel
+    return niveles[0]
+
+
+# Lo máximo que ocupa una fila: [4294967295, -32768, -32768, -32768],
+TAM_FILA = 48
+
+
+async def enviar(writer, salida, nivel, desde, paso, agregado=PROMEDIO):
+    """
+    Envía por `writer` el JSON
+        {"ahora": t, "resolucion": s, "muestras": [[t, suelo, temp, hum], ...]}
+    escribiendo las filas en `salida` (un codificador.BufferJSON) y
+    volcándolo cada vez que se llena, sin armar la respuesta entera en RAM.
+    Como no se conoce el largo de antemano, la conexión se cierra al terminar.
+    """
+    writer.write(encabezado(200, 'application/json', extra='Cache-Control: no-store\r\n').encode())
+    salida.reiniciar()
+    salida.crudo(b'{"ahora": ')
+    salida.entero(int(time.time()))
+    salida.crudo(b', "resolucion": ')
+    salida.entero(nivel.resolucion)
+    salida.crudo(b', "muestras": [')
+    primera = True
+    for i in nivel.recorrer(desde, paso):
+        if salida.libre() < TAM_FILA:
+            await salida.volcar(writer)
+        salida.crudo(b'[' if primera else b', [')
+        salida.entero(nivel.t[i])
+        salida.crudo(b', ')
+        salida.valor(nivel.valor(i, SUELO, agregado), SIN_DATO)
+        salida.crudo(b', ')
+        salida.valor(nivel.valor(i, TEMP, agregado), SIN_DATO)
+        salida.crudo(b', ')
+        salida.valor(nivel.valor(i, HUM, agregado), SIN_DATO)
+        salida.crudo(b']')
+        primera = False
+    salida.crudo(b']}')
+    await salida.volcar(writer)
@@ -0,0 +1,137 @@
+"""
+Métricas del ESP32 en formato de texto de Prometheus (/metrics).
+
+Contadores e histogramas se actualizan en O(1) desde el código caliente
+(loop de control, lectura de sensores, servidor) con enteros: los tiempos
+se miden en milisegundos o microsegundos con ticks, sin floats. Los
+medidores se calculan recién al exportar, a partir de una función.
+"""
+import gc
+from array import array
+from peticiones import encabezado
+
+_metricas = []
+
+
+class Contador:
+    __slots__ = ('nombre', 'ayuda', 'etiquetas', 'valor')
+    tipo = b'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=''):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.valor = 0
+        _metricas.append(self)
+
+    def sumar(self, n=1):
+        self.valor += n
+
+    def exportar(self, out):
+        _muestra(out, self.nombre, self.etiquetas, self.valor)
+
+
+class Medidor:
+    """
+    Valor que se lee al exportar llamando a `funcion`. Con tipo=b'counter'
+    sirve para exponer un contador que ya se lleva en otro lado.
+    """
+    __slots__ = ('nombre', 'ayuda', 'etiquetas', 'funcion', 'tipo')
+
+    def __init__(self, nombre, ayuda, funcion, etiquetas='', tipo=b'gauge'):
+        self.tipo = tipo
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.funcion = funcion
+        _metricas.append(self)
+
+    def exportar(self, out):
+        v = self.funcion()
+        if v is not None:
+            _muestra(out, self.nombre, self.etiquetas, v)
+
+
+class Histograma:
+    __slots__ = ('nombre', 'ayuda', 'etiquetas', 'limites', 'cuentas', 'suma')
+    tipo = b'histogram'
+
+    def __init__(self, nombre, ayuda, limites, etiquetas=''):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.limites = limites  # tupla creciente de enteros; el último cubo es +Inf
+        self.cuentas = array('I', bytes(4 * (len(limites) + 1)))
+        self.suma = 0
+        _metricas.append(self)
+
+    def observar(self, v):
+        i = 0
+        for limite in self.limites:
+            if v <= limite:
+                break
+            i += 1
+        self.cuentas[i] += 1
+        self.suma += v
+
+    def exportar(self, out):
+        acumulado = 0
+        separador = ',' if self.etiquetas else ''
+        for i in range(len(self.limites)):
+            acumulado += self.cuentas[i]
+            _muestra(out, self.nombre + '_bucket',
+                     '%s%sle="%d"' % (self.etiquetas, separador, self.limites[i]), acumulado)
+        acumulado += self.cuentas[len(self.limites)]
+        _muestra(out, self.nombre + '_bucket', self.etiquetas + separador + 'le="+Inf"', acumulado)
+        _muestra(out, self.nombre + '_sum', self.etiquetas, self.suma)
+        _muestra(out, self.nombre + '_count', self.etiquetas, acumulado)
+
+
+def _muestra(out, nombre, etiquetas, valor):
+    out.crudo(nombre.encode())
+    if etiquetas:
+        out.crudo(b'{')
+        out.crudo(etiquetas.encode())
+        out.crudo(b'}')
+    out.crudo(b' ')
+    out.entero(valor)
+    out.crudo(b'\n')
+
+
+# --- Memoria ---
+gc_colecciones = Contador('gc_colecciones_total', 'gc.collect() hechos por el control')
+if hasattr(gc, 'mem_free'):
+    Medidor('heap_libre_bytes', 'Memoria libre del heap', gc.mem_free)
+    Medidor('heap_usado_bytes', 'Memoria usada del heap', gc.mem_alloc)
+
+
+def recolectar_si_hace_falta(minimo_libre):
+    """Hace gc.collect() si queda menos de `minimo_libre` bytes (y lo cuenta)."""
+    if hasattr(gc, 'mem_free') and gc.mem_free() < minimo_libre:
+        gc.collect()
+        gc_colecciones.sumar()
+
+
+async def enviar(writer, out):
+    """Envía todas las métricas registradas por `writer` usando el buffer `out`."""
+    writer.write(encabezado(200, 'text/plain; version=0.0.4', extra='Cache-Control: no-store\r\n').encode())
+    out.reiniciar()
+    anterior = None
+    for m in _metricas:
+        # Un histograma de hasta ~8 cubos entra en 512 bytes
+        if out.libre() < 512:
+            await out.volcar(writer)
+        # HELP/TYPE una sola vez por nombre (las series con etiquetas van seguidas)
+        if m.nombre != anterior:
+            out.crudo(b'# HELP ')
+            out.crudo(m.nombre.encode())
+            out.crudo(b' ')
+            out.crudo(m.ayuda.encode())
+            out.crudo(b'\n# TYPE ')
+            out.crudo(m.nombre.encode())
+            out.crudo(b' ')
+            out.crudo(m.tipo)
+            out.crudo(b'\n')
+            anterior = m.nombre
+        m.exportar(out)
+    await out.volcar(writer)
@@ -0,0 +1,192 @@
+"""
+Parser HTTP/1.1 incremental para el servidor del ESP32.
+
+Cada conexión lee sobre un bytearray preasignado (no con readline() línea
+por línea) y el mismo buffer se reutiliza para todas las peticiones de esa
+conexión, así funcionan keep-alive y pedidos encadenados (pipelining): lo
+que sobra después de una petición queda en el buffer para la siguiente.
+
+El tamaño del header está acotado por el buffer: si no entra se responde
+431. Las respuestas se mandan con status + headers + cuerpo en un solo
+write(). Cada lector trae además su BufferJSON de salida, así las
+respuestas JSON tampoco reservan memoria por pedido.
+"""
+from codificador import BufferJSON
+
+TAM_BUFFER = 1024  # máximo de request line + headers (+ cuerpo) por petición
+TAM_SALIDA = 768   # buffer para armar las respuestas JSON (riego.py lo agranda según las zonas)
+
+ESTADOS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado):
+        super().__init__(estado)
+        self.estado = estado
+
+
+def encabezado(estado, tipo=None, largo=None, extra='', keep_alive=False):
+    """Arma la línea de estado y los headers (str terminado en línea vacía)."""
+    h = 'HTTP/1.1 %d %s\r\n' % (estado, ESTADOS.get(estado, ''))
+    if tipo:
+        h += 'Content-Type: %s\r\n' % tipo
+    if largo is not None:
+        h += 'Content-Length: %d\r\n' % largo
+    return h + extra + ('Connection: keep-alive\r\n\r\n' if keep_alive else 'Connection: close\r\n\r\n')
+
+
+def responder(writer, estado, tipo, cuerpo, extra='', keep_alive=False):
+    """
+    Escribe la respuesta completa (hay que hacer drain después). Si el cuerpo
+    es str/bytes va en un solo write; si es una vista sobre un BufferJSON se
+    escribe aparte para no copiarlo.
+    """
+    if isinstance(cuerpo, str):
+        cuerpo = cuerpo.encode()
+    h = encabezado(estado, tipo, len(cuerpo), extra, keep_alive).encode()
+    if isinstance(cuerpo, bytes):
+        writer.write(h + cuerpo)
+    else:
+        writer.write(h)
+        writer.write(cuerpo)
+
+
+class LectorHTTP:
+    """Estado de lectura de una conexión; después de leer() tiene los datos de la petición."""
+
+    def __init__(self, tam=TAM_BUFFER):
+        self.buf = bytearray(tam)
+        self.mv = memoryview(self.buf)
+        self.salida = BufferJSON(TAM_SALIDA)
+        self.tarea = None      # tarea que atiende la conexión (para desalojarla)
+        self.esperando = None  # ticks_ms desde que espera una petición (None = atendiendo)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Deja el lector listo para una conexión nueva (el buffer se reutiliza)."""
+        self.ini = 0    # comienzo de lo todavía no procesado
+        self.fin = 0    # fin de lo recibido
+        self._visto = 0  # hasta dónde ya se buscó el fin del header
+        self.metodo = ''
+        self.path = '/'
+        self.version = ''
+        self.keep_alive = False
+        self.if_none_match = None
+        self.accept_encoding = ''
+        self.largo = 0
+        self.cuerpo = b''
+
+    async def _recibir(self, reader):
+        if self.fin == len(self.buf):
+            if self.ini == 0:
+                raise ErrorHTTP(431)
+            # Corremos lo pendiente al principio del buffer
+            n = self.fin - self.ini
+            self.buf[:n] = bytes(self.mv[self.ini:self.fin])
+            self._visto -= self.ini
+            self.ini, self.fin = 0, n
+        if hasattr(reader, 'readinto'):
+            n = await reader.readinto(self.mv[self.fin:])
+        else:
+            datos = await reader.read(len(self.buf) - self.fin)
+            n = len(datos)
+            self.buf[self.fin:self.fin + n] = datos
+        self.fin += n
+        return n
+
+    def _fin_header(self):
+        """Posición siguiente al \\r\\n\\r\\n del header, o -1 si todavía no llegó."""
+        b = self.buf
+        i = max(self._visto, self.ini + 3)
+        while i < self.fin:
+            if b[i] == 10 and b[i - 1] == 13 and b[i - 2] == 10 and b[i - 3] == 13:
+                return i + 1
+            i += 1
+        self._visto = i
+        return -1
+
+    async def leer(self, reader):
+        """
+        Lee la próxima petición de la conexión. Devuelve False si el cliente
+        cerró; lanza ErrorHTTP si la petición es inválida o no entra.
+        """
+        while True:
+            fin = self._fin_header()
+            if fin >= 0:
+                break
+            if not await self._recibir(reader):
+                return False
+        self._parsear(self.ini, fin - 2)
+        self.ini = self._visto = fin
+
+        self.cuerpo = b''
+        if self.largo:
+            if self.largo > len(self.buf):
+                raise ErrorHTTP(413)
+            while self.fin - self.ini < self.largo:
+                if not await self._recibir(reader):
+                    return False
+            self.cuerpo = bytes(self.mv[self.ini:self.ini + self.largo])
+            self.ini += self.largo
+            self._visto = self.ini
+        if self.ini == self.fin:
+            self.ini = self.fin = self._visto = 0
+        return True
+
+    def _parsear(self, a, fin):
+        b = self.buf
+        lineas = []
+        # Separamos las líneas buscando \r\n (sin readline ni split del bloque entero)
+        i = a
+        while i < fin:
+            j = i
+            while j < fin and b[j] != 13:
+                j += 1
+            lineas.append((i, j))
+            i = j + 2
+        if not lineas:
+            raise ErrorHTTP(400)
+
+        partes = bytes(self.mv[lineas[0][0]:lineas[0][1]]).decode().split(' ')
+        if len(partes) != 3:
+            raise ErrorHTTP(400)
+        self.metodo, self.path, self.version = partes
+        # HTTP/1.1 es keep-alive por defecto; HTTP/1.0 solo si lo pide
+        self.keep_alive = self.version == 'HTTP/1.1'
+        self.if_none_match = None
+        self.accept_encoding = ''
+        self.largo = 0
+
+        for k in range(1, len(lineas)):
+            i, j = lineas[k]
+            c = i
+            while c < j and b[c] != 58:  # ':'
+                c += 1
+            nombre = bytes(self.mv[i:c]).lower()
+            if nombre == b'connection':
+                valor = bytes(self.mv[c + 1:j]).strip().lower()
+                self.keep_alive = valor == b'keep-alive' or (self.keep_alive and valor != b'close')
+            elif nombre == b'if-none-match':
+                self.if_none_match = bytes(self.mv[c + 1:j]).strip().decode()
+            elif nombre == b'accept-encoding':
+                self.accept_encoding = bytes(self.mv[c + 1:j]).decode()
+            elif nombre == b'content-length':
+                # Solo dígitos: un largo negativo correría el cursor para atrás
+                # y la misma petición se volvería a leer para siempre
+                try:
+                    valor = bytes(self.mv[c + 1:j]).strip().decode()
+                    if not valor.isdigit():
+                        raise ValueError(valor)
+                    self.largo = int(valor)
+                except ValueError:
+                    raise ErrorHTTP(400)
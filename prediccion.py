@@ -0,0 +1,106 @@
+"""
+Modelo en línea del suelo de una zona, para regar antes y sin pasarse.
+
+ - Secado: mínimos cuadrados con olvido exponencial sobre (tiempo, humedad)
+   mientras la bomba está apagada. La pendiente da cuántos puntos de humedad
+   por hora pierde el suelo; con eso se predice cuándo va a cruzar el umbral.
+ - Respuesta: después de cada riego se espera VENTANA segundos (el agua
+   tarda en llegar al sensor) y se mide cuánto subió por segundo de bomba.
+   Con eso se calcula el pulso justo para llegar al objetivo.
+
+Cada zona guarda solo un puñado de números: memoria y tiempo acotados.
+Las sumas van en float de 32 bits: el tiempo se cuenta desde la primera
+muestra de la recta y se vuelve a centrar cada MAX_HORAS, si no con
+x ≈ 5e5 h (segundos desde 1970) x² se come la pendiente.
+"""
+
+MAX_HORAS = 24  # se corre el origen de la recta cuando x pasa esto
+
+
+class Modelo:
+    __slots__ = ('olvido', 'ventana', '_t0', '_sw', '_sx', '_sy', '_sxx', '_sxy',
+                 'ganancia', 'respuestas', '_h_inicio', '_ms', '_fin', '_pico')
+
+    def __init__(self, ventana=900, olvido=0.999):
+        self.olvido = olvido      # por muestra; 0.999 a 10 s ≈ las últimas 3 horas
+        self.ventana = ventana    # segundos que se espera la respuesta a un riego
+        self.ganancia = 0.0       # % de humedad por segundo de bomba
+        self.respuestas = 0       # riegos medidos
+        self._fin = None          # tiempo del último apagado mientras se mide la respuesta
+        self._h_inicio = 0
+        self._ms = 0
+        self._pico = 0
+        self.reiniciar_secado()
+
+    def reiniciar_secado(self, t=None):
+        # Un riego corta la tendencia: se empieza una recta nueva (con
+        # t=None el origen es la primera muestra que llegue)
+        self._t0 = t
+        self._sw = self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def inicio_pulso(self, h):
+        self._h_inicio = h
+
+    def fin_pulso(self, t, ms):
+        self._fin = t
+        self._ms = ms
+        self._pico = self._h_inicio
+
+    def observar(self, t, h, encendida):
+        """Suma una muestra de humedad `h` (%) tomada en `t` (segundos)."""
+        if encendida:
+            return
+        if self._fin is not None:
+            # Midiendo la respuesta al último riego: nos quedamos con el pico
+            if h > self._pico:
+                self._pico = h
+            if t - self._fin >= self.ventana:
+                if self._ms > 0:
+                    g = (self._pico - self._h_inicio) * 1000 / self._ms
+                    if g > 0:
+                        self.ganancia = g if self.respuestas == 0 else self.ganancia + (g - self.ganancia) * 0.3
+                        self.respuestas += 1
+                self._fin = None
+                self.reiniciar_secado(t)
+            return
+        if self._t0 is None:
+            self._t0 = t
+        x = (t - self._t0) / 3600  # horas
+        if x > MAX_HORAS:
+            self._mover_origen(x)
+            x = 0.0
+        f = self.olvido
+        self._sw = f * self._sw + 1
+        self._sx = f * self._sx + x
+        self._sy = f * self._sy + h
+        self._sxx = f * self._sxx + x * x
+        self._sxy = f * self._sxy + x * h
+
+    def _mover_origen(self, d):
+        # Las mismas sumas con x - d: la pendiente no cambia
+        self._t0 += d * 3600
+        self._sxx -= 2 * d * self._sx - d * d * self._sw
+        self._sxy -= d * self._sy
+        self._sx -= d * self._sw
+
+    def secado(self):
+        """Puntos de humedad que pierde por hora (None si todavía no hay datos)."""
+        if self._sw < 30:
+            return None
+        det = self._sw * self._sxx - self._sx * self._sx
+        if det <= 1e-9:
+            return None
+        return -(self._sw * self._sxy - self._sx * self._sy) / det
+
+    def segundos_hasta(self, h, umbral):
+        """Segundos estimados hasta que la humedad baje a `umbral` (None si no se seca)."""
+        s = self.secado()
+        if s is None or s <= 0.01:
+            return None
+        return max(0, int((h - umbral) / s * 3600))
+
+    def pulso_ms(self, h, objetivo):
+        """Milisegundos de bomba para subir de `h` a `objetivo` (None si no hay datos)."""
+        if not self.respuestas or self.ganancia <= 0:
+            return None
+        return int((objetivo - h) / self.ganancia * 1000)
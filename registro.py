@@ -0,0 +1,176 @@
+"""
+Registro binario de lecturas y eventos de la bomba en la flash.
+
+Cada registro ocupa TAM_REGISTRO bytes fijos (struct '<IBBhhH'):
+    tiempo (s), tipo, suelo (%), temp (°C), hum (%), extra
+Para BOMBA_OFF, `extra` guarda cuántos milisegundos estuvo encendida.
+El byte de tipo lleva el número de zona en los 4 bits altos (ver tipo()).
+
+Los registros se juntan en un buffer en RAM y se escriben de a una página
+completa (o cada tanto, ver volcar()) para gastar menos la flash y no
+bloquear el loop con escrituras chicas. Los archivos se rotan en
+segmentos de tamaño fijo y se borra el más viejo al pasar el límite.
+
+El índice de segmentos (número y tiempo del primer registro de cada uno)
+se arma al abrir leyendo solo 4 bytes por archivo, así reproducir() salta
+directo a los segmentos que importan.
+"""
+import os
+import struct
+from historial import SIN_DATO
+
+FORMATO = '<IBBhhH'
+TAM_REGISTRO = struct.calcsize(FORMATO)
+
+# Tipos de registro
+MUESTRA = 0
+BOMBA_ON = 1
+BOMBA_OFF = 2
+
+
+def tipo(t, zona):
+    """Combina el tipo de registro con el número de zona (0-15)."""
+    return t | (zona << 4)
+
+
+class Registro:
+    def __init__(self, directorio='log', tam_pagina=4096, tam_segmento=65536, max_segmentos=8):
+        self.directorio = directorio
+        self.tam_segmento = tam_segmento - tam_segmento % TAM_REGISTRO
+        self.max_segmentos = max_segmentos
+        self._buf = bytearray(tam_pagina - tam_pagina % TAM_REGISTRO)
+        self._usado = 0
+        # Índice de segmentos: listas paralelas, del más viejo al más nuevo
+        self.segmentos = []
+        self.inicios = []
+        self._tam_actual = 0
+        self._abrir()
+
+    def _ruta(self, n):
+        return '%s/seg%05d.bin' % (self.directorio, n)
+
+    def _abrir(self):
+        try:
+            nombres = os.listdir(self.directorio)
+        except OSError:
+            os.mkdir(self.directorio)
+            nombres = []
+        numeros = []
+        for nombre in nombres:
+            if nombre.startswith('seg') and nombre.endswith('.bin'):
+                numeros.append(int(nombre[3:-4]))
+        numeros.sort()
+        cabecera = bytearray(4)
+        for n in numeros:
+            with open(self._ruta(n), 'rb') as f:
+                completo = f.readinto(cabecera) == 4
+            if not completo:
+                # Corte de luz al crear el segmento: no llegó a tener ni un
+                # tiempo. Se borra; si se volviera a abrir con 'ab' todo lo
+                # que siguiera quedaría corrido
+                try:
+                    os.remove(self._ruta(n))
+                except OSError:
+                    pass
+                continue
+            self.segmentos.append(n)
+            self.inicios.append(struct.unpack_from('<I', cabecera)[0])
+        # Los segmentos nuevos van después del número más alto en la flash
+        self._proximo = numeros[-1] + 1 if numeros else 0
+        if self.segmentos:
+            tam = os.stat(self._ruta(self.segmentos[-1]))[6]
+            # Si un corte de luz dejó un registro a medias, seguimos en un segmento nuevo
+            self._tam_actual = tam if tam % TAM_REGISTRO == 0 else self.tam_segmento
+
+    def agregar(self, t, tipo, suelo=0, temp=None, hum=None, extra=0):
+        if self._usado == len(self._buf):
+            self.volcar()  # quedó lleno porque falló la escritura anterior
+        struct.pack_into(FORMATO, self._buf, self._usado, t, tipo, suelo,
+                         SIN_DATO if temp is None else temp,
+                         SIN_DATO if hum is None else hum,
+                         min(extra, 0xFFFF))
+        self._usado += TAM_REGISTRO
+        if self._usado == len(self._buf):
+            self.volcar()
+
+    def volcar(self):
+        """Escribe en la flash lo que haya en el buffer de RAM."""
+        if not self._usado:
+            return
+        if not self.segmentos or self._tam_actual + self._usado > self.tam_segmento:
+            self._rotar()
+        ruta = self._ruta(self.segmentos[-1])
+        try:
+            with open(ruta, 'ab') as f:
+                f.write(memoryview(self._buf)[:self._usado])
+        except OSError:
+            # El buffer queda para el próximo intento; si el segmento quedó
+            # con un registro a medias, lo que siga va a uno nuevo
+            try:
+                tam = os.stat(ruta)[6]
+                self._tam_actual = tam if tam % TAM_REGISTRO == 0 else self.tam_segmento
+            except OSError:
+                pass  # ni llegó a crearse
+            raise
+        self._tam_actual += self._usado
+        self._usado = 0
+
+    def _rotar(self):
+        n = self._proximo
+        self._proximo += 1
+        self.segmentos.append(n)
+        self.inicios.append(struct.unpack_from('<I', self._buf)[0])
+        self._tam_actual = 0
+        while len(self.segmentos) > self.max_segmentos:
+            try:
+                os.remove(self._ruta(self.segmentos[0]))
+            except OSError:
+                pass
+            self.segmentos.pop(0)
+            self.inicios.pop(0)
+
+    def ultimo_tiempo(self):
+        """Tiempo del último registro guardado (0 si no hay ninguno)."""
+        if self._usado:
+            return struct.unpack_from('<I', self._buf, self._usado - TAM_REGISTRO)[0]
+        # El segmento más nuevo puede tener solo un registro a medias
+        # (corte de luz): entonces vale el último completo del anterior
+        for n in reversed(self.segmentos):
+            ruta = self._ruta(n)
+            try:
+                tam = os.stat(ruta)[6] // TAM_REGISTRO * TAM_REGISTRO
+            except OSError:
+                continue  # falló la escritura antes de crearlo
+            if tam:
+                with open(ruta, 'rb') as f:
+                    f.seek(tam - TAM_REGISTRO)
+                    return struct.unpack('<I', f.read(4))[0]
+        return 0
+
+    def reproducir(self, desde=0):
+        """
+        Genera (t, tipo, suelo, temp, hum, extra) de todos los registros con
+        t >= desde, en orden. temp/hum valen SIN_DATO si no había lectura.
+        """
+        bloque = bytearray(TAM_REGISTRO * 64)
+        for k in range(len(self.segmentos)):
+            # El segmento siguiente ya empieza antes de `desde`: este no hace falta
+            if k + 1 < len(self.segmentos) and self.inicios[k + 1] <= desde:
+                continue
+            try:
+                f = open(self._ruta(self.segmentos[k]), 'rb')
+            except OSError:
+                continue  # falló la escritura antes de crearlo
+            with f:
+                while True:
+                    n = f.readinto(bloque)
+                    if not n:
+                        break
+                    for pos in range(0, n - n % TAM_REGISTRO, TAM_REGISTRO):
+                        r = struct.unpack_from(FORMATO, bloque, pos)
+                        if r[0] >= desde:
+                            yield r
+        for pos in range(0, self._usado, TAM_REGISTRO):
+            r = struct.unpack_from(FORMATO, self._buf, pos)
+            if r[0] >= desde:
+                yield r
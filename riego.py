@@ -0,0 +1,1303 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+from machine import Pin
+import dht
+import time
+import json
+import socket
+import struct
+from machine import ADC
+from machine import RTC
+from machine import unique_id
+from machine import deepsleep, lightsleep
+try:
+    import ntptime  # solo se usan ntptime.host y ntptime.NTP_DELTA (ver hora_ntp)
+except ImportError:
+    ntptime = None  # firmware sin ntptime: el colector corrige la hora con X-Time
+import assets
+import historial
+import registro
+import suelo
+import calibracion
+import zonas
+import eventos
+import peticiones
+import codificador
+import metricas
+import bitacora
+import consumo
+import prediccion
+import wifi
+import ajustes
+import envio
+import bajo_consumo
+import evapotranspiracion
+from metricas import Contador, Medidor, Histograma
+
+# --- Variables de control de la bomba ---
+MAX_TIEMPO_BOMBA = 8000  # Tiempo máximo de encendido en milisegundos (8 segundos)
+MIN_TIEMPO_BOMBA = 3000  # tiempo mínimo en milisegundos (3 segundos)
+MIN_TIEMPO_APAGADA = 60000  # espera mínima entre riegos de una zona (1 minuto)
+# --- Agua ---
+CAUDAL_ML_S = 25               # caudal de la bomba en ml por segundo (medilo con un vaso)
+PRESUPUESTO_DIARIO_ML = 5000   # tope de agua en 24 horas para todas las zonas
+consumo_bomba = consumo.Consumo(CAUDAL_ML_S, PRESUPUESTO_DIARIO_ML)
+# --- Wi-Fi (ver wifi.py): se conecta en segundo plano, el riego no la espera ---
+WIFI_SSID = 'te'             # Poné tu SSID correcto
+WIFI_PASSWORD = '12345678'   # Poné tu contraseña correcta
+# Si no hay red durante ESPERA_AP segundos se levanta un punto de acceso
+# propio (None para no usarlo); el dashboard queda en http://192.168.4.1
+AP_SSID = 'Riego-ESP32'
+AP_PASSWORD = 'riego1234'    # mínimo 8 caracteres
+ESPERA_AP = 120             # segundos
+red = wifi.ConexionWiFi(WIFI_SSID, WIFI_PASSWORD, AP_SSID, AP_PASSWORD, ESPERA_AP)
+# Variables globales para almacenar los últimos valores (las actualiza tarea_dht)
+last_temp = None
+last_hum = None
+last_read_time = None  # time.time() de la última lectura buena (no ticks: puede fallar días)
+dht_fallas_seguidas = 0   # fallas desde la última lectura buena
+
+# 🚨 Ajustá el pin del DHT11 (ej: 14, 27, etc.)
+PIN_DHT = 14
+sensor = None  # dht.DHT11, se crea en iniciar()
+
+# Límites de humedad del suelo (%)
+LOW_THRESHOLD = 55  # debajo de este valor, se enciende la bomba
+HIGH_THRESHOLD = 75 # por encima de este valor, se apaga la bomba
+
+# --- Riego predictivo (ver prediccion.py) ---
+MODO_PREDICTIVO = True
+OBJETIVO = (LOW_THRESHOLD + HIGH_THRESHOLD) // 2  # % al que apunta cada pulso
+ANTICIPACION = 900     # s: si va a cruzar LOW_THRESHOLD antes de esto, se riega ya
+MARGEN_ANTICIPO = 5    # solo se anticipa por debajo de LOW_THRESHOLD + este margen
+VENTANA_RESPUESTA = 900  # s que tarda el agua en llegar al sensor
+
+# --- Clima (ver evapotranspiracion.py) ---
+# Con la temperatura y la humedad del aire se estima cuánta agua pide el
+# día. Con fresco, aire húmedo o al caer la tarde el umbral de encendido
+# baja hasta MAX_AJUSTE_ET puntos: se saltean riegos y los que quedan
+# llegan al mismo objetivo desde más abajo (menos encendidos). Con calor
+# no se sube: el suelo más húmedo pierde más agua (tools/evaluar_clima.py).
+MODO_ET = True
+ET_REFERENCIA = 4      # mm/día de un día típico: por debajo se baja el umbral
+MAX_AJUSTE_ET = 5      # % que puede bajar el umbral de encendido como mucho
+MAX_ANTIGUEDAD_ET = 120  # s: una lectura del DHT11 más vieja no se usa
+et = evapotranspiracion.Evapotranspiracion(ET_REFERENCIA)
+ajuste_et = 0     # % (0 o negativo) que se suma ahora a LOW_THRESHOLD (ver actualizar_et)
+
+# --- Zonas de riego: (nombre, pin ADC del sensor de suelo, pin del relé) ---
+# 🚨 Agregá una línea por cada cantero. La primera es la zona principal
+# (la que muestra el dashboard y guarda el historial).
+ZONAS = [
+    ('Zona 1', 32, 26),
+]
+# Cuántos relés pueden estar encendidos a la vez (bomba/fuente compartida)
+MAX_RELES_ACTIVOS = 1
+
+# --- Ajustes remotos (/config, ver ajustes.py) ---
+# (clave en /config, variable de riego.py, mínimo, máximo). Los valores de
+# arriba quedan como defecto; lo guardado en ajustes.json manda.
+AJUSTES = (
+    ('low_threshold', 'LOW_THRESHOLD', 0, 100),
+    ('high_threshold', 'HIGH_THRESHOLD', 0, 100),
+    ('min_pump_ms', 'MIN_TIEMPO_BOMBA', 0, 60000),
+    # El registro guarda la duración en 16 bits (hasta 65535 ms, ver
+    # registro.py): 60 s deja lugar para el tick que tarda en cortarla
+    ('max_pump_ms', 'MAX_TIEMPO_BOMBA', 500, 60000),
+    ('min_off_ms', 'MIN_TIEMPO_APAGADA', 0, 86400000),
+    ('flow_ml_s', 'CAUDAL_ML_S', 1, 10000),
+    ('daily_budget_ml', 'PRESUPUESTO_DIARIO_ML', 0, 10000000),
+    ('predictive', 'MODO_PREDICTIVO', 0, 1),
+    ('weather', 'MODO_ET', 0, 1),
+    ('et_reference_mm', 'ET_REFERENCIA', 1, 20),
+    ('et_max_shift', 'MAX_AJUSTE_ET', 0, 20),
+    ('dht_pin', 'PIN_DHT', 0, 39),
+    ('zones', 'ZONAS', 0, 39),
+)
+# Los pines se usan al crear el hardware: cambian recién al reiniciar
+AJUSTES_REINICIO = ('dht_pin', 'zones')
+# Pines del ESP32 que sirven para cada cosa. Los sensores van al ADC1
+# (32-39): el ADC2 no lee con el Wi-Fi prendido. Relés y DHT11 necesitan
+# salida: nada de 34-39 (solo entrada), 6-11 (flash), 1 y 3 (consola) ni
+# 0 y 12 (si quedan en el nivel equivocado la placa no arranca).
+PINES_SUELO = (32, 33, 34, 35, 36, 37, 38, 39)
+PINES_SALIDA = (2, 4, 5, 13, 14, 15, 16, 17, 18, 19, 21, 22, 23, 25, 26, 27, 32, 33)
+MAX_NOMBRE_ZONA = 32  # bytes (el nombre va en /data, ver tam_data)
+
+
+def comprobar_pines(valores):
+    """Que cada pin sirva para lo que se lo usa y ninguno se repita (ver ajustes.Ajustes)."""
+    usados = {valores['dht_pin']: 'dht_pin'}
+    if valores['dht_pin'] not in PINES_SALIDA:
+        raise ajustes.ErrorAjuste('dht_pin: %d no sirve, usá uno de %s' % (valores['dht_pin'], PINES_SALIDA))
+    for nombre, pin_suelo, pin_rele in valores['zones']:
+        if len(nombre.encode()) > MAX_NOMBRE_ZONA:
+            raise ajustes.ErrorAjuste('zones: "%s" pasa de %d bytes' % (nombre, MAX_NOMBRE_ZONA))
+        if pin_suelo not in PINES_SUELO:
+            raise ajustes.ErrorAjuste('zones: el sensor de "%s" tiene que ir al ADC1 (32 a 39)' % nombre)
+        if pin_rele not in PINES_SALIDA:
+            raise ajustes.ErrorAjuste('zones: el relé de "%s" no puede ir al pin %d' % (nombre, pin_rele))
+        for pin in (pin_suelo, pin_rele):
+            if pin in usados:
+                raise ajustes.ErrorAjuste('zones: el pin %d de "%s" ya lo usa %s' % (pin, nombre, usados[pin]))
+            usados[pin] = '"%s"' % nombre
+
+
+config = ajustes.Ajustes([(c, globals()[v], mi, ma) for c, v, mi, ma in AJUSTES],
+                         (('low_threshold', 'high_threshold'), ('min_pump_ms', 'max_pump_ms')),
+                         comprobar=comprobar_pines)
+config_arranque = None  # valores de AJUSTES_REINICIO con los que arrancó
+
+
+def aplicar_ajustes(valores):
+    """
+    Pasa una foto de config.valores a las variables que usa el control.
+    Solo se llama al arrancar y en cada POST /config: el tick de control
+    sigue leyendo variables, sin JSON ni flash.
+    """
+    global OBJETIVO
+    g = globals()
+    for clave, variable, _, _ in AJUSTES:
+        g[variable] = valores[clave]
+    OBJETIVO = (LOW_THRESHOLD + HIGH_THRESHOLD) // 2
+    consumo_bomba.caudal_ml_s = CAUDAL_ML_S
+    consumo_bomba.presupuesto_diario_ml = PRESUPUESTO_DIARIO_ML
+    et.referencia = ET_REFERENCIA
+
+
+def crear_zona(numero, nombre, pin_suelo, pin_rele):
+    adc = ADC(Pin(pin_suelo))
+    adc.atten(ADC.ATTN_11DB)    # rango hasta 3.3V
+    adc.width(ADC.WIDTH_12BIT)  # resolución 12 bits (0-4095)
+    # Seco/húmedo se calibran desde /calibrate (ver calibracion.py)
+    archivo = calibracion.ARCHIVO if numero == 0 else 'calibracion_%d.json' % numero
+    return zonas.Zona(numero, nombre, suelo.SensorSuelo(adc),
+                      calibracion.Calibracion(archivo), Pin(pin_rele, Pin.OUT),
+                      prediccion.Modelo(VENTANA_RESPUESTA))
+
+
+zonas_riego = []  # se llena en iniciar()
+reles_activos = 0
+turno = 0  # zona por la que empieza la próxima ronda (reparto equitativo)
+
+# --- Métricas (/metrics) ---
+m_ciclo = Histograma('riego_ciclo_ms', 'Duracion de cada iteracion del control', (1, 2, 5, 10, 20, 50, 100, 250))
+m_suelo = Histograma('suelo_lectura_us', 'Duracion de la rafaga del sensor de suelo', (250, 500, 1000, 2000, 5000, 10000))
+m_dht = Histograma('dht_lectura_ms', 'Duracion de cada medicion del DHT11', (5, 10, 20, 30, 50, 100))
+m_dht_fallas = Contador('dht_fallas_total', 'Mediciones fallidas del DHT11')
+m_http = Histograma('http_respuesta_ms', 'Tiempo desde la conexion (o la peticion) hasta la respuesta',
+                    (5, 10, 25, 50, 100, 250, 1000))
+m_http_peticiones = Contador('http_peticiones_total', 'Peticiones HTTP atendidas')
+m_http_rechazos = Contador('http_rechazos_total', 'Conexiones rechazadas con 503 por estar lleno')
+m_http_desalojos = Contador('http_desalojos_total', 'Conexiones lentas cortadas para atender otra')
+m_flash_fallas = Contador('registro_fallas_total', 'Escrituras del registro en la flash que fallaron')
+Medidor('agua_24h_ml', 'Agua usada en las ultimas 24 horas', lambda: consumo_bomba.ml_24h)
+Medidor('agua_total_ml', 'Agua usada desde el arranque', lambda: consumo_bomba.ml_total, tipo=b'counter')
+Medidor('clima_et_um_dia', 'Evapotranspiracion estimada (micrometros por dia)',
+        lambda: None if et.corto is None else int(et.corto * 1000))
+Medidor('clima_ajuste_umbral', 'Puntos de humedad que baja el umbral de encendido por el clima', lambda: ajuste_et)
+Medidor('wifi_conectado', 'Conectado a la red del router', lambda: 1 if red.conectada() else 0)
+Medidor('wifi_caidas_total', 'Veces que se perdio el Wi-Fi', lambda: red.caidas, tipo=b'counter')
+Medidor('wifi_errores_total', 'Errores inesperados en la tarea de Wi-Fi', lambda: red.errores, tipo=b'counter')
+MIN_HEAP_LIBRE = 20000  # por debajo de esto el control hace gc.collect()
+# Desde el encendido hasta la primera lectura de suelo (ticks_ms arranca en 0)
+PRESUPUESTO_ARRANQUE_MS = 1500
+arranque_ms = None
+Medidor('arranque_ms', 'Milisegundos desde el encendido hasta la primera lectura',
+        lambda: arranque_ms or 0)
+
+# Ruido (en cuentas del ADC) por debajo del cual alcanza una lectura para encender
+RUIDO_MAXIMO = 60
+# Mientras se calibra el sensor se pausa el control de la bomba
+modo_calibracion = False
+
+
+# --- Historial de lecturas ---
+PERIODO_HISTORIAL = 10  # segundos entre muestras guardadas
+hist = historial.Historial(720, PERIODO_HISTORIAL)  # 2 horas de muestras crudas (~6.5 KB)
+hist_minuto = historial.Resumen(360, 60)            # 6 horas de a 1 minuto (~11.5 KB)
+hist_hora = historial.Resumen(168, 3600)            # 7 días de a 1 hora (~5.4 KB)
+niveles_historial = (hist, hist_minuto, hist_hora)
+
+# --- Registro en la flash (sobrevive a los reinicios) ---
+INTERVALO_VOLCADO = 600  # segundos máximos que un registro espera en RAM
+reg = None  # registro.Registro, se abre en iniciar()
+flash_ok = True  # False desde que falla una escritura hasta que vuelve a andar
+
+# --- Envío a un colector (ver envio.py y central/colector.py) ---
+# None = no se envía nada (los datos quedan para /data, /history y el registro)
+COLECTOR = None  # p. ej. 'http://192.168.0.10:8000/ingest'
+REGISTROS_POR_LOTE = 32   # 12 bytes cada uno
+EDAD_MAXIMA_LOTE = 600    # segundos que un lote a medio llenar espera antes de salir
+cola_envio = None  # envio.Enviador, se crea en iniciar() si hay COLECTOR
+id_equipo = None   # unique_id() en hex: X-Device de los lotes y "device" de /data
+TIMEOUT_NTP = 2000  # ms esperando la respuesta del servidor NTP
+direccion_ntp = None  # se resuelve una vez por arranque (el DNS bloquea el loop)
+
+# --- Bajo consumo (batería o panel solar, ver bajo_consumo.py) ---
+# None = siempre despierto. 'liviano' duerme con lightsleep entre ciclos
+# (la RAM sigue); 'profundo' con deepsleep (la placa arranca de cero en
+# cada despertar y el estado viaja en la memoria del RTC).
+MODO_BAJO_CONSUMO = None
+PERIODO_BAJO_CONSUMO = 60000  # ms entre despertares
+CICLOS_WIFI = 15              # el Wi-Fi se prende uno de cada tantos ciclos
+VENTANA_WIFI = 30000          # ms atendiendo pedidos cada vez que se prende
+# Corriente de la placa en cada estado (mA) para proyectar la batería.
+# Son del módulo ESP32 solo: un DevKit con regulador y chip USB gasta
+# varios mA más dormido. La bomba va con su propia fuente.
+CORRIENTE_DESPIERTO_MA = 40
+CORRIENTE_WIFI_MA = 120
+CORRIENTE_LIVIANO_MA = 0.8
+CORRIENTE_PROFUNDO_MA = 0.01
+BATERIA_MAH = 2500
+estado_rtc = None  # bajo_consumo.EstadoRTC, solo en modo de bajo consumo
+
+
+def corriente_promedio_ma():
+    """Corriente promedio proyectada en modo de bajo consumo (None si no)."""
+    if estado_rtc is None:
+        return None
+    return estado_rtc.corriente_ma(CORRIENTE_DESPIERTO_MA, CORRIENTE_WIFI_MA,
+                                   CORRIENTE_PROFUNDO_MA if MODO_BAJO_CONSUMO == 'profundo'
+                                   else CORRIENTE_LIVIANO_MA)
+
+
+def _ciclo_trabajo_ppm():
+    ciclo = estado_rtc.ciclo_trabajo()
+    return None if ciclo is None else int(ciclo * 1000000)
+
+
+def _corriente_ua():
+    i = corriente_promedio_ma()
+    return None if i is None else int(i * 1000)
+
+
+def registrar(t, tipo, suelo=0, temp=None, hum=None, extra=0):
+    """Guarda un registro en la flash y, si hay colector, lo encola para enviar."""
+    if estado_rtc is not None:
+        # Bajo consumo: espera en la memoria del RTC y pasa a la flash de a muchos
+        if not estado_rtc.agregar(t, tipo, suelo, temp, hum, extra):
+            volcar_rtc()
+            estado_rtc.agregar(t, tipo, suelo, temp, hum, extra)
+        return
+    encolar(t, tipo, suelo, temp, hum, extra)
+    try:
+        reg.agregar(t, tipo, suelo, temp, hum, extra)
+    except OSError as e:
+        falla_flash(e)
+
+
+def encolar(*r):
+    """cola_envio.agregar() sin dejar que una falla de la flash corte el control."""
+    if cola_envio is None:
+        return
+    try:
+        cola_envio.agregar(*r)
+    except OSError as e:
+        falla_flash(e)
+
+
+def guardar_cola():
+    """cola_envio.guardar() antes de apagar o dormir; lo que no entra en la flash se pierde."""
+    if cola_envio is None:
+        return
+    try:
+        cola_envio.guardar()
+    except OSError as e:
+        falla_flash(e)
+
+
+def volcar_registro():
+    """reg.volcar() sin dejar que una falla de la flash corte el control."""
+    global flash_ok
+    try:
+        reg.volcar()
+        flash_ok = True
+    except OSError as e:
+        falla_flash(e)
+
+
+def falla_flash(e):
+    global flash_ok
+    # Se avisa la primera de cada racha: con la flash llena fallaría seguido
+    if flash_ok:
+        bitacora.error("❌ No se pudo escribir en la flash:", e)
+    flash_ok = False
+    m_flash_fallas.sumar()
+
+
+def volcar_rtc():
+    """Pasa las muestras de la memoria del RTC al registro en la flash y al envío."""
+    for r in estado_rtc.registros():
+        encolar(*r)
+        try:
+            reg.agregar(*r)
+        except OSError as e:
+            falla_flash(e)
+    estado_rtc.vaciar()
+    volcar_registro()
+
+
+def crear_hardware():
+    """DHT11 y zonas con los pines vigentes (PIN_DHT, ZONAS)."""
+    global sensor
+    del zonas_riego[:]
+    sensor = dht.DHT11(Pin(PIN_DHT))
+    for i, z in enumerate(ZONAS):
+        zonas_riego.append(crear_zona(i, *z))
+
+def iniciar():
+    """
+    Crea los objetos que tocan el hardware o la flash (DHT11, zonas,
+    registro). Se llama desde Aplicacion.start(), así importar riego no
+    hace nada más que definir cosas. Llamarla de nuevo no hace nada.
+    """
+    global sensor, reg, config_arranque, cola_envio, id_equipo
+    if sensor is not None:
+        return
+    id_equipo = ''.join('%02x' % b for b in unique_id())
+    aplicar_ajustes(config.cargar())
+    try:
+        crear_hardware()
+    except (ValueError, OSError) as e:
+        # Pines guardados que esta placa no acepta: se arranca con los de
+        # riego.py (ajustes.json queda como está, se corrige desde /config)
+        bitacora.error("❌ No se pudo armar el hardware con los pines guardados, uso los de fábrica:", e)
+        config.valores = dict(config.valores, **{c: config.defecto(c) for c in AJUSTES_REINICIO})
+        aplicar_ajustes(config.valores)
+        crear_hardware()
+    config_arranque = [config.valores[c] for c in AJUSTES_REINICIO]
+    # Una serie por zona; las de un mismo nombre tienen que quedar seguidas
+    for nombre, ayuda, campo, tipo in (
+            ('riego_ciclos_total', 'Encendidos de la bomba desde el arranque', 'ciclos', b'counter'),
+            ('riego_encendido_ms_total', 'Tiempo total con la bomba encendida', 'tiempo_total', b'counter'),
+            ('riego_bomba_encendida', 'Estado actual del rele', 'encendida', b'gauge'),
+            ('suelo_humedad_porcentaje', 'Humedad del suelo filtrada', 'humedad', b'gauge')):
+        for z in zonas_riego:
+            Medidor(nombre, ayuda, lambda z=z, c=campo: int(getattr(z, c)), 'zona="%d"' % z.numero, tipo)
+    # Que /data entre entero con estas zonas, en cada lector y en /events
+    tam = tam_data()
+    for out in [l.salida for l in lectores] + [salida_eventos]:
+        out.agrandar(tam)
+    reg = registro.Registro()
+    if COLECTOR:
+        cola_envio = envio.Enviador(COLECTOR, id_equipo, red, REGISTROS_POR_LOTE,
+                                    edad_maxima=EDAD_MAXIMA_LOTE, al_fallar_flash=falla_flash)
+        Medidor('envio_lotes_pendientes', 'Lotes esperando al colector', lambda: cola_envio.pendientes())
+        Medidor('envio_lotes_descartados_total', 'Lotes tirados por falta de lugar',
+                lambda: cola_envio.descartadas, tipo=b'counter')
+
+def read_sensor():
+    """Última lectura buena del DHT11. No toca el sensor: eso lo hace tarea_dht."""
+    return last_temp, last_hum
+
+def medir_dht():
+    """Mide el DHT11 (bloquea unos 20 ms). Devuelve True si la lectura fue buena."""
+    global last_temp, last_hum, last_read_time, dht_fallas_seguidas
+    inicio = time.ticks_ms()
+    try:
+        sensor.measure()
+        last_temp = sensor.temperature()
+        last_hum = sensor.humidity()
+        last_read_time = time.time()
+        dht_fallas_seguidas = 0
+        return True
+    except OSError:
+        # deja los valores anteriores y lo cuenta
+        m_dht_fallas.sumar()
+        dht_fallas_seguidas += 1
+        return False
+    finally:
+        m_dht.observar(time.ticks_diff(time.ticks_ms(), inicio))
+
+def dht_antiguedad():
+    """Segundos desde la última lectura buena del DHT11 (None si nunca hubo)."""
+    if last_read_time is None:
+        return None
+    # Si cambiaron la hora del RTC hacia atrás cuenta como recién leída
+    return max(0, int(time.time() - last_read_time))
+
+def actualizar_et(t):
+    """
+    Suma la última lectura del DHT11 a la estimación de evapotranspiración
+    y recalcula ajuste_et. Se llama con cada muestra del historial, no en
+    cada tick: el control solo suma un entero.
+    """
+    global ajuste_et
+    antiguedad = dht_antiguedad()
+    if antiguedad is not None and antiguedad <= MAX_ANTIGUEDAD_ET:
+        et.observar(t, last_temp, last_hum)
+    demanda = et.demanda() if MODO_ET else None
+    if demanda is None or demanda >= 1:
+        ajuste_et = 0
+    else:
+        ajuste_et = -round(MAX_AJUSTE_ET * (1 - demanda) / (1 - et.minimo))
+
+# Tope del JSON de /data: lo fijo más cada zona, con cada número en hasta
+# 11 caracteres y el nombre escapado entero
+TAM_DATA_BASE = 360
+TAM_DATA_ZONA = 130
+
+
+def tam_data():
+    """Bytes que puede llegar a ocupar /data con las zonas configuradas."""
+    nombre = max(len(z.nombre.encode()) for z in zonas_riego)
+    return TAM_DATA_BASE + len(id_equipo) + len(zonas_riego) * (TAM_DATA_ZONA + 2 * nombre + 2)
+
+def read_sensor_json(out):
+    """
+    Escribe el JSON de /data en `out` (un codificador.BufferJSON) y
+    devuelve la vista con el resultado, sin armar strings intermedios.
+    """
+    temp, hum = read_sensor()
+    # "soil" y "soil_noise" son de la zona principal (los usa el dashboard)
+    principal = zonas_riego[0]
+    out.reiniciar()
+    # El mismo id que manda envio.py en X-Device: la central los junta por él
+    out.crudo(b'{"device": ')
+    out.texto(id_equipo)
+    out.crudo(b', "temp": ')
+    out.valor(temp)
+    out.crudo(b', "hum": ')
+    out.valor(hum)
+    out.crudo(b', "soil": ')
+    out.entero(principal.humedad)
+    out.crudo(b', "soil_noise": ')
+    out.decimal(principal.ruido())
+    out.crudo(b', "dht_age": ')
+    out.valor(dht_antiguedad())
+    out.crudo(b', "dht_failures": ')
+    out.entero(m_dht_fallas.valor)
+    out.crudo(b', "water_24h_ml": ')
+    out.entero(consumo_bomba.ml_24h)
+    out.crudo(b', "water_budget_ml": ')
+    out.entero(consumo_bomba.presupuesto_diario_ml)
+    out.crudo(b', "water_last_ml": ')
+    out.entero(consumo_bomba.ml_ultimo_ciclo)
+    out.crudo(b', "water_total_ml": ')
+    out.entero(consumo_bomba.ml_total)
+    # Evapotranspiración estimada y cuánto baja el umbral de encendido
+    out.crudo(b', "et_mm_day": ')
+    if et.corto is None:
+        out.crudo(b'null')
+    else:
+        out.decimal(et.corto)
+    out.crudo(b', "et_shift": ')
+    out.entero(ajuste_et)
+    out.crudo(b', "zones": [')
+    for z in zonas_riego:
+        out.crudo(b'{"name": ' if z.numero == 0 else b', {"name": ')
+        out.texto(z.nombre)
+        out.crudo(b', "soil": ')
+        out.entero(z.humedad)
+        out.crudo(b', "noise": ')
+        out.decimal(z.ruido())
+        out.crudo(b', "pump": ')
+        out.booleano(z.encendida)
+        # Predicción: segundos hasta necesitar riego y pérdida de humedad por hora
+        out.crudo(b', "next_s": ')
+        out.valor(z.modelo.segundos_hasta(z.humedad, LOW_THRESHOLD + ajuste_et))
+        out.crudo(b', "dry_rate": ')
+        secado = z.modelo.secado()
+        if secado is None:
+            out.crudo(b'null')
+        else:
+            out.decimal(secado)
+        out.crudo(b'}')
+    out.crudo(b']}')
+    return out.contenido()
+    
+def read_soil_moisture():
+    """Lee todas las zonas (ver zonas.py). Llamar solo desde tarea_control."""
+    for zona in zonas_riego:
+        inicio = time.ticks_us()
+        zona.leer()
+        m_suelo.observar(time.ticks_diff(time.ticks_us(), inicio))
+    return zonas_riego[0].humedad
+
+def encender(zona, motivo="humedad baja estable"):
+    global reles_activos
+    # Con el modelo entrenado el pulso se calcula para llegar a OBJETIVO sin
+    # pasarse (la humedad llega tarde al sensor); si no, se corta por sensor.
+    pulso = zona.modelo.pulso_ms(zona.humedad, OBJETIVO) if MODO_PREDICTIVO else None
+    zona.pulso = 0 if pulso is None else min(max(pulso, MIN_TIEMPO_BOMBA), MAX_TIEMPO_BOMBA)
+    zona.modelo.inicio_pulso(zona.humedad)
+    zona.rele.value(1)
+    zona.encendida = True
+    zona.tiempo = time.ticks_ms()
+    zona.muestras_secas = 0
+    zona.ultimo_riego = int(time.time())
+    reles_activos += 1
+    zona.ciclos += 1
+    registrar(zona.ultimo_riego, registro.tipo(registro.BOMBA_ON, zona.numero), zona.humedad)
+    bitacora.info("💧 Bomba encendida (%s):" % motivo, zona.nombre)
+
+def apagar(zona):
+    global reles_activos
+    zona.rele.value(0)
+    zona.encendida = False
+    reles_activos -= 1
+    zona.apagada = time.ticks_ms()
+    duracion = time.ticks_diff(zona.apagada, zona.tiempo)
+    zona.tiempo_total += duracion
+    ahora = int(time.time())
+    ml = consumo_bomba.registrar(ahora, duracion)
+    zona.modelo.fin_pulso(ahora, duracion)
+    registrar(ahora, registro.tipo(registro.BOMBA_OFF, zona.numero), zona.humedad, extra=duracion)
+    bitacora.info("🚫 Bomba apagada (humedad suficiente o tiempo cumplido):", zona.nombre, ml, "ml")
+
+def control_bomba(zona):
+    """
+    Controla el encendido y apagado automático del riego de una zona
+    evitando falsos arranques por lecturas inestables.
+    """
+    moisture = zona.humedad
+    ahora = time.ticks_ms()
+    # Umbral de encendido más bajo si el clima pide poca agua (0 sin datos del DHT11)
+    bajo = LOW_THRESHOLD + ajuste_et
+
+    # --- Lógica para encendido ---
+    if not zona.encendida:
+        # Si el suelo está seco, aumentamos el contador
+        if moisture < (bajo - 3):
+            zona.muestras_secas += 1
+        else:
+            zona.muestras_secas = 0  # se reinicia si vuelve a estar húmedo
+
+        # Con la lectura filtrada y poco ruido alcanza una sola; si el sensor
+        # está ruidoso se piden 3 lecturas consecutivas de suelo seco como antes.
+        # Si ya hay MAX_RELES_ACTIVOS encendidos, la zona espera su turno.
+        # Tampoco arranca si regó hace menos de MIN_TIEMPO_APAGADA (la
+        # humedad tarda en llegar al sensor) o si se acabó el agua del día.
+        seca = zona.muestras_secas >= (1 if zona.sensor.ruido <= RUIDO_MAXIMO else 3)
+        # Predictivo: si se está secando y va a cruzar el umbral antes de que
+        # un riego llegue a hacer efecto, se riega ahora
+        anticipar = False
+        if not seca and MODO_PREDICTIVO and moisture < bajo + MARGEN_ANTICIPO:
+            faltan = zona.modelo.segundos_hasta(moisture, bajo)
+            anticipar = faltan is not None and faltan < ANTICIPACION
+        if seca or anticipar:
+            if (reles_activos < MAX_RELES_ACTIVOS
+                    and (zona.apagada is None or time.ticks_diff(ahora, zona.apagada) >= MIN_TIEMPO_APAGADA)
+                    and consumo_bomba.disponible(int(time.time())) > 0):
+                encender(zona, "humedad baja estable" if seca else "se va a secar pronto")
+
+    # --- Lógica para apagado ---
+    else:
+        tiempo_encendida = time.ticks_diff(ahora, zona.tiempo)
+        if (moisture > (HIGH_THRESHOLD + 3) and tiempo_encendida > MIN_TIEMPO_BOMBA) or tiempo_encendida > MAX_TIEMPO_BOMBA:
+            apagar(zona)
+        elif zona.pulso and tiempo_encendida >= zona.pulso:
+            apagar(zona)  # pulso calculado por el modelo
+        elif consumo_bomba.disponible(int(time.time()), tiempo_encendida) <= 0:
+            # Tope diario: corta aunque el sensor siga marcando seco (p. ej. si se descalibró)
+            bitacora.aviso("⚠️ Presupuesto diario de agua agotado")
+            apagar(zona)
+
+def olvidar_apagadas(ahora):
+    """
+    Olvida el último apagado de las zonas que ya cumplieron
+    MIN_TIEMPO_APAGADA. ticks_ms da la vuelta cada ~6 días: sin esto, una
+    zona que no vuelve a secarse en ese tiempo vería una diferencia
+    negativa y quedaría bloqueada otros tantos días.
+    """
+    for zona in zonas_riego:
+        if zona.apagada is not None and time.ticks_diff(ahora, zona.apagada) >= MIN_TIEMPO_APAGADA:
+            zona.apagada = None
+
+def control_zonas():
+    """
+    Atiende todas las zonas en cada tick. Primero se apagan las que
+    terminaron, así liberan su lugar en el mismo tick, y la ronda de
+    encendidos empieza en una zona distinta cada vez para repartir.
+    """
+    global turno
+    for zona in zonas_riego:
+        if zona.encendida:
+            control_bomba(zona)
+    n = len(zonas_riego)
+    for k in range(n):
+        zona = zonas_riego[(turno + k) % n]
+        if not zona.encendida:
+            control_bomba(zona)
+            if zona.encendida:
+                turno = (zona.numero + 1) % n
+
+
+# --- Periodos de cada tarea (milisegundos) ---
+PERIODO_CONTROL = 500   # lectura de suelo + control de la bomba
+PERIODO_DHT = 2000      # refresco del DHT11 (no conviene leerlo más seguido)
+ESPERA_MAXIMA_DHT = 60000  # tope del reintento cuando el DHT11 falla seguido
+PERIODO_EVENTOS = 2000  # cada cuánto se empuja una lectura a los clientes de /events
+
+# Clientes suscriptos a /events (Server-Sent Events)
+difusor = eventos.Difusor(maximo=4)
+salida_eventos = codificador.BufferJSON()
+
+# Al arrancar la bomba no se toca hasta que el filtro del sensor se asiente
+TIEMPO_ESPERA_INICIAL = 10000  # 10 segundos
+# Si el registro muestra que el equipo andaba hace menos de REINICIO_RAPIDO
+# segundos (el RTC sigue en hora tras un reset), alcanza con ESPERA_REINICIO
+REINICIO_RAPIDO = 900  # > INTERVALO_VOLCADO: lo último guardado puede tener 10 minutos
+ESPERA_REINICIO = 2000
+control_activo = False
+
+
+async def tarea_control(espera=TIEMPO_ESPERA_INICIAL):
+    """
+    Lee el suelo y ejecuta control_bomba a ritmo fijo, sin depender
+    de que haya clientes conectados al servidor web. La bomba queda
+    quieta los primeros `espera` ms.
+    """
+    global control_activo
+    inicio_bomba = time.ticks_ms()
+    proxima_muestra = 0
+    proximo_volcado = int(time.time()) + INTERVALO_VOLCADO
+    ultimo_evento = time.ticks_ms()
+    bitacora.info("⏳ Esperando {} segundos antes de activar el control automático de la bomba...".format(espera / 1000))
+    while True:
+        inicio = time.ticks_ms()
+        soil = read_soil_moisture()
+        olvidar_apagadas(inicio)
+        if not control_activo and time.ticks_diff(inicio, inicio_bomba) >= espera:
+            control_activo = True
+            bitacora.info("✅ Control automático de bomba activado.")
+
+        if control_activo and not modo_calibracion:
+            control_zonas()
+
+        ahora = int(time.time())
+        if ahora >= proxima_muestra:
+            actualizar_et(ahora)
+            for nivel in niveles_historial:
+                nivel.agregar(ahora, soil, last_temp, last_hum)
+            for zona in zonas_riego:
+                registrar(ahora, registro.tipo(registro.MUESTRA, zona.numero), zona.humedad, last_temp, last_hum)
+                zona.modelo.observar(ahora, zona.humedad, zona.encendida)
+            proxima_muestra = ahora + PERIODO_HISTORIAL
+
+        if ahora >= proximo_volcado:
+            volcar_registro()
+            proximo_volcado = ahora + INTERVALO_VOLCADO
+
+        # Una sola lectura armada para todos los clientes de /events
+        # (negativa si pasaron días sin clientes y los ticks dieron la vuelta)
+        if difusor.hay_clientes() and not 0 <= time.ticks_diff(inicio, ultimo_evento) < PERIODO_EVENTOS:
+            try:
+                difusor.publicar(read_sensor_json(salida_eventos))
+            except Exception as e:
+                # Que un evento mal armado no pare el control de la bomba
+                bitacora.aviso("⚠️ No se pudo publicar la lectura en /events:", e)
+            ultimo_evento = inicio
+
+        metricas.recolectar_si_hace_falta(MIN_HEAP_LIBRE)
+
+        # Descontamos lo que tardó la iteración para mantener el periodo fijo
+        transcurrido = time.ticks_diff(time.ticks_ms(), inicio)
+        m_ciclo.observar(transcurrido)
+        await asyncio.sleep_ms(max(0, PERIODO_CONTROL - transcurrido))
+
+
+async def tarea_dht():
+    """
+    Refresca la lectura del DHT11 periódicamente. Si falla, reintenta
+    pronto (1 s) y después duplica la espera hasta ESPERA_MAXIMA_DHT.
+    """
+    while True:
+        if medir_dht():
+            espera = PERIODO_DHT
+        else:
+            espera = min(1000 << min(dht_fallas_seguidas - 1, 6), ESPERA_MAXIMA_DHT)
+            if dht_fallas_seguidas == 5:
+                bitacora.aviso("⚠️ El DHT11 no responde")
+        await asyncio.sleep_ms(espera)
+
+
+def parse_query(path):
+    """Separa '/ruta?a=1&b=2' en ('/ruta', {'a': '1', 'b': '2'})."""
+    if '?' not in path:
+        return path, {}
+    path, query = path.split('?', 1)
+    params = {}
+    for par in query.split('&'):
+        if '=' in par:
+            clave, valor = par.split('=', 1)
+            params[clave] = valor
+    return path, params
+
+
+def _entero(params, clave, defecto):
+    try:
+        return int(params.get(clave, defecto))
+    except ValueError:
+        return defecto
+
+
+def calibrar(params):
+    """
+    /calibrate?mode=start      pausa el control y apaga la bomba
+    /calibrate?capture=dry     la lectura actual pasa a ser 0 %
+    /calibrate?capture=wet     la lectura actual pasa a ser 100 %
+    /calibrate?capture=<0-100> agrega un punto intermedio
+    /calibrate?reset=1         vuelve a los valores de fábrica
+    /calibrate?mode=end        guarda en la flash y reanuda el control
+    Con &zone=<n> se calibra otra zona (por defecto la 0).
+    Devuelve (estado, cuerpo) con la calibración en JSON.
+    """
+    global modo_calibracion
+    estado, error = 200, ''
+    zona = zonas_riego[min(max(_entero(params, 'zone', 0), 0), len(zonas_riego) - 1)]
+    cal = zona.cal
+    modo = params.get('mode')
+    if modo == 'start':
+        modo_calibracion = True
+        for z in zonas_riego:
+            if z.encendida:
+                apagar(z)
+        bitacora.info("🛠️ Modo calibración")
+    elif modo == 'end':
+        # El control se reanuda aunque no se pueda guardar: los puntos
+        # quedan en uso hasta reiniciar
+        modo_calibracion = False
+        try:
+            cal.guardar()
+            bitacora.info("✅ Calibración guardada")
+        except OSError as e:
+            bitacora.error("❌ No se pudo guardar la calibración:", e)
+            estado, error = 500, '"error": "no se pudo guardar", '
+
+    captura = params.get('capture')
+    if captura is not None and modo_calibracion:
+        porcentaje = {'dry': 0, 'wet': 100}.get(captura)
+        if porcentaje is None:
+            try:
+                porcentaje = min(100, max(0, int(captura)))
+            except ValueError:
+                porcentaje = None
+        if porcentaje is not None:
+            cal.fijar_punto(zona.sensor.crudo, porcentaje)
+    if params.get('reset') and modo_calibracion:
+        cal.restablecer()
+
+    return estado, '{%s"calibrando": %s, "zona": %d, "lectura": %d, "puntos": %s}' % (
+        error, 'true' if modo_calibracion else 'false', zona.numero, zona.sensor.crudo,
+        [list(p) for p in sorted(cal.puntos)])
+
+
+def configurar(metodo, cuerpo):
+    """
+    GET /config devuelve los ajustes vigentes y su versión.
+    POST /config con un JSON parcial (p. ej. {"low_threshold": 50}) los
+    valida, los guarda en la flash y los aplica en el acto; si algo no
+    valida no se cambia nada. "restart": true avisa que hay pines nuevos
+    que se usan recién al reiniciar. Devuelve (estado, cuerpo).
+    """
+    if metodo == 'POST':
+        try:
+            aplicar_ajustes(config.actualizar(json.loads(cuerpo)))
+        except ValueError as e:  # JSON roto o ajuste inválido (ajustes.ErrorAjuste)
+            return 400, '{"error": %s}' % json.dumps(str(e))
+        except OSError:
+            return 500, '{"error": "no se pudo guardar"}'
+        bitacora.info("⚙️ Ajustes actualizados, versión", config.version)
+    elif metodo != 'GET':
+        return 405, '{"error": "solo GET o POST"}'
+    reinicio = [config.valores[c] for c in AJUSTES_REINICIO] != config_arranque
+    return 200, config.json({'restart': reinicio})
+
+
+NO_STORE = 'Cache-Control: no-store\r\n'
+
+# --- Clientes simultáneos ---
+MAX_CLIENTES = 3          # conexiones atendidas a la vez (sin contar /events)
+TIMEOUT_LECTURA = 5       # segundos para recibir una petición completa
+TIMEOUT_ESCRITURA = 10    # segundos para terminar de enviar una respuesta
+# Con todos los lectores ocupados, una conexión nueva espera en fila hasta
+# MAX_ESPERA_LECTOR y desaloja a la que hace más de MIN_ESPERA_DESALOJO que
+# espera una petición (un cliente lento o un keep-alive ocioso)
+MIN_ESPERA_DESALOJO = 150  # ms
+MAX_ESPERA_LECTOR = 1000   # ms
+# Conexiones nuevas esperando un lector a la vez. Con el socket del servidor,
+# los lectores, los 4 de /events y el del envío quedan 15 de los 16 de lwIP
+MAX_EN_FILA = 6
+PASO_FILA = 25             # ms entre revisadas mientras espera
+# Un lector (con su buffer) por conexión, creados una sola vez
+lectores = [peticiones.LectorHTTP() for _ in range(MAX_CLIENTES)]
+lectores_libres = list(lectores)
+fila_lectores = []  # conexiones esperando un lector, en orden de llegada
+
+
+def desalojable(ahora):
+    """El lector que hace más tiempo espera una petición, si pasó MIN_ESPERA_DESALOJO."""
+    viejo = None
+    for lector in lectores:
+        if (lector.esperando is not None
+                and time.ticks_diff(ahora, lector.esperando) >= MIN_ESPERA_DESALOJO
+                and (viejo is None or time.ticks_diff(lector.esperando, viejo.esperando) < 0)):
+            viejo = lector
+    return viejo
+
+
+async def esperar_lector():
+    """
+    Devuelve True cuando hay un lector libre para esta conexión. Con todos
+    ocupados entra a la fila y, mientras espera, corta las conexiones que
+    no terminan de mandar su petición (la tarea cancelada devuelve el
+    lector en su finally). Así unas pocas conexiones que mandan el header
+    de a un byte no dejan afuera a los demás hasta TIMEOUT_LECTURA. Los
+    lectores que se liberan van a la fila en orden de llegada.
+    """
+    if lectores_libres and not fila_lectores:
+        return True
+    if len(fila_lectores) >= MAX_EN_FILA:
+        return False
+    turno = [time.ticks_ms()]
+    fila_lectores.append(turno)
+    try:
+        while True:
+            puesto = fila_lectores.index(turno)
+            if puesto < len(lectores_libres):
+                return True
+            ahora = time.ticks_ms()
+            viejo = desalojable(ahora)
+            if viejo is not None:
+                m_http_desalojos.sumar()
+                viejo.esperando = None
+                viejo.tarea.cancel()
+                await asyncio.sleep_ms(0)
+            elif time.ticks_diff(ahora, turno[0]) >= MAX_ESPERA_LECTOR:
+                return False
+            else:
+                await asyncio.sleep_ms(PASO_FILA)
+    finally:
+        fila_lectores.remove(turno)
+
+
+async def atender_cliente(reader, writer):
+    inicio = time.ticks_ms()  # la primera petición cuenta desde la conexión
+    try:
+        libre = await esperar_lector()
+    except asyncio.CancelledError:
+        libre = False  # se apaga el servidor mientras esperaba
+    if not libre:
+        # Lleno: contestamos rápido en vez de dejarlo esperando
+        m_http_rechazos.sumar()
+        try:
+            peticiones.responder(writer, 503, 'text/plain', 'Ocupado', 'Retry-After: 2\r\n')
+            await asyncio.wait_for(writer.drain(), TIMEOUT_ESCRITURA)
+        except Exception:
+            pass
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except:
+            pass
+        return
+
+    lector = lectores_libres.pop()
+    lector.reiniciar()
+    lector.tarea = asyncio.current_task()
+    try:
+        bitacora.debug('Cliente conectado desde', writer.get_extra_info('peername'))
+        # Con keep-alive el mismo cliente puede mandar varias peticiones.
+        # Un cliente que no manda nada (o lo hace muy lento) se corta por
+        # timeout y no frena a los demás ni al control de la bomba.
+        while True:
+            # Lo que esperó en la fila también cuenta: si la petición ya
+            # llegó completa, leer() no tiene que esperar nada
+            lector.esperando = inicio if inicio is not None else time.ticks_ms()
+            try:
+                if not await asyncio.wait_for(lector.leer(reader), TIMEOUT_LECTURA):
+                    break
+            except peticiones.ErrorHTTP as e:
+                lector.esperando = None
+                peticiones.responder(writer, e.estado, 'text/plain', peticiones.ESTADOS.get(e.estado, ''))
+                await asyncio.wait_for(writer.drain(), TIMEOUT_ESCRITURA)
+                break
+            lector.esperando = None
+
+            if inicio is None:
+                # Con keep-alive las siguientes cuentan desde que llegó la petición
+                inicio = time.ticks_ms()
+            path, params = parse_query(lector.path)
+            keep_alive = lector.keep_alive
+            m_http_peticiones.sumar()
+
+            if path == '/data':
+                peticiones.responder(writer, 200, 'application/json', read_sensor_json(lector.salida),
+                                     NO_STORE, keep_alive)
+            elif path == '/events':
+                # Se queda abierto hasta que el cliente se desconecte; el cupo
+                # de /events es aparte, así que liberamos el lector
+                lectores_libres.append(lector)
+                lector = None
+                await difusor.atender(reader, writer)
+                break
+            elif path == '/metrics':
+                await asyncio.wait_for(metricas.enviar(writer, lector.salida), TIMEOUT_ESCRITURA)
+                break
+            elif path == '/config':
+                estado, cuerpo = configurar(lector.metodo, lector.cuerpo)
+                peticiones.responder(writer, estado, 'application/json', cuerpo, NO_STORE, keep_alive)
+            elif path == '/calibrate':
+                estado, cuerpo = calibrar(params)
+                peticiones.responder(writer, estado, 'application/json', cuerpo, NO_STORE, keep_alive)
+            elif path == '/history':
+                # /history?since=<segundos>&step=<segundos>&agg=mean|min|max
+                paso = _entero(params, 'step', 0)
+                nivel = historial.elegir_nivel(niveles_historial, paso)
+                await asyncio.wait_for(historial.enviar(writer, lector.salida, nivel,
+                                                        _entero(params, 'since', 0), paso,
+                                                        params.get('agg', historial.PROMEDIO)),
+                                       TIMEOUT_ESCRITURA)
+                break
+            elif not await asyncio.wait_for(assets.servir(writer, path, lector.if_none_match,
+                                                          lector.accept_encoding, keep_alive),
+                                            TIMEOUT_ESCRITURA):
+                # Cualquier otra ruta muestra el dashboard, como antes
+                await asyncio.wait_for(assets.servir(writer, '/', lector.if_none_match,
+                                                     lector.accept_encoding, keep_alive),
+                                       TIMEOUT_ESCRITURA)
+            await asyncio.wait_for(writer.drain(), TIMEOUT_ESCRITURA)
+            m_http.observar(time.ticks_diff(time.ticks_ms(), inicio))
+
+            if not keep_alive:
+                break
+            inicio = None
+
+    except asyncio.TimeoutError:
+        pass  # cliente lento o inactivo: se cierra sin más
+
+    except asyncio.CancelledError:
+        pass  # desalojado por otra conexión (ver esperar_lector)
+
+    except Exception as e:
+        bitacora.aviso("⚠️ Error manejando cliente:", e)
+
+    finally:
+        if lector is not None:
+            lector.esperando = None
+            lectores_libres.append(lector)
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except:
+            pass
+
+
+def ajustar_reloj(t):
+    """
+    Sin Wi-Fi/NTP el RTC arranca desde cero después de un corte de luz.
+    Lo adelantamos al último tiempo registrado para que el historial siga
+    siendo creciente.
+    """
+    if time.time() <= t:
+        a = time.localtime(t + 1)
+        RTC().datetime((a[0], a[1], a[2], a[6], a[3], a[4], a[5], 0))
+
+
+async def hora_ntp():
+    """
+    Lo mismo que ntptime.time() pero sin bloquear el loop: el socket UDP
+    es no bloqueante y la espera de la respuesta cede el control cada
+    50 ms, hasta TIMEOUT_NTP. Lo único que bloquea es resolver el nombre
+    del servidor, y se hace una sola vez por arranque.
+    """
+    global direccion_ntp
+    if direccion_ntp is None:
+        direccion_ntp = socket.getaddrinfo(ntptime.host, 123)[0][-1]
+    pedido = bytearray(48)
+    pedido[0] = 0x1B  # cliente, NTP v3
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.setblocking(False)
+        s.sendto(pedido, direccion_ntp)
+        inicio = time.ticks_ms()
+        while True:
+            try:
+                respuesta = s.recv(48)
+                break
+            except OSError:  # EAGAIN: todavía no llegó
+                if time.ticks_diff(time.ticks_ms(), inicio) > TIMEOUT_NTP:
+                    raise OSError('sin respuesta en %d ms' % TIMEOUT_NTP)
+                await asyncio.sleep_ms(50)
+    finally:
+        s.close()
+    return struct.unpack('!I', respuesta[40:44])[0] - ntptime.NTP_DELTA
+
+
+async def sincronizar_reloj():
+    """
+    Pone el RTC en hora por NTP cuando hay Wi-Fi (corre en su propia
+    tarea). Solo se adelanta: si el RTC va adelantado se deja (el
+    historial tiene que seguir creciente) y el colector corrige los
+    tiempos con la hora que mandamos en X-Time.
+    """
+    global last_read_time
+    # Si todavía no se resolvió el servidor, el DNS bloquea: que no sea
+    # con una bomba prendida
+    while direccion_ntp is None and reles_activos:
+        await asyncio.sleep_ms(PERIODO_CONTROL)
+    try:
+        t = await hora_ntp()
+    except Exception as e:  # sin respuesta del servidor NTP, DNS, etc.
+        bitacora.aviso("🕒 NTP no respondió: %s" % e)
+        return
+    corrimiento = t - int(time.time())
+    if corrimiento < -1:
+        bitacora.aviso("🕒 El RTC va %d s adelantado respecto de NTP; se deja como está" % -corrimiento)
+        return
+    if corrimiento <= 1:
+        return
+    ajustar_reloj(t - 1)
+    bitacora.info("🕒 Reloj en hora por NTP (+%d s)" % corrimiento)
+    if last_read_time is not None:
+        last_read_time += corrimiento
+    for z in zonas_riego:
+        z.modelo.reiniciar_secado()  # la recta no puede cruzar el salto
+    if cola_envio is not None:
+        cola_envio.corregir_hora(corrimiento)
+
+
+def restaurar_historial(completo=True):
+    """
+    Reconstruye el historial en RAM (zona principal), el último riego de
+    cada zona y el consumo de agua desde el registro en la flash.
+    Con completo=False solo el historial (el resto vino del RTC).
+    Devuelve True si fue un reinicio rápido (ver REINICIO_RAPIDO).
+    """
+    ultimo = reg.ultimo_tiempo()
+    if not ultimo:
+        return False
+    # Tras un corte de luz el RTC vuelve a 2000 y queda antes de `ultimo`
+    ahora = time.time()
+    rapido = ultimo <= ahora <= ultimo + REINICIO_RAPIDO
+    ajustar_reloj(ultimo)
+    # Cada nivel solo necesita lo que entra en su buffer
+    desde = [ultimo - n.capacidad * n.resolucion for n in niveles_historial]
+    # La estimación del clima solo necesita unas horas para asentarse
+    desde_et = ultimo - 3 * et.largo_s
+    cant = 0
+    for t, tipo, suelo, temp, hum, extra in reg.reproducir(min(desde)):
+        zona = tipo >> 4
+        tipo &= 0x0F
+        if tipo == registro.MUESTRA and zona == 0:
+            temp = None if temp == historial.SIN_DATO else temp
+            hum = None if hum == historial.SIN_DATO else hum
+            for k in range(len(niveles_historial)):
+                if t >= desde[k]:
+                    niveles_historial[k].agregar(t, suelo, temp, hum)
+            if completo and t >= desde_et:
+                et.observar(t, temp, hum)
+            cant += 1
+        elif not completo:
+            continue
+        elif tipo == registro.BOMBA_ON and zona < len(zonas_riego):
+            zonas_riego[zona].ultimo_riego = t
+        elif tipo == registro.BOMBA_OFF:
+            consumo_bomba.registrar(t, extra)
+            if rapido and zona < len(zonas_riego):
+                # Que el reinicio no saltee MIN_TIEMPO_APAGADA
+                zonas_riego[zona].apagada = time.ticks_add(time.ticks_ms(), -1000 * (ahora - t))
+    bitacora.info("📂 Historial restaurado:", cant, "muestras")
+    return rapido
+
+
+class Aplicacion:
+    """
+    El sistema de riego completo. Importar riego no toca el hardware ni
+    abre el puerto: start() crea todo y arranca las tareas, stop() las
+    corta, apaga los relés y baja el registro a la flash.
+
+    El control arranca sin esperar al Wi-Fi; el servidor se abre (y se
+    vuelve a abrir) cada vez que la red da una IP nueva.
+    """
+
+    def __init__(self, puerto=80, espera_inicial=TIEMPO_ESPERA_INICIAL, espera_reinicio=ESPERA_REINICIO):
+        self.puerto = puerto
+        self.espera_inicial = espera_inicial
+        self.espera_reinicio = espera_reinicio
+        self.servidor = None
+        self.tareas = []
+        self.tarea_ntp = None
+
+    async def start(self):
+        global arranque_ms
+        bitacora.info("🔧 Inicializando sensores y sistema de riego...")
+        iniciar()
+        rapido = restaurar_historial()
+        # Primera lectura ya, sin esperar al servidor ni al primer tick
+        read_soil_moisture()
+        arranque_ms = time.ticks_ms()
+        if arranque_ms > PRESUPUESTO_ARRANQUE_MS:
+            bitacora.aviso("⚠️ Arranque lento:", arranque_ms, "ms hasta la primera lectura")
+        else:
+            bitacora.info("⏱️ Primera lectura a los", arranque_ms, "ms")
+
+        assets.precargar()
+        espera = self.espera_reinicio if rapido else self.espera_inicial
+        red.al_cambiar_ip = self.escuchar
+        self.tareas = [asyncio.create_task(tarea_control(espera)),
+                       asyncio.create_task(tarea_dht()),
+                       asyncio.create_task(difusor.tarea()),
+                       asyncio.create_task(red.tarea())]
+        if cola_envio is not None:
+            self.tareas.append(asyncio.create_task(cola_envio.tarea()))
+
+    async def escuchar(self, ip):
+        """
+        Abre el servidor con la IP nueva. El socket viejo puede haber
+        quedado muerto al caerse la interfaz, así que se cierra y se abre
+        otro. Sin IP se deja como está hasta que vuelva la red.
+        """
+        if ip is None:
+            return
+        # En modo AP no hay salida a internet. Aparte, para no demorar el
+        # tick de control ni la apertura del servidor
+        if (ntptime is not None and not red.modo_ap
+                and (self.tarea_ntp is None or self.tarea_ntp.done())):
+            self.tarea_ntp = asyncio.create_task(sincronizar_reloj())
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+        self.servidor = await asyncio.start_server(atender_cliente, '0.0.0.0', self.puerto,
+                                                   backlog=MAX_CLIENTES + MAX_EN_FILA)
+        bitacora.info("🌐 Servidor HTTP escuchando en http://%s:%d" % (ip, self.puerto))
+
+    async def stop(self):
+        global control_activo
+        for t in self.tareas:
+            t.cancel()
+        self.tareas = []
+        if self.tarea_ntp is not None:
+            self.tarea_ntp.cancel()
+            self.tarea_ntp = None
+        red.al_cambiar_ip = None
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+            self.servidor = None
+        control_activo = False
+        for zona in zonas_riego:
+            if zona.encendida:
+                apagar(zona)
+        if reg is not None:
+            volcar_registro()
+        guardar_cola()
+
+    async def correr(self):
+        await self.start()
+        try:
+            await self.tareas[0]
+        except asyncio.CancelledError:
+            pass  # alguien llamó a stop()
+        finally:
+            await self.stop()
+
+    async def correr_bajo_consumo(self):
+        """
+        Un ciclo por despertar: lee el suelo y el DHT11, corre el control
+        (si enciende una bomba se queda despierto a ritmo normal hasta
+        que corte: dormido no se puede cortar), anota la muestra en el
+        RTC y duerme hasta completar PERIODO_BAJO_CONSUMO. Uno de cada
+        CICLOS_WIFI ciclos (y el primero) prende el Wi-Fi.
+
+        Con deepsleep no vuelve nunca: la placa se reinicia al despertar
+        y main.py llega de nuevo acá.
+        """
+        global estado_rtc, arranque_ms, control_activo
+        profundo = MODO_BAJO_CONSUMO == 'profundo'
+        iniciar()
+        estado_rtc = bajo_consumo.EstadoRTC(len(zonas_riego))
+        Medidor('energia_ciclo_trabajo_ppm', 'Fraccion del tiempo despierto (partes por millon)',
+                _ciclo_trabajo_ppm)
+        Medidor('energia_corriente_promedio_ua', 'Corriente promedio proyectada', _corriente_ua)
+        # Sin estado en el RTC (arranque en frío) el primer ciclo solo
+        # asienta el filtro del sensor, como la espera inicial
+        control_activo = estado_rtc.cargar(RTC().memory(), zonas_riego, consumo_bomba, et)
+        if not control_activo:
+            bitacora.info("🔋 Bajo consumo (%s): arranque en frío" % MODO_BAJO_CONSUMO)
+            restaurar_historial()
+        red.al_cambiar_ip = self.escuchar
+        inicio = 0 if profundo else time.ticks_ms()  # tras deepsleep ticks_ms arranca en 0
+        while True:
+            soil = read_soil_moisture()
+            if arranque_ms is None:
+                arranque_ms = time.ticks_ms()
+            medir_dht()
+            actualizar_et(int(time.time()))
+            olvidar_apagadas(time.ticks_ms())
+            if control_activo and not modo_calibracion:
+                control_zonas()
+                while reles_activos:
+                    await asyncio.sleep_ms(PERIODO_CONTROL)
+                    read_soil_moisture()
+                    control_zonas()
+            control_activo = True
+
+            ahora = int(time.time())
+            if not profundo:
+                # Con deepsleep la RAM no dura: el historial sale de la flash en la ventana de Wi-Fi
+                for nivel in niveles_historial:
+                    nivel.agregar(ahora, soil, last_temp, last_hum)
+            for zona in zonas_riego:
+                registrar(ahora, registro.tipo(registro.MUESTRA, zona.numero), zona.humedad, last_temp, last_hum)
+                zona.modelo.observar(ahora, zona.humedad, zona.encendida)
+
+            estado_rtc.ciclo += 1
+            con_wifi = 0
+            if (estado_rtc.ciclo - 1) % CICLOS_WIFI == 0:
+                con_wifi = await self.ventana_wifi(profundo)
+            despierto = time.ticks_diff(time.ticks_ms(), inicio)
+            dormir = max(0, PERIODO_BAJO_CONSUMO - despierto)
+            estado_rtc.sumar(despierto - con_wifi, con_wifi, dormir)
+            corriente = corriente_promedio_ma()
+            bitacora.debug("🔋 Ciclo", estado_rtc.ciclo, "despierto", despierto, "ms, duerme", dormir, "ms")
+            if con_wifi:
+                bitacora.info("🔋 Ciclo de trabajo %.2f %%, %.3f mA promedio, ~%d días con %d mAh"
+                              % (estado_rtc.ciclo_trabajo() * 100, corriente,
+                                 BATERIA_MAH / corriente / 24, BATERIA_MAH))
+            if profundo:
+                RTC().memory(estado_rtc.guardar(zonas_riego, consumo_bomba, et))
+                deepsleep(dormir)
+            lightsleep(dormir)
+            inicio = time.ticks_ms()
+
+    async def ventana_wifi(self, profundo):
+        """
+        El rato con Wi-Fi de un ciclo de bajo consumo: pasa las muestras
+        del RTC a la flash, prende la radio, manda los lotes pendientes
+        y atiende pedidos hasta completar VENTANA_WIFI. Devuelve los ms
+        que estuvo prendida la radio.
+        """
+        volcar_rtc()
+        if profundo:
+            restaurar_historial(False)
+        inicio = time.ticks_ms()
+        if await red.conectar_una_vez():
+            if cola_envio is not None:
+                await cola_envio.enviar_pendientes()
+            await asyncio.sleep_ms(max(0, VENTANA_WIFI - time.ticks_diff(time.ticks_ms(), inicio)))
+            if self.servidor is not None:
+                self.servidor.close()
+                await self.servidor.wait_closed()
+                self.servidor = None
+        else:
+            bitacora.aviso("⚠️ Sin Wi-Fi en este ciclo")
+        red.apagar()
+        if profundo:
+            guardar_cola()
+        return time.ticks_diff(time.ticks_ms(), inicio)
+
+    def principal(self):
+        """La corrutina de arranque según MODO_BAJO_CONSUMO."""
+        return self.correr_bajo_consumo() if MODO_BAJO_CONSUMO else self.correr()
+
+    def run(self):
+        asyncio.run(self.principal())
+
+
+# main.py la arranca con app.run(); importado desde otro lado no arranca nada
+app = Aplicacion()
@@ -0,0 +1,67 @@
+"""
+Lectura filtrada del sensor capacitivo de humedad del suelo.
+
+En vez de un único adc.read(), cada lectura es una ráfaga de MUESTRAS
+conversiones seguidas. Se ordenan, se descartan las DESCARTE más bajas y
+más altas (media recortada) y el resultado pasa por una media móvil
+exponencial. Todo en enteros y sobre buffers preasignados.
+
+Además se estima el ruido: el rango intercuartil de cada ráfaga,
+suavizado con la misma EMA. Con ruido bajo alcanza una sola lectura
+para decidir; con ruido alto conviene confirmar con varias.
+"""
+from array import array
+
+ESCALA = 16  # punto fijo de la EMA: los valores internos están multiplicados por 16
+
+
+class SensorSuelo:
+    def __init__(self, adc, muestras=16, descarte=4, alfa_shift=2):
+        self.adc = adc
+        self.muestras = muestras
+        self.descarte = descarte
+        self.alfa_shift = alfa_shift  # alfa = 1 / 2**alfa_shift (0 = sin EMA)
+        self._rafaga = array('H', bytes(2 * muestras))
+        self._filtrado = -1  # valor x ESCALA, -1 hasta la primera lectura
+        self._ruido = 0      # valor x ESCALA
+        self.crudo = 0       # media recortada de la última ráfaga
+
+    def _leer_rafaga(self):
+        r = self._rafaga
+        # Inserción ordenada a medida que se lee: n=16, sin listas nuevas
+        for i in range(self.muestras):
+            v = self.adc.read()
+            j = i
+            while j > 0 and r[j - 1] > v:
+                r[j] = r[j - 1]
+                j -= 1
+            r[j] = v
+        suma = 0
+        for i in range(self.descarte, self.muestras - self.descarte):
+            suma += r[i]
+        q = self.muestras // 4
+        return suma // (self.muestras - 2 * self.descarte), r[self.muestras - 1 - q] - r[q]
+
+    def leer(self):
+        """Hace una ráfaga y devuelve el valor filtrado del ADC (entero)."""
+        self.crudo, dispersion = self._leer_rafaga()
+        if self._filtrado < 0:
+            self._filtrado = self.crudo * ESCALA
+            self._ruido = dispersion * ESCALA
+        else:
+            self._filtrado += (self.crudo * ESCALA - self._filtrado) >> self.alfa_shift
+            self._ruido += (dispersion * ESCALA - self._ruido) >> self.alfa_shift
+        return self._filtrado // ESCALA
+
+    def estado(self):
+        """(filtrado, ruido) internos, para seguir después de un deepsleep."""
+        return self._filtrado, self._ruido
+
+    def restaurar(self, filtrado, ruido):
+        self._filtrado = filtrado
+        self._ruido = ruido
+
+    @property
+    def ruido(self):
+        """Dispersión típica de una ráfaga, en cuentas del ADC."""
+        return self._ruido / ESCALA
@@ -0,0 +1,11 @@
+"""
+Pruebas en la PC de los módulos de la placa (no se sube al ESP32).
+
+Los módulos viven en la raíz del repositorio, como en la flash:
+
+    python -m pytest -q
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
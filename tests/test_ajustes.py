@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from ajustes import Ajustes, ErrorAjuste
+
+ESQUEMA = [('bajo', 40, 0, 100), ('alto', 70, 0, 100), ('pin', 14, 0, 39),
+           ('zonas', [('Zona 1', 32, 26)], 0, 39)]
+
+
+def sin_repetidos(valores):
+    pines = [valores['pin']] + [p for _, s, r in valores['zonas'] for p in (s, r)]
+    if len(set(pines)) != len(pines):
+        raise ErrorAjuste('pin repetido')
+
+
+def nuevos(tmp_path, **kw):
+    return Ajustes(ESQUEMA, (('bajo', 'alto'),), str(tmp_path / 'ajustes.json'), **kw)
+
+
+def test_rangos_y_orden(tmp_path):
+    a = nuevos(tmp_path)
+    assert a.validar({'bajo': 50})['bajo'] == 50
+    with pytest.raises(ErrorAjuste):
+        a.validar({'bajo': 101})
+    with pytest.raises(ErrorAjuste):
+        a.validar({'bajo': 80})
+    with pytest.raises(ErrorAjuste):
+        a.validar({'zonas': [['A', 32]]})
+
+
+def test_comprobar_ve_la_foto_entera(tmp_path):
+    a = nuevos(tmp_path, comprobar=sin_repetidos)
+    assert a.validar({'zonas': [['A', 32, 27]]})['zonas'] == [('A', 32, 27)]
+    with pytest.raises(ErrorAjuste):
+        a.validar({'pin': 26})
+    with pytest.raises(ErrorAjuste):
+        a.actualizar({'zonas': [['A', 32, 26], ['B', 33, 26]]})
+    assert a.version == 0
+    assert not (tmp_path / 'ajustes.json').exists()
+
+
+def test_guardado_invalido_queda_en_defecto(tmp_path):
+    (tmp_path / 'ajustes.json').write_text(json.dumps(
+        {'version': 3, 'valores': {'bajo': 45, 'pin': 32, 'zonas': [['A', 32, 26]]}}))
+    a = nuevos(tmp_path, comprobar=sin_repetidos)
+    assert a.cargar() == {c: d for c, d, _, _ in ESQUEMA}
+    assert a.defecto('pin') == 14
+
+
+def test_guardar_y_cargar(tmp_path):
+    a = nuevos(tmp_path, comprobar=sin_repetidos)
+    a.actualizar({'bajo': 45, 'zonas': [['A', 33, 27]]})
+    b = nuevos(tmp_path, comprobar=sin_repetidos)
+    assert b.cargar()['zonas'] == [('A', 33, 27)]
+    assert b.version == 1
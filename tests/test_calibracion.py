@@ -0,0 +1,114 @@
+import json
+
+import calibracion
+import suelo
+from calibracion import Calibracion
+
+
+class ADCFalso:
+    """Devuelve siempre `valor`, como un sensor quieto y sin ruido."""
+
+    def __init__(self, valor=0):
+        self.valor = valor
+
+    def read(self):
+        return self.valor
+
+
+def nueva(tmp_path, puntos=None):
+    cal = Calibracion(str(tmp_path / 'calibracion.json'))
+    if puntos is not None:
+        cal.puntos = puntos
+        cal.armar_tabla()
+    return cal
+
+
+def porcentaje(cal, lectura):
+    """Lectura -> % como en zonas.Zona.leer (ráfaga filtrada + tabla)."""
+    sensor = suelo.SensorSuelo(ADCFalso(lectura))
+    return cal.porcentaje(sensor.leer())
+
+
+def test_extremos_de_fabrica(tmp_path):
+    cal = nueva(tmp_path)
+    assert cal.puntos == [(calibracion.SECO_DEFECTO, 0), (calibracion.HUMEDO_DEFECTO, 100)]
+    assert porcentaje(cal, calibracion.SECO_DEFECTO) == 0
+    assert porcentaje(cal, calibracion.HUMEDO_DEFECTO) == 100
+    assert len(cal.tabla) == 1024
+
+
+def test_fuera_de_rango_usa_el_extremo(tmp_path):
+    cal = nueva(tmp_path, [(3000, 0), (2000, 100)])
+    for lectura in (3001, 3500, calibracion.MAX_ADC):
+        assert porcentaje(cal, lectura) == 0
+    for lectura in (0, 1000, 1999):
+        assert porcentaje(cal, lectura) == 100
+
+
+def test_lineal_entre_extremos(tmp_path):
+    cal = nueva(tmp_path, [(3000, 0), (2000, 100)])
+    # La tabla tiene una entrada cada 4 cuentas: error de a lo sumo 1 %
+    for lectura, esperado in ((2500, 50), (2750, 25), (2250, 75), (2900, 10)):
+        assert abs(porcentaje(cal, lectura) - esperado) <= 1
+    # Monótona: más cuentas, menos humedad
+    valores = [cal.porcentaje(x) for x in range(0, calibracion.MAX_ADC + 1, 4)]
+    assert valores == sorted(valores, reverse=True)
+
+
+def test_punto_intermedio(tmp_path):
+    cal = nueva(tmp_path, [(3000, 0), (2000, 100)])
+    assert cal.fijar_punto(2800, 50)
+    assert abs(porcentaje(cal, 2800) - 50) <= 1
+    # Cada tramo es una recta propia
+    assert abs(porcentaje(cal, 2900) - 25) <= 1
+    assert abs(porcentaje(cal, 2400) - 75) <= 1
+    # Capturar otra vez el mismo % reemplaza el punto
+    assert cal.fijar_punto(2600, 50)
+    assert sorted(cal.puntos) == [(2000, 100), (2600, 50), (3000, 0)]
+    assert abs(porcentaje(cal, 2600) - 50) <= 1
+
+
+def test_lecturas_repetidas(tmp_path):
+    # Dos puntos con la misma lectura (x1 == x0): sin división por cero
+    # y se promedian, así la curva sigue siendo monótona
+    cal = nueva(tmp_path, [(3000, 0), (2500, 40), (2500, 60), (2000, 100)])
+    assert abs(porcentaje(cal, 2500) - 50) <= 1
+    assert abs(porcentaje(cal, 2750) - 25) <= 1
+    assert abs(porcentaje(cal, 2250) - 75) <= 1
+    valores = [cal.porcentaje(x) for x in range(0, calibracion.MAX_ADC + 1, 4)]
+    assert valores == sorted(valores, reverse=True)
+    # Seco y húmedo con la misma lectura: queda un solo punto
+    cal = nueva(tmp_path, [(2500, 0), (2500, 100)])
+    assert set(cal.tabla) == {50}
+
+
+def test_interpolar(tmp_path):
+    cal = nueva(tmp_path)
+    puntos = [(1000, 100), (2000, 50), (3000, 0)]
+    assert cal._interpolar(500, puntos) == 100
+    assert cal._interpolar(1000, puntos) == 100
+    assert cal._interpolar(1500, puntos) == 75
+    assert cal._interpolar(2500, puntos) == 25
+    assert cal._interpolar(3000, puntos) == 0
+    assert cal._interpolar(4000, puntos) == 0
+    assert cal._interpolar(2000, [(1000, 100), (2000, 70), (2000, 50), (3000, 0)]) == 70
+
+
+def test_guardar_y_cargar(tmp_path):
+    cal = nueva(tmp_path)
+    cal.fijar_punto(3100, 0)
+    cal.fijar_punto(1900, 100)
+    cal.guardar()
+    otra = nueva(tmp_path)
+    assert sorted(otra.puntos) == [(1900, 100), (3100, 0)]
+    assert otra.tabla == cal.tabla
+    otra.restablecer()
+    assert porcentaje(otra, calibracion.HUMEDO_DEFECTO) == 100
+
+
+def test_archivo_roto_usa_valores_de_fabrica(tmp_path):
+    ruta = tmp_path / 'calibracion.json'
+    for contenido in ('{roto', json.dumps({'puntos': [[3000, 0]]}), json.dumps({'otra': 1})):
+        ruta.write_text(contenido)
+        cal = nueva(tmp_path)
+        assert cal.puntos == [(calibracion.SECO_DEFECTO, 0), (calibracion.HUMEDO_DEFECTO, 100)]
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from codificador import BufferJSON, BufferLleno
+
+
+def escrito(out):
+    return bytes(out.contenido()).decode()
+
+
+def test_valores():
+    out = BufferJSON(64)
+    out.crudo(b'[')
+    out.entero(-1205)
+    out.crudo(b', ')
+    out.decimal(-3.25)
+    out.crudo(b', ')
+    out.valor(None)
+    out.crudo(b', ')
+    out.texto('a"b\\c')
+    out.crudo(b']')
+    assert json.loads(escrito(out)) == [-1205, -3.3, None, 'a"b\\c']
+
+
+def test_entero_que_no_entra_no_escribe_nada():
+    out = BufferJSON(8)
+    out.crudo(b'[')
+    with pytest.raises(BufferLleno):
+        out.entero(-12345678)
+    assert escrito(out) == '['
+    out.entero(-123456)
+    assert escrito(out) == '[-123456'
+
+
+def test_nada_se_escribe_pasado_el_final():
+    for escribir in (lambda o: o.crudo(b'xxxxx'), lambda o: o.texto('"""'),
+                     lambda o: o.decimal(123.4), lambda o: o.booleano(False)):
+        out = BufferJSON(4)
+        with pytest.raises(BufferLleno):
+            escribir(out)
+        assert out.n <= 4
+
+
+def test_texto_con_lugar_justo_para_el_peor_caso():
+    out = BufferJSON(8)
+    out.texto('"""')
+    assert escrito(out) == '"\\"\\"\\""'
+
+
+def test_agrandar_conserva_lo_escrito():
+    out = BufferJSON(4)
+    out.crudo(b'{"a"')
+    out.agrandar(16)
+    out.crudo(b': 1}')
+    assert json.loads(escrito(out)) == {'a': 1}
+    out.agrandar(8)  # más chico: no hace nada
+    assert len(out.buf) == 16
@@ -0,0 +1,128 @@
+import os
+import struct
+import time
+
+import envio
+import registro
+from central.almacen import Almacen
+from central.colector import CABECERA_V1, Colector, decodificar
+
+T = 1700000000
+
+
+def tramas(directorio, *tiempos):
+    """Un lote por cada tiempo; devuelve el enviador y sus tramas, en orden."""
+    e = envio.Enviador('http://central:8000/ingest', 'abc', None, directorio=str(directorio))
+    for t in tiempos:
+        e.agregar(t, registro.MUESTRA, 50, 22, 60)
+        e.cerrar_lote()
+    return e, [trama for _, trama in e._ram]
+
+
+def tiempos_guardados(almacen):
+    with open(almacen._ruta('t'), 'rb') as f:
+        datos = f.read()
+    return list(struct.unpack('<%dI' % (len(datos) // 4), datos))
+
+
+def test_epoca_en_la_trama_y_en_cola_seq(tmp_path):
+    e, (trama,) = tramas(tmp_path, T)
+    epoca, seq, registros = decodificar(trama)
+    assert (epoca, seq) == (e.epoca, 1)
+    assert registros[0][0] == T
+    # Al reabrir se conservan secuencia y época
+    otro = envio.Enviador('http://central:8000/ingest', 'abc', None, directorio=str(tmp_path))
+    assert (otro.seq, otro.epoca) == (2, e.epoca)
+
+
+def test_cola_seq_viejo_conserva_la_secuencia(tmp_path):
+    (tmp_path / 'seq').write_text('41')
+    e = envio.Enviador('http://central:8000/ingest', 'abc', None, directorio=str(tmp_path))
+    assert e.seq == 41 and e.epoca
+    assert (tmp_path / 'seq').read_text() == '41 %d' % e.epoca
+
+
+def test_trama_version_1():
+    datos = struct.pack(registro.FORMATO, T, registro.MUESTRA, 50, 22, 60, 0)
+    trama = struct.pack(CABECERA_V1, b'RG', 1, 0, 7, 1) + datos
+    assert decodificar(trama) == (None, 7, [(T, registro.MUESTRA, 0, 50, 22, 60, 0)])
+
+
+def test_secuencia_nueva_con_otra_epoca(tmp_path):
+    colector = Colector(Almacen(str(tmp_path / 'datos')))
+    _, viejas = tramas(tmp_path / 'a', T, T + 60, T + 120)
+    for trama in viejas:
+        colector.recibir('abc', trama)
+    assert colector.recibir('abc', viejas[1]) == 3  # repetida
+    # Se borró cola/: la secuencia vuelve a 1 con otra época
+    _, (nueva,) = tramas(tmp_path / 'b', T + 180)
+    assert colector.recibir('abc', nueva) == 1
+    assert (colector.muestras, colector.repetidas, colector.reinicios) == (4, 1, 1)
+    # La época queda guardada con el ack
+    otro = Colector(Almacen(str(tmp_path / 'datos')))
+    assert otro.recibir('abc', nueva) == 1
+
+
+def test_reloj_del_equipo_corrido(tmp_path):
+    almacen = Almacen(str(tmp_path / 'datos'))
+    colector = Colector(almacen)
+    ahora = int(time.time())
+    # RTC sin NTP: arrancó en 2000 (MicroPython) y midió hace 10 minutos
+    _, (atrasada, en_hora) = tramas(tmp_path / 'cola', 1000, ahora - 600)
+    colector.recibir('abc', atrasada, 1600)
+    colector.recibir('abc', en_hora, ahora)
+    assert [abs(t - (ahora - 600)) <= 2 for t in tiempos_guardados(almacen)] == [True, True]
+
+
+def test_corregir_hora_del_lote_abierto(tmp_path):
+    e = envio.Enviador('http://central:8000/ingest', 'abc', None, directorio=str(tmp_path))
+    e.agregar(1000, registro.MUESTRA, 50)
+    e.agregar(1060, registro.MUESTRA, 51)
+    e.corregir_hora(T)
+    e.cerrar_lote()
+    _, _, registros = decodificar(e._ram[0][1])
+    assert [r[0] for r in registros] == [T + 1000, T + 1060]
+
+
+def flash_llena(monkeypatch):
+    abrir = open
+
+    def sin_lugar(ruta, modo='r', *args):
+        if 'w' in modo or 'a' in modo:
+            with abrir(ruta, modo, *args) as f:
+                f.write(b'RG' if 'b' in modo else '')  # alcanzó a crear el archivo
+            raise OSError(28)  # ENOSPC
+        return abrir(ruta, modo, *args)
+    monkeypatch.setattr('builtins.open', sin_lugar)
+    return abrir
+
+
+def test_flash_llena_las_tramas_quedan_en_ram(tmp_path, monkeypatch):
+    fallas = []
+    e = envio.Enviador('http://central:8000/ingest', 'abc', None, max_ram=2,
+                       directorio=str(tmp_path), al_fallar_flash=fallas.append)
+    abrir = flash_llena(monkeypatch)
+    for t in range(T, T + 6):
+        e.agregar(t, registro.MUESTRA, 50)
+        e.cerrar_lote()  # no lanza
+    assert fallas and all(isinstance(f, OSError) for f in fallas)
+    # Hasta el doble de max_ram; después se tira la más vieja
+    assert [seq for seq, _ in e._ram] == [3, 4, 5, 6]
+    assert e.descartadas == 2
+    assert sorted(os.listdir(tmp_path)) == ['seq']  # ningún .bin a medias
+    e.guardar()
+    assert len(e._ram) == 4
+    # Vuelve el lugar: lo que quedaba en RAM pasa a la flash
+    monkeypatch.setattr('builtins.open', abrir)
+    e.guardar()
+    otro = envio.Enviador('http://central:8000/ingest', 'abc', None, directorio=str(tmp_path))
+    assert otro._flash == [3, 4, 5, 6]
+    assert decodificar(otro._siguiente()[1])[2][0][0] == T + 2
+
+
+def test_trama_ilegible_se_descarta(tmp_path):
+    e, _ = tramas(tmp_path, T, T + 60)
+    e.guardar()
+    os.remove(tmp_path / '00000001.bin')
+    assert e._siguiente()[0] == 2
+    assert e.descartadas == 1
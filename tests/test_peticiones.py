@@ -0,0 +1,107 @@
+import asyncio
+
+import peticiones
+from peticiones import ErrorHTTP, LectorHTTP
+
+
+async def atender(reader, writer):
+    # Lo mismo que atender_cliente en riego.py, contestando con lo que se leyó
+    lector = LectorHTTP()
+    try:
+        while True:
+            try:
+                if not await lector.leer(reader):
+                    break
+            except ErrorHTTP as e:
+                peticiones.responder(writer, e.estado, 'text/plain', peticiones.ESTADOS[e.estado])
+                await writer.drain()
+                break
+            cuerpo = b'%s %s %s' % (lector.metodo.encode(), lector.path.encode(), lector.cuerpo)
+            peticiones.responder(writer, 200, 'text/plain', cuerpo, keep_alive=lector.keep_alive)
+            await writer.drain()
+            if not lector.keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def _conversar(*envios):
+    """Manda cada bloque por un socket de verdad y devuelve todo lo recibido hasta el cierre."""
+    servidor = await asyncio.start_server(atender, '127.0.0.1', 0)
+    puerto = servidor.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+    for datos in envios:
+        writer.write(datos)
+        await writer.drain()
+        await asyncio.sleep(0.01)
+    writer.write_eof()
+    recibido = await asyncio.wait_for(reader.read(), 2)
+    writer.close()
+    servidor.close()
+    await servidor.wait_closed()
+    return recibido
+
+
+def conversar(*envios):
+    return asyncio.run(_conversar(*envios))
+
+
+def respuestas(recibido):
+    """[(estado, cuerpo)] de las respuestas seguidas en `recibido`."""
+    salida = []
+    while recibido:
+        header, _, resto = recibido.partition(b'\r\n\r\n')
+        largo = int(header.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+        salida.append((int(header.split(b' ')[1]), resto[:largo]))
+        recibido = resto[largo:]
+    return salida
+
+
+def test_keep_alive():
+    r = conversar(b'GET /data HTTP/1.1\r\nHost: x\r\n\r\n',
+                  b'GET /metrics HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+    assert respuestas(r) == [(200, b'GET /data '), (200, b'GET /metrics ')]
+    assert b'Connection: keep-alive' in r and r.count(b'Connection: close') == 1
+
+
+def test_http_1_0_cierra():
+    r = conversar(b'GET / HTTP/1.0\r\n\r\nGET /data HTTP/1.0\r\n\r\n')
+    assert respuestas(r) == [(200, b'GET / ')]
+
+
+def test_pipelining_y_cuerpo_partido():
+    r = conversar(b'GET /a HTTP/1.1\r\n\r\nPOST /config HTTP/1.1\r\nContent-Length: 11\r\n\r\n{"low"',
+                  b': 30}GET /b HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert respuestas(r) == [(200, b'GET /a '), (200, b'POST /config {"low": 30}'), (200, b'GET /b ')]
+
+
+def test_header_partido_en_muchos_pedazos():
+    pedido = b'GET /data HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n'
+    r = conversar(*(pedido[i:i + 3] for i in range(0, len(pedido), 3)))
+    assert respuestas(r) == [(200, b'GET /data ')]
+
+
+def test_header_demasiado_grande():
+    r = conversar(b'GET / HTTP/1.1\r\nX-Relleno: ' + b'a' * peticiones.TAM_BUFFER + b'\r\n\r\n')
+    assert respuestas(r)[0][0] == 431
+
+
+def test_cuerpo_demasiado_grande():
+    r = conversar(b'POST /config HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % (peticiones.TAM_BUFFER + 1))
+    assert respuestas(r) == [(413, b'Payload Too Large')]
+
+
+def test_largos_invalidos():
+    for largo in (b'-43', b'abc', b'', b'+5', b'1_0'):
+        r = conversar(b'GET /data HTTP/1.1\r\nContent-Length: ' + largo + b'\r\n\r\nGET /data HTTP/1.1\r\n\r\n')
+        assert respuestas(r) == [(400, b'Bad Request')], largo
+
+
+def test_linea_de_pedido_invalida():
+    r = conversar(b'GET /data\r\n\r\n')
+    assert respuestas(r) == [(400, b'Bad Request')]
+
+
+def test_cierre_a_mitad_de_cuerpo():
+    r = conversar(b'POST /config HTTP/1.1\r\nContent-Length: 20\r\n\r\n{"lo')
+    assert r == b''
@@ -0,0 +1,56 @@
+import prediccion
+from prediccion import Modelo
+
+T = 1700000000  # una hora del RTC de verdad (segundos desde 1970)
+
+
+def secar(modelo, desde, horas, h0=80, tasa=2, paso=10):
+    """Muestras cada `paso` s de un suelo que pierde `tasa` %/h. Devuelve (t, h) de la última."""
+    t, h = desde, h0
+    for k in range(int(horas * 3600 / paso)):
+        t = desde + k * paso
+        h = h0 - tasa * k * paso / 3600
+        modelo.observar(t, h, False)
+    return t, h
+
+
+def test_sin_datos():
+    m = Modelo()
+    assert m.secado() is None
+    assert m.segundos_hasta(60, 40) is None
+    assert m.pulso_ms(40, 60) is None
+
+
+def test_origen_en_la_primera_muestra():
+    m = Modelo()
+    m.observar(T, 70, False)
+    assert m._t0 == T
+    assert m._sx == 0
+
+
+def test_secado_con_la_hora_del_rtc():
+    m = Modelo()
+    t, h = secar(m, T, 2)
+    assert abs(m.secado() - 2) < 1e-6
+    assert abs(m.segundos_hasta(h, h - 2) - 3600) <= 1
+
+
+def test_dias_sin_regar_mueven_el_origen():
+    m = Modelo()
+    t, _ = secar(m, T, 72, h0=100, tasa=1)
+    assert t - m._t0 <= prediccion.MAX_HORAS * 3600
+    assert abs(m.secado() - 1) < 1e-6
+
+
+def test_respuesta_a_un_riego():
+    m = Modelo(ventana=600)
+    t, h = secar(m, T, 1)
+    m.inicio_pulso(h)
+    m.fin_pulso(t, 10000)  # 10 s de bomba
+    for k in range(1, 61):
+        m.observar(t + k * 10, h + 15 if k > 20 else h, False)
+    assert m.respuestas == 1
+    assert abs(m.ganancia - 1.5) < 1e-9
+    assert m.pulso_ms(h, h + 3) == 2000
+    # La tendencia arranca de cero después de medir la respuesta
+    assert m.secado() is None
@@ -0,0 +1,164 @@
+import os
+
+import pytest
+
+import registro
+from historial import SIN_DATO
+from registro import Registro, TAM_REGISTRO
+
+# Páginas de 4 registros y segmentos de 8: se rota cada dos volcados
+PAGINA = 4 * TAM_REGISTRO
+SEGMENTO = 8 * TAM_REGISTRO
+
+
+def nuevo(directorio, max_segmentos=3):
+    return Registro(str(directorio), PAGINA, SEGMENTO, max_segmentos)
+
+
+def llenar(reg, desde, hasta):
+    for t in range(desde, hasta):
+        reg.agregar(t, registro.MUESTRA, t % 100, 20, 50)
+
+
+def tiempos(reg, desde=0):
+    return [r[0] for r in reg.reproducir(desde)]
+
+
+def test_agregar_queda_en_ram_hasta_llenar_la_pagina(tmp_path):
+    reg = nuevo(tmp_path)
+    llenar(reg, 1, 4)
+    assert os.listdir(tmp_path) == []
+    assert tiempos(reg) == [1, 2, 3]
+    reg.agregar(4, registro.BOMBA_OFF, extra=60500)  # max_pump_ms más un tick de control
+    assert os.listdir(tmp_path) == ['seg00000.bin']
+    assert os.path.getsize(tmp_path / 'seg00000.bin') == PAGINA
+    ultimo = list(reg.reproducir())[-1]
+    assert ultimo == (4, registro.BOMBA_OFF, 0, SIN_DATO, SIN_DATO, 60500)
+
+
+def test_volcar_y_reabrir(tmp_path):
+    reg = nuevo(tmp_path)
+    llenar(reg, 1, 7)
+    reg.volcar()
+    otro = nuevo(tmp_path)
+    assert tiempos(otro) == list(range(1, 7))
+    assert otro.ultimo_tiempo() == 6
+    assert otro.segmentos == [0]
+    assert otro.inicios == [1]
+
+
+def test_rota_y_borra_los_mas_viejos(tmp_path):
+    reg = nuevo(tmp_path, max_segmentos=3)
+    llenar(reg, 1, 41)  # 10 páginas = 5 segmentos
+    assert reg.segmentos == [2, 3, 4]
+    assert sorted(os.listdir(tmp_path)) == ['seg00002.bin', 'seg00003.bin', 'seg00004.bin']
+    assert reg.inicios == [17, 25, 33]
+    assert tiempos(reg) == list(range(17, 41))
+    # Al reabrir se arma el mismo índice
+    otro = nuevo(tmp_path, max_segmentos=3)
+    assert (otro.segmentos, otro.inicios) == (reg.segmentos, reg.inicios)
+
+
+def test_reproducir_desde_saltea_segmentos(tmp_path, monkeypatch):
+    reg = nuevo(tmp_path, max_segmentos=8)
+    llenar(reg, 1, 33)  # segmentos que empiezan en 1, 9, 17 y 25
+    llenar(reg, 33, 35)  # y dos en RAM
+    abiertos = []
+    abrir = open
+
+    def espiar(ruta, *args):
+        abiertos.append(os.path.basename(ruta))
+        return abrir(ruta, *args)
+    monkeypatch.setattr('builtins.open', espiar)
+    assert tiempos(reg, 20) == list(range(20, 35))
+    assert abiertos == ['seg00002.bin', 'seg00003.bin']
+    abiertos.clear()
+    assert tiempos(reg, 25) == list(range(25, 35))
+    assert abiertos == ['seg00003.bin']
+
+
+def test_registro_a_medias_sigue_en_segmento_nuevo(tmp_path):
+    reg = nuevo(tmp_path)
+    llenar(reg, 1, 5)
+    # Corte de luz en medio de una escritura
+    with open(tmp_path / 'seg00000.bin', 'ab') as f:
+        f.write(b'\x05\x00\x00\x00\x00')
+    otro = nuevo(tmp_path)
+    assert otro.ultimo_tiempo() == 4
+    llenar(otro, 5, 9)
+    assert otro.segmentos == [0, 1]
+    assert os.path.getsize(tmp_path / 'seg00001.bin') == PAGINA
+    assert tiempos(otro) == list(range(1, 9))
+
+
+def test_ultimo_tiempo_con_segmento_nuevo_a_medias(tmp_path):
+    reg = nuevo(tmp_path)
+    llenar(reg, 1, 5)
+    # El segmento nuevo solo llegó a tener parte del primer registro
+    with open(tmp_path / 'seg00001.bin', 'wb') as f:
+        f.write(b'\x09\x00\x00\x00\x00\x00')
+    otro = nuevo(tmp_path)
+    assert otro.segmentos == [0, 1]
+    assert otro.ultimo_tiempo() == 4
+    assert tiempos(otro) == [1, 2, 3, 4]
+
+
+def test_segmento_sin_cabecera_se_borra(tmp_path):
+    reg = nuevo(tmp_path)
+    llenar(reg, 1, 5)
+    with open(tmp_path / 'seg00001.bin', 'wb') as f:
+        f.write(b'\x09\x00')
+    otro = nuevo(tmp_path)
+    assert otro.segmentos == [0]
+    assert otro.ultimo_tiempo() == 4
+    assert not (tmp_path / 'seg00001.bin').exists()
+    # Lo que sigue queda alineado en un segmento limpio
+    llenar(otro, 5, 13)
+    assert tiempos(otro) == list(range(1, 13))
+    assert tiempos(nuevo(tmp_path)) == list(range(1, 13))
+    assert nuevo(tmp_path).ultimo_tiempo() == 12
+
+
+def test_segmento_nuevo_despues_del_mas_alto(tmp_path, monkeypatch):
+    reg = nuevo(tmp_path)
+    llenar(reg, 1, 5)
+    with open(tmp_path / 'seg00001.bin', 'wb') as f:
+        f.write(b'\x09\x00')
+    # Si no se puede borrar, tampoco se vuelve a usar ese número
+
+    def solo_lectura(ruta):
+        raise OSError(30)  # EROFS
+    monkeypatch.setattr(os, 'remove', solo_lectura)
+    otro = nuevo(tmp_path)
+    llenar(otro, 5, 13)
+    assert otro.segmentos == [0, 2]
+    assert tiempos(otro) == list(range(1, 13))
+
+
+def test_vacio(tmp_path):
+    reg = nuevo(tmp_path / 'log')
+    assert os.path.isdir(tmp_path / 'log')
+    assert reg.ultimo_tiempo() == 0
+    assert tiempos(reg) == []
+
+
+def test_falla_de_escritura_no_pierde_el_buffer(tmp_path, monkeypatch):
+    reg = nuevo(tmp_path)
+    llenar(reg, 1, 3)
+    abrir = open
+
+    def sin_lugar(ruta, modo='r', *args):
+        if 'a' in modo:
+            raise OSError(28)  # ENOSPC
+        return abrir(ruta, modo, *args)
+    monkeypatch.setattr('builtins.open', sin_lugar)
+    with pytest.raises(OSError):
+        llenar(reg, 3, 5)
+    # La página llena sigue en RAM y el próximo agregar vuelve a intentar
+    with pytest.raises(OSError):
+        reg.agregar(5, registro.MUESTRA)
+    assert reg.ultimo_tiempo() == 4
+    monkeypatch.setattr('builtins.open', abrir)
+    llenar(reg, 5, 9)
+    assert tiempos(reg) == list(range(1, 9))
+    assert tiempos(nuevo(tmp_path)) == list(range(1, 9))
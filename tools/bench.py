@@ -0,0 +1,204 @@
+"""
+Mediciones de rendimiento en la PC con el simulador (no se sube al ESP32).
+
+Mide:
+- control: cuánto tarda una vuelta del control (lectura de suelo de
+  todas las zonas + control_zonas), en microsegundos.
+- http: latencia de /data, /metrics, /history y / contra el servidor
+  de riego.py (mediana y p95, en milisegundos), y peticiones por segundo
+  a /data por una sola conexión keep-alive.
+- parser: peticiones por segundo que lee LectorHTTP sin socket.
+- memoria: bytes que se piden de más (pico) y los que quedan tomados
+  por cada lectura de /, /data y /history, y por cada petición que lee
+  el parser.
+
+Los números de la PC no son los del ESP32, pero sirven para comparar
+un cambio contra el anterior:
+
+    python tools/bench.py --guardar base.json
+    ... cambios ...
+    python tools/bench.py --comparar base.json   # sale con 1 si empeoró
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import simulador  # noqa: E402
+
+RUTAS = ('/data', '/metrics', '/history?step=60', '/')
+PEDIDO = b'GET /data HTTP/1.1\r\nHost: sim\r\nAccept-Encoding: gzip\r\nIf-None-Match: "x"\r\n\r\n'
+
+resultados = {}
+
+
+def medir_control(m, vueltas):
+    m.control_activo = True
+    inicio = time.perf_counter()
+    for _ in range(vueltas):
+        m.read_soil_moisture()
+        m.control_zonas()
+    resultados['control_us'] = (time.perf_counter() - inicio) / vueltas * 1e6
+
+
+async def pedir(ruta):
+    reader, writer = await asyncio.open_connection('127.0.0.1', simulador.puerto)
+    writer.write(b'GET %s HTTP/1.1\r\nHost: sim\r\nConnection: close\r\n\r\n' % ruta.encode())
+    await writer.drain()
+    respuesta = await reader.read()
+    writer.close()
+    if not respuesta.startswith(b'HTTP/1.1 200'):
+        raise RuntimeError('%s: %r' % (ruta, respuesta[:40]))
+    return respuesta
+
+
+async def medir_http(cantidad):
+    for ruta in RUTAS:
+        tiempos = []
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            await pedir(ruta)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        nombre = ruta.split('?')[0].strip('/') or 'index'
+        resultados['http_%s_ms' % nombre] = tiempos[len(tiempos) // 2]
+        resultados['http_%s_p95_ms' % nombre] = tiempos[int(len(tiempos) * 0.95)]
+
+    # Keep-alive: todas las peticiones por la misma conexión
+    reader, writer = await asyncio.open_connection('127.0.0.1', simulador.puerto)
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        writer.write(PEDIDO)
+        await writer.drain()
+        cabecera = await reader.readuntil(b'\r\n\r\n')
+        if not cabecera.startswith(b'HTTP/1.1 200'):
+            raise RuntimeError('keep-alive: %r' % cabecera[:40])
+        await reader.readexactly(int(cabecera.split(b'Content-Length: ')[1].split(b'\r\n')[0]))
+    resultados['http_keepalive_req_s'] = cantidad / (time.perf_counter() - inicio)
+    writer.close()
+
+
+class Pedidos:
+    """Reader que entrega siempre la misma petición (para medir solo el parser)."""
+
+    async def readinto(self, mv):
+        mv[:len(PEDIDO)] = PEDIDO
+        return len(PEDIDO)
+
+
+async def medir_parser(cantidad):
+    import peticiones
+    lector = peticiones.LectorHTTP()
+    reader = Pedidos()
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        await lector.leer(reader)
+    resultados['parser_req_s'] = cantidad / (time.perf_counter() - inicio)
+
+
+async def medir_memoria(m, cantidad):
+    # Lado del servidor solamente: se arma la respuesta igual que en
+    # atender_cliente pero sin socket
+    import assets
+    import historial
+    import peticiones
+
+    class Descarte:
+        def write(self, datos):
+            pass
+
+        async def drain(self):
+            pass
+
+    salida = m.lectores_libres[0].salida
+    lector = peticiones.LectorHTTP()
+    pedidos = Pedidos()
+    nivel = historial.elegir_nivel(m.niveles_historial, 60)
+    pruebas = (
+        ('index', lambda: assets.servir(Descarte(), '/', None)),
+        ('data', lambda: m.read_sensor_json(salida)),
+        ('history', lambda: historial.enviar(Descarte(), salida, nivel, 0, 60, historial.PROMEDIO)),
+        ('parser', lambda: lector.leer(pedidos)),
+    )
+    tracemalloc.start()
+    for nombre, f in pruebas:
+        antes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for _ in range(cantidad):
+            r = f()
+            if asyncio.iscoroutine(r):
+                await r
+        actual, pico = tracemalloc.get_traced_memory()
+        resultados['mem_%s_pico_b' % nombre] = pico - antes
+        resultados['mem_%s_retenido_b' % nombre] = max(0, actual - antes) / cantidad
+    tracemalloc.stop()
+
+
+def tarea(vueltas, cantidad, calentamiento):
+    async def bench():
+        # Esperar a que arranque el servidor y se junte algo de historial
+        await asyncio.sleep(calentamiento)
+        m = sys.modules['riego']
+        await medir_memoria(m, cantidad)
+        await medir_http(cantidad)
+        await medir_parser(cantidad * 50)
+        medir_control(m, vueltas)
+    return bench
+
+
+def comparar(base, tolerancia):
+    peores = []
+    for clave, valor in sorted(resultados.items()):
+        anterior = base.get(clave)
+        if anterior is None:
+            continue
+        cambio = (valor - anterior) / anterior if anterior else (1 if valor else 0)
+        if clave.endswith('_req_s'):
+            cambio = -cambio  # acá más es mejor
+        marca = ''
+        if cambio > tolerancia:
+            marca = '  <-- empeoró'
+            peores.append(clave)
+        print('%-24s %12.2f %12.2f %+7.0f%%%s' % (clave, anterior, valor, cambio * 100, marca))
+    return peores
+
+
+def main():
+    p = argparse.ArgumentParser(description='Mediciones de rendimiento con el simulador')
+    p.add_argument('--vueltas', type=int, default=5000, help='vueltas del control a medir')
+    p.add_argument('--peticiones', type=int, default=200, help='peticiones por ruta')
+    p.add_argument('--calentamiento', type=float, default=3600,
+                   help='segundos virtuales antes de medir (llena el historial)')
+    p.add_argument('--puerto', type=int, default=8080)
+    p.add_argument('--guardar', help='escribir los resultados en este JSON')
+    p.add_argument('--comparar', help='JSON de una corrida anterior')
+    p.add_argument('--tolerancia', type=float, default=0.5, help='empeoramiento aceptado (0.5 = 50%%)')
+    a = p.parse_args()
+
+    simulador.instalar(puerto=a.puerto)
+    import bitacora
+    from simulador import planta
+    bitacora.nivel = bitacora.AVISO
+    planta.Maceta(32, 26)
+    simulador.ejecutar(tareas=[tarea(a.vueltas, a.peticiones, a.calentamiento)])
+
+    if a.guardar:
+        with open(a.guardar, 'w') as f:
+            json.dump(resultados, f, indent=1, sort_keys=True)
+    if a.comparar:
+        with open(a.comparar) as f:
+            peores = comparar(json.load(f), a.tolerancia)
+        if peores:
+            print('Empeoraron:', ', '.join(peores))
+            sys.exit(1)
+    else:
+        for clave, valor in sorted(resultados.items()):
+            print('%-24s %12.2f' % (clave, valor))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,413 @@
+"""
+Pruebas de carga contra riego.py en el simulador (no se sube al ESP32).
+
+El reloj acelerado del simulador no cobra el tiempo de CPU, así que acá
+riego.py corre en tiempo real y los clientes salen de otro proceso, como
+si fueran teléfonos en la red: lo que tarde el servidor en atenderlos
+se nota de verdad en el loop.
+
+    control   ritmo del tick de control (lectura de suelo + bomba) con
+              0, 1 y muchos clientes pidiendo /data, /history, /metrics
+              y / sin parar. Sale con 1 si el periodo se corre más de
+              --tolerancia ms respecto de PERIODO_CONTROL.
+    eventos   N dashboards abiertos, primero consultando /data cada 3 s
+              y después suscriptos a /events (como www/index.html, que
+              vuelve a /data mientras /events está lleno). Muestra el
+              CPU del servidor por lectura entregada (descontando el de
+              una corrida sin clientes) y las conexiones por minuto.
+    lentos    clientes normales pidiendo /data cada segundo mientras
+              --lentos conexiones mandan el header de a una línea por
+              segundo (y vuelven a conectarse cuando las cortan). Muestra
+              latencia y fallas de los normales sin y con las lentas; sale
+              con 1 si el p99 pasa --limite ms o fallan más de --fallas.
+
+Uso:
+    python tools/carga.py control --clientes 0 1 16 --segundos 20
+    python tools/carga.py eventos --clientes 4
+    python tools/carga.py lentos --lentos 16 --segundos 30
+
+Cada escenario corre en su propio proceso (el simulador deja estado en
+los módulos falsos), de a uno para que no se roben CPU entre ellos.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import simulador  # noqa: E402
+
+RUTAS = ('/data', '/history?step=60', '/metrics', '/')
+ARRANQUE_S = 3   # hasta que el simulador "se conecta al Wi-Fi" y abre el puerto
+SONDEO_S = 3     # lo que espera www/index.html entre dos /data
+REINTENTO_EVENTOS_S = 30  # Retry-After del 503 de /events
+GOTEO_S = 1      # cada cuánto manda una línea de header un cliente lento
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def sumar(cuenta, clave, n=1):
+    cuenta[clave] = cuenta.get(clave, 0) + n
+
+
+async def pedir(puerto, ruta):
+    """Un GET con Connection: close. Devuelve el código de estado (0 si no conectó)."""
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+    except OSError:
+        return 0
+    try:
+        writer.write(b'GET %s HTTP/1.1\r\nHost: sim\r\nConnection: close\r\n\r\n' % ruta.encode())
+        await writer.drain()
+        respuesta = await reader.read()
+    except OSError:
+        return 0
+    finally:
+        writer.close()
+    try:
+        return int(respuesta[9:12])
+    except ValueError:
+        return 0
+
+
+# --- Clientes (corren en su propio proceso, con el time de verdad) ---
+
+async def insistente(puerto, hasta, k, cuenta):
+    """Pide las RUTAS una tras otra, sin pausa, hasta `hasta` (time.monotonic)."""
+    i = k
+    while time.monotonic() < hasta:
+        estado = await pedir(puerto, RUTAS[i % len(RUTAS)])
+        sumar(cuenta, estado)
+        i += 1
+        if not estado:
+            await asyncio.sleep(0.05)  # el servidor todavía no abrió
+
+
+async def insistentes(puerto, n, segundos):
+    hasta = time.monotonic() + segundos
+    cuenta = {}
+    await asyncio.gather(*(insistente(puerto, hasta, k, cuenta) for k in range(n)))
+    return cuenta
+
+
+async def sondear(puerto, desde, hasta, cuenta):
+    """Un dashboard sin /events: /data cada SONDEO_S, una conexión por lectura."""
+    while time.monotonic() < hasta:
+        inicio = time.monotonic()
+        estado = await pedir(puerto, '/data')
+        if desde <= inicio < hasta:
+            sumar(cuenta, 'conexiones')
+            if estado == 200:
+                sumar(cuenta, 'lecturas')
+        await asyncio.sleep(max(0, SONDEO_S - (time.monotonic() - inicio)) if estado else 0.05)
+
+
+async def suscribir(puerto, desde, hasta, cuenta):
+    """
+    Un dashboard con /events. Si el servidor lo rechaza (503) consulta
+    /data hasta que pasa REINTENTO_EVENTOS_S y vuelve a probar.
+    """
+    while time.monotonic() < hasta:
+        inicio = time.monotonic()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+        except OSError:
+            await asyncio.sleep(0.05)  # el servidor todavía no abrió
+            continue
+        if inicio >= desde:
+            sumar(cuenta, 'conexiones')
+        try:
+            writer.write(b'GET /events HTTP/1.1\r\nHost: sim\r\nAccept: text/event-stream\r\n\r\n')
+            await writer.drain()
+            cabecera = await reader.readuntil(b'\r\n\r\n')
+            if cabecera.startswith(b'HTTP/1.1 200'):
+                resto = b''
+                while True:
+                    falta = hasta - time.monotonic()
+                    if falta <= 0:
+                        break
+                    try:
+                        datos = await asyncio.wait_for(reader.read(4096), falta)
+                    except asyncio.TimeoutError:
+                        break
+                    if not datos:
+                        break
+                    # Cada mensaje termina en una línea vacía
+                    resto += datos
+                    n = resto.count(b'\n\n')
+                    if n:
+                        resto = resto[resto.rfind(b'\n\n') + 2:]
+                        if time.monotonic() >= desde:
+                            sumar(cuenta, 'lecturas', n)
+                continue
+        except (OSError, asyncio.IncompleteReadError):
+            continue
+        finally:
+            writer.close()
+        sumar(cuenta, 'rechazos')
+        await sondear(puerto, desde, min(time.monotonic() + REINTENTO_EVENTOS_S, hasta), cuenta)
+
+
+async def tableros(puerto, n, modo, desde, segundos):
+    ahora = time.monotonic()
+    cuenta = {}
+    cliente = suscribir if modo == 'eventos' else sondear
+
+    async def abrir(k):
+        # Cada dashboard se abre en otro momento, no todos en el mismo ms
+        await asyncio.sleep(k * SONDEO_S / n)
+        await cliente(puerto, ahora + desde, ahora + desde + segundos, cuenta)
+    await asyncio.gather(*(abrir(k) for k in range(n)))
+    return cuenta
+
+
+async def lento(puerto, hasta, cuenta):
+    """
+    Abre una conexión y manda el header de a una línea por GOTEO_S, sin
+    terminarlo nunca. Cuando el servidor la corta, abre otra.
+    """
+    while time.monotonic() < hasta:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+        except OSError:
+            await asyncio.sleep(0.05)
+            continue
+        sumar(cuenta, 'lentas')
+        try:
+            writer.write(b'GET /data HTTP/1.1\r\n')
+            while time.monotonic() < hasta:
+                await writer.drain()
+                try:
+                    # Si el servidor contesta (503) o corta, read() vuelve antes
+                    await asyncio.wait_for(reader.read(256), GOTEO_S)
+                    break
+                except asyncio.TimeoutError:
+                    writer.write(b'X-Goteo: 1\r\n')
+        except OSError:
+            pass
+        finally:
+            writer.close()
+        await asyncio.sleep(GOTEO_S)  # lento para todo, también para volver
+
+
+async def bueno(puerto, desde, hasta, cuenta, latencias):
+    """Un /data por segundo; anota la latencia de los que salen bien."""
+    while time.monotonic() < hasta:
+        inicio = time.monotonic()
+        estado = await pedir(puerto, '/data')
+        ms = (time.monotonic() - inicio) * 1000
+        # Sin conexión antes de la primera respuesta es el servidor arrancando
+        if desde <= inicio < hasta and (estado or latencias):
+            if estado == 200:
+                latencias.append(ms)
+            else:
+                sumar(cuenta, estado)
+        await asyncio.sleep(max(0, 1 - ms / 1000) if estado else 0.05)
+
+
+async def lentos_y_buenos(puerto, buenos, lentos, desde, segundos):
+    ahora = time.monotonic()
+    fallas = {}
+    conexiones = {}
+    latencias = []
+
+    async def abrir(k):
+        await asyncio.sleep(k / buenos)
+        await bueno(puerto, ahora + desde, ahora + desde + segundos, fallas, latencias)
+    await asyncio.gather(*([abrir(k) for k in range(buenos)]
+                           + [lento(puerto, ahora + desde + segundos, conexiones) for _ in range(lentos)]))
+    return {'latencias': latencias, 'fallas': fallas, 'lentas': conexiones.get('lentas', 0)}
+
+
+def _en_proceso(objetivo, argumentos, cola):
+    # argumentos[1] es la cantidad de clientes
+    cola.put(asyncio.run(objetivo(*argumentos)) if argumentos[1] else {})
+
+
+# --- Servidor (riego.py en el simulador, en tiempo real) ---
+
+def con_clientes(a, objetivo, argumentos, preparar=None):
+    """
+    Corre riego.py durante ARRANQUE_S + a.segundos con objetivo(*argumentos)
+    en otro proceso. Devuelve (riego, lo que devolvió objetivo, segundos de
+    CPU del servidor después del arranque).
+    """
+    # Los clientes arrancan antes de instalar el simulador: su proceso
+    # usa el time de verdad
+    cola = multiprocessing.Queue()
+    proceso = multiprocessing.Process(target=_en_proceso, args=(objetivo, argumentos, cola))
+    proceso.start()
+
+    simulador.instalar(puerto=a.puerto, acelerado=False)
+    from simulador import planta
+    planta.Maceta(32, 26)
+    cpu = []
+
+    async def medir():
+        await asyncio.sleep(ARRANQUE_S)
+        inicio = time.process_time()
+        await asyncio.sleep(a.segundos)
+        cpu.append(time.process_time() - inicio)
+
+    def preparar_todo(m):
+        import bitacora
+        bitacora.nivel = bitacora.AVISO
+        if preparar is not None:
+            preparar(m)
+
+    m = simulador.ejecutar(tareas=[medir], preparar=preparar_todo)
+    resultado = cola.get()
+    proceso.join()
+    return m, resultado, cpu[0]
+
+
+def correr_control(a, clientes):
+    ticks = []
+
+    def preparar(m):
+        leer = m.read_soil_moisture
+
+        def read_soil_moisture():
+            ticks.append(time.perf_counter())
+            return leer()
+        m.read_soil_moisture = read_soil_moisture
+
+    m, cuenta, _ = con_clientes(a, insistentes, (a.puerto, clientes, ARRANQUE_S + a.segundos), preparar)
+    # Sin el arranque (la primera lectura de start() y la espera del Wi-Fi)
+    inicio = ticks[0] + ARRANQUE_S
+    periodos = [(b - a_) * 1000 for a_, b in zip(ticks, ticks[1:]) if a_ >= inicio]
+    return {'clientes': clientes, 'ticks': len(periodos), 'periodo_ms': m.PERIODO_CONTROL,
+            'p50_ms': percentil(periodos, 0.5), 'p99_ms': percentil(periodos, 0.99),
+            'max_ms': max(periodos), 'min_ms': min(periodos),
+            'respuestas': sum(v for k, v in cuenta.items() if k), 'ocupado': cuenta.get(503, 0)}
+
+
+def correr_eventos(a, modo, clientes):
+    _, cuenta, cpu = con_clientes(a, tableros, (a.puerto, clientes, modo, ARRANQUE_S, a.segundos))
+    return dict(cuenta, modo=modo, clientes=clientes, cpu_s=cpu, segundos=a.segundos)
+
+
+def correr_lentos(a, lentos):
+    _, r, _ = con_clientes(a, lentos_y_buenos, (a.puerto, a.buenos, lentos, ARRANQUE_S, a.segundos))
+    latencias = r['latencias']
+    return {'lentos': lentos, 'pedidos': len(latencias) + sum(r['fallas'].values()),
+            'fallas': r['fallas'], 'lentas': r['lentas'], 'p50_ms': percentil(latencias, 0.5),
+            'p99_ms': percentil(latencias, 0.99), 'max_ms': max(latencias) if latencias else 0}
+
+
+def escenario(a, nombre):
+    """Corre un escenario en su proceso y devuelve su resultado."""
+    a.puerto += 1
+    proceso = subprocess.Popen([sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+                               + ['--puerto', str(a.puerto), '--escenario', nombre],
+                               stdout=subprocess.PIPE, text=True)
+    salida, _ = proceso.communicate()
+    if proceso.returncode:
+        sys.exit('escenario %s: falló la simulación' % nombre)
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def control(a):
+    if a.escenario is not None:
+        print(json.dumps(correr_control(a, int(a.escenario))))
+        return 0
+    resultados = [escenario(a, str(n)) for n in a.clientes]
+    print('%8s %7s %9s %9s %9s %9s %11s %8s' % ('clientes', 'ticks', 'p50 ms', 'p99 ms', 'mín ms',
+                                               'máx ms', 'respuestas', '503'))
+    malos = []
+    for r in resultados:
+        print('%8d %7d %9.1f %9.1f %9.1f %9.1f %11d %8d'
+              % (r['clientes'], r['ticks'], r['p50_ms'], r['p99_ms'], r['min_ms'], r['max_ms'],
+                 r['respuestas'], r['ocupado']))
+        if max(r['p99_ms'] - r['periodo_ms'], r['periodo_ms'] - r['min_ms']) > a.tolerancia:
+            malos.append(r['clientes'])
+    if malos:
+        print('El periodo de control se corrió más de %g ms con %s clientes'
+              % (a.tolerancia, ', '.join(map(str, malos))))
+        return 1
+    print('Periodo de control estable (±%g ms de %d ms)' % (a.tolerancia, resultados[0]['periodo_ms']))
+    return 0
+
+
+def eventos(a):
+    if a.escenario is not None:
+        modo, n = a.escenario.split(':')
+        print(json.dumps(correr_eventos(a, modo, int(n))))
+        return 0
+    base = escenario(a, 'sondeo:0')
+    print('%-8s %8s %9s %10s %11s %11s %11s' % ('', 'clientes', 'lecturas', 'lecturas/s',
+                                              'conexiones', 'conex./min', 'CPU/lectura'))
+    for modo in ('sondeo', 'eventos'):
+        r = escenario(a, '%s:%d' % (modo, a.clientes))
+        lecturas = r.get('lecturas', 0)
+        extra = r['cpu_s'] - base['cpu_s'] * r['segundos'] / base['segundos']
+        print('%-8s %8d %9d %10.2f %11d %11.1f %8.2f ms%s'
+              % (modo, a.clientes, lecturas, lecturas / r['segundos'], r.get('conexiones', 0),
+                 r.get('conexiones', 0) / r['segundos'] * 60, extra * 1000 / max(1, lecturas),
+                 '   (%d rechazos de /events)' % r['rechazos'] if r.get('rechazos') else ''))
+    print('(CPU del servidor sin clientes: %.1f ms por segundo, descontado)'
+          % (base['cpu_s'] / base['segundos'] * 1000))
+    return 0
+
+
+def lentos(a):
+    if a.escenario is not None:
+        print(json.dumps(correr_lentos(a, int(a.escenario))))
+        return 0
+    resultados = [escenario(a, str(n)) for n in (0, a.lentos)]
+    print('%7s %10s %8s %8s %9s %9s %9s' % ('lentos', 'conex./s', 'pedidos', 'fallas',
+                                          'p50 ms', 'p99 ms', 'máx ms'))
+    malos = False
+    for r in resultados:
+        fallas = sum(r['fallas'].values())
+        print('%7d %10.1f %8d %8d %9.1f %9.1f %9.1f%s'
+              % (r['lentos'], r['lentas'] / a.segundos, r['pedidos'], fallas,
+                 r['p50_ms'], r['p99_ms'], r['max_ms'],
+                 '   (%s)' % ', '.join('%s: %d' % (k if k != '0' else 'sin conexión', v)
+                                       for k, v in sorted(r['fallas'].items())) if fallas else ''))
+        if r['p99_ms'] > a.limite or fallas > r['pedidos'] * a.fallas:
+            malos = True
+    if malos:
+        print('Los clientes normales superaron %g ms de p99 o %g %% de fallas' % (a.limite, a.fallas * 100))
+        return 1
+    print('Clientes normales atendidos con p99 < %g ms' % a.limite)
+    return 0
+
+
+def main():
+    p = argparse.ArgumentParser(description='Pruebas de carga contra riego.py en el simulador')
+    sub = p.add_subparsers(dest='prueba', required=True)
+    c = sub.add_parser('control', help='ritmo del tick de control con 0, 1 y muchos clientes')
+    c.add_argument('--clientes', type=int, nargs='+', default=[0, 1, 16])
+    c.add_argument('--segundos', type=float, default=20, help='duración de cada escenario')
+    c.add_argument('--tolerancia', type=float, default=50, help='ms que se acepta que se corra el periodo')
+    c.set_defaults(funcion=control)
+    e = sub.add_parser('eventos', help='CPU y conexiones con /data cada 3 s contra /events')
+    e.add_argument('--clientes', type=int, default=4, help='dashboards abiertos')
+    e.add_argument('--segundos', type=float, default=60, help='duración de cada escenario')
+    e.set_defaults(funcion=eventos)
+    ll = sub.add_parser('lentos', help='latencia de clientes normales con muchas conexiones lentas')
+    ll.add_argument('--lentos', type=int, default=16, help='conexiones que mandan el header de a poco')
+    ll.add_argument('--buenos', type=int, default=2, help='clientes que piden /data cada segundo')
+    ll.add_argument('--segundos', type=float, default=30, help='duración de cada escenario')
+    ll.add_argument('--limite', type=float, default=1500, help='p99 aceptado para los normales (ms)')
+    ll.add_argument('--fallas', type=float, default=0.05, help='fracción de pedidos normales que puede fallar')
+    ll.set_defaults(funcion=lentos)
+    for s in (c, e, ll):
+        s.add_argument('--puerto', type=int, default=8180)
+        s.add_argument('--escenario', help=argparse.SUPPRESS)
+    a = p.parse_args()
+    sys.exit(a.funcion(a))
+
+
+if __name__ == '__main__':
+    main()
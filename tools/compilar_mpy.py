@@ -0,0 +1,51 @@
+"""
+Paso de build opcional (se corre en la PC, no en el ESP32).
+
+Precompila los módulos a .mpy con mpy-cross para que la placa no tenga
+que compilarlos en cada arranque (menos tiempo y menos RAM al importar).
+Deja en build/ todo lo que hay que subir: los .mpy, boot.py y main.py
+como fuente y la carpeta www/. MicroPython solo arranca main.py desde
+fuente, por eso main.py son dos líneas que importan riego (la
+aplicación, el módulo más grande) y lo único que se compila en la placa.
+
+Uso:
+    pip install mpy-cross     # la versión tiene que coincidir con el firmware
+    python tools/compilar_mpy.py
+y después subir el contenido de build/ a la placa. El tiempo de arranque
+se ve en /metrics (arranque_ms) o en la consola.
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Se suben como .py (main.py solo importa riego)
+FUENTES = ('boot.py', 'main.py')
+
+
+def modulos():
+    for nombre in sorted(os.listdir(RAIZ)):
+        if nombre.endswith('.py') and nombre not in FUENTES:
+            yield nombre
+
+
+def main(destino, mpy_cross):
+    if shutil.which(mpy_cross) is None:
+        sys.exit('No se encontró %s (pip install mpy-cross)' % mpy_cross)
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    os.makedirs(destino)
+    for nombre in modulos():
+        salida = os.path.join(destino, nombre[:-3] + '.mpy')
+        subprocess.check_call([mpy_cross, '-O1', '-o', salida, os.path.join(RAIZ, nombre)])
+        print('%s: %d -> %d bytes' % (nombre, os.path.getsize(os.path.join(RAIZ, nombre)),
+                                      os.path.getsize(salida)))
+    for nombre in FUENTES:
+        shutil.copy(os.path.join(RAIZ, nombre), destino)
+    shutil.copytree(os.path.join(RAIZ, 'www'), os.path.join(destino, 'www'))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else os.path.join(RAIZ, 'build'),
+         os.environ.get('MPY_CROSS', 'mpy-cross'))
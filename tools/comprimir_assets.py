@@ -0,0 +1,44 @@
+"""
+Paso de build (se corre en la PC, no en el ESP32).
+
+Genera una copia .gz de cada archivo de www/ que valga la pena comprimir,
+para que el servidor la mande tal cual con Content-Encoding: gzip sin
+gastar CPU ni RAM del ESP32 en comprimir.
+
+Uso:
+    python tools/comprimir_assets.py
+y después subir la carpeta www/ completa (con los .gz) a la placa.
+"""
+import gzip
+import os
+import sys
+
+EXTENSIONES = ('.html', '.css', '.js', '.json', '.svg')
+
+
+def comprimir(ruta):
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    # mtime=0 para que el .gz (y su ETag) solo cambie si cambia el contenido
+    comprimido = gzip.compress(datos, compresslevel=9, mtime=0)
+    if len(comprimido) >= len(datos):
+        return len(datos), None
+    with open(ruta + '.gz', 'wb') as f:
+        f.write(comprimido)
+    return len(datos), len(comprimido)
+
+
+def main(directorio):
+    for nombre in sorted(os.listdir(directorio)):
+        if not nombre.endswith(EXTENSIONES):
+            continue
+        original, comprimido = comprimir(os.path.join(directorio, nombre))
+        if comprimido is None:
+            print('%s: %d bytes (no se comprime)' % (nombre, original))
+        else:
+            print('%s: %d -> %d bytes (%.1fx)' % (nombre, original, comprimido, original / comprimido))
+
+
+if __name__ == '__main__':
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    main(sys.argv[1] if len(sys.argv) > 1 else os.path.join(raiz, 'www'))
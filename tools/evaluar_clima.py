@@ -0,0 +1,171 @@
+"""
+Evaluación del riego según el clima (MODO_ET) con una traza de clima.
+
+Corre riego.py en el simulador con y sin MODO_ET sobre el mismo clima:
+la temperatura y la humedad del aire salen de la traza, el DHT11 falso
+las lee y la maceta se seca según la evapotranspiración de ese momento
+(Romanenko, ver evapotranspiracion.py). Para cada variante muestra el
+agua usada, los riegos y el tiempo con el suelo fuera de la banda
+LOW_THRESHOLD..HIGH_THRESHOLD (muestreado cada minuto). Como MODO_ET
+baja el umbral a propósito cuando el clima pide poca agua, también se
+cuenta el tiempo por debajo de LOW_THRESHOLD - MAX_AJUSTE_ET (estrés).
+
+La maceta transpira menos con el suelo más seco (ver planta.py,
+humedad_plena): sin eso el agua usada no dependería de la humedad a la
+que se mantiene el suelo.
+
+Uso:
+    python tools/evaluar_clima.py                    # 4 días sintéticos
+    python tools/evaluar_clima.py --traza clima.csv  # hora,temp,hum por línea
+
+Cada variante corre en su propio proceso (el simulador deja estado en
+los módulos falsos).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import simulador  # noqa: E402
+
+VARIANTES = (('umbrales fijos', 0), ('con clima', 1))
+
+
+def traza_sintetica():
+    """
+    Cuatro días con ciclo diario: uno templado, una ola de calor seca,
+    uno fresco y lluvioso y otro templado. (hora, temp, hum) cada hora.
+    """
+    dias = ((22, 6, 55), (32, 7, 30), (15, 3, 90), (22, 6, 55))
+    traza = []
+    for d, (media, amplitud, hum) in enumerate(dias):
+        for h in range(24):
+            # Máxima a las 15, mínima a las 3
+            ciclo = math.cos((h - 15) / 24 * 2 * math.pi)
+            traza.append((d * 24 + h, media + amplitud * ciclo,
+                          min(98, max(10, hum - 15 * ciclo))))
+    return traza
+
+
+def leer_traza(ruta):
+    traza = []
+    with open(ruta) as f:
+        for linea in f:
+            partes = linea.strip().split(',')
+            try:
+                traza.append(tuple(float(p) for p in partes[:3]))
+            except ValueError:
+                continue  # encabezado o línea vacía
+    return sorted(traza)
+
+
+def interpolar(traza, hora):
+    """(temp, hum) en `hora`, lineal entre los puntos de la traza."""
+    if hora <= traza[0][0]:
+        return traza[0][1:]
+    for (h0, t0, u0), (h1, t1, u1) in zip(traza, traza[1:]):
+        if hora <= h1:
+            f = (hora - h0) / (h1 - h0) if h1 > h0 else 0
+            return t0 + (t1 - t0) * f, u0 + (u1 - u0) * f
+    return traza[-1][1:]
+
+
+def correr_variante(a, modo_et):
+    simulador.instalar(a.semilla)
+    import dht
+    import machine
+    from simulador import planta
+    import evapotranspiracion
+
+    traza = leer_traza(a.traza) if a.traza else traza_sintetica()
+    horas = a.horas or traza[-1][0]
+
+    def clima():
+        return interpolar(traza, simulador.reloj.segundos() / 3600)
+
+    dht.temperatura = lambda: clima()[0]
+    dht.humedad = lambda: clima()[1]
+
+    def preparar(m):
+        import bitacora
+        bitacora.nivel = bitacora.AVISO
+        # MODO_ET es un ajuste de /config: iniciar() lo toma de config.valores
+        cambios = {'weather': bool(modo_et)}
+        if a.max_ajuste is not None:
+            cambios['et_max_shift'] = a.max_ajuste
+        m.config.valores = dict(m.config.valores, **cambios)
+
+    import riego
+    preparar(riego)
+    maceta = planta.Maceta(riego.ZONAS[0][1], riego.ZONAS[0][2], a.humedad,
+                           lambda: evapotranspiracion.tasa(*clima()) * a.secado_por_mm,
+                           a.riego, a.demora, a.humedad_plena)
+    fuera = {'debajo_min': 0, 'estres_min': 0, 'encima_min': 0}
+
+    async def muestrear():
+        for _ in range(int(horas * 60)):
+            await asyncio.sleep(60)
+            maceta.actualizar()
+            if maceta.humedad < riego.LOW_THRESHOLD:
+                fuera['debajo_min'] += 1
+                if maceta.humedad < riego.LOW_THRESHOLD - riego.MAX_AJUSTE_ET:
+                    fuera['estres_min'] += 1
+            elif maceta.humedad > riego.HIGH_THRESHOLD:
+                fuera['encima_min'] += 1
+
+    simulador.ejecutar(duracion=horas * 3600, tareas=[muestrear], preparar=preparar)
+    maceta.actualizar()
+    riegos = sum(1 for _, pin, v in machine.transiciones if pin == riego.ZONAS[0][2] and v)
+    print(json.dumps(dict(fuera, horas=horas, agua_ml=riego.consumo_bomba.ml_total,
+                          bomba_s=maceta.agua_s, riegos=riegos, humedad_final=maceta.humedad)))
+
+
+def main():
+    p = argparse.ArgumentParser(description='Riego con y sin MODO_ET sobre una traza de clima')
+    p.add_argument('--traza', help='CSV con hora,temp,hum (horas desde el inicio)')
+    p.add_argument('--horas', type=float, help='por defecto, lo que dura la traza')
+    p.add_argument('--semilla', type=int, default=1)
+    p.add_argument('--humedad', type=float, default=65, help='humedad inicial del suelo (%%)')
+    p.add_argument('--secado-por-mm', type=float, default=0.5,
+                   help='%% de humedad por hora que se pierde por cada mm/día de ET')
+    p.add_argument('--riego', type=float, default=1.5, help='%% por segundo de bomba')
+    p.add_argument('--demora', type=float, default=120, help='segundos hasta que el agua llega al sensor')
+    p.add_argument('--humedad-plena', type=float, default=70,
+                   help='debajo de esta humedad la maceta transpira menos (0 = nunca)')
+    p.add_argument('--max-ajuste', type=int, help='puntos que puede bajar el umbral (MAX_AJUSTE_ET)')
+    p.add_argument('--variante', type=int, choices=(0, 1), help=argparse.SUPPRESS)
+    a = p.parse_args()
+
+    if a.variante is not None:
+        correr_variante(a, a.variante)
+        return
+
+    # Las dos variantes a la vez, cada una en su proceso
+    procesos = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--variante', str(modo_et)]
+                                 + sys.argv[1:], stdout=subprocess.PIPE, text=True)
+                for _, modo_et in VARIANTES]
+    print('%-16s %9s %8s %7s %10s %10s %10s' % ('', 'agua ml', 'bomba s', 'riegos',
+                                               '< LOW h', 'estrés h', '> HIGH h'))
+    base = None
+    for (nombre, _), proceso in zip(VARIANTES, procesos):
+        salida, _ = proceso.communicate()
+        if proceso.returncode:
+            sys.exit('%s: falló la simulación' % nombre)
+        r = json.loads(salida.strip().splitlines()[-1])
+        print('%-16s %9d %8.0f %7d %10.1f %10.1f %10.1f'
+              % (nombre, r['agua_ml'], r['bomba_s'], r['riegos'], r['debajo_min'] / 60,
+                 r['estres_min'] / 60, r['encima_min'] / 60))
+        if base is None:
+            base = r
+        elif base['agua_ml']:
+            print('Agua: %+.1f %%, riegos: %+d' % ((r['agua_ml'] / base['agua_ml'] - 1) * 100,
+                                                   r['riegos'] - base['riegos']))
+    print('(%.0f h simuladas; estrés = debajo de LOW_THRESHOLD - MAX_AJUSTE_ET)' % r['horas'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Filtro del sensor de suelo contra el antirrebote anterior, sobre una traza.
+
+Reproduce una traza de humedad "real" del suelo con ruido de ADC (gauss
+más picos sueltos, como los que mete la bomba o el Wi-Fi) y pasa las
+lecturas por dos detectores de "suelo seco" que corren cada
+PERIODO_CONTROL:
+
+    antirrebote   una sola conversión por tick y 3 lecturas seguidas por
+                  debajo del umbral (lo que hacía main.py antes de suelo.py)
+    filtro        ráfaga + media recortada + EMA de suelo.SensorSuelo; con
+                  ruido bajo alcanza una lectura, si no 3 (como control_bomba)
+
+Para cada uno muestra:
+    latencia      desde que el suelo cruza el umbral hasta el primer disparo
+                  con el suelo ya por debajo
+    falsos        disparos con el suelo todavía --margen puntos o más por
+                  encima del umbral, por hora de traza
+    perdidos      cruces sin disparo antes de que el suelo vuelva a subir
+    tempranos     disparos con el suelo todavía por encima del umbral pero a
+                  menos de --margen puntos (cada uno es un riego de más)
+
+Después de cada disparo el detector vuelve a cero y no puede dispararse
+durante --bloqueo segundos (MIN_TIEMPO_APAGADA). La traza no se toca: el
+riego no cambia la humedad, así se comparan los dos sobre lo mismo.
+
+Uso:
+    python tools/evaluar_filtro.py                        # traza sintética, ruido 30 y 90
+    python tools/evaluar_filtro.py --traza suelo.csv      # segundos,humedad por línea
+    python tools/evaluar_filtro.py --ruido 40 --picos 0.05
+"""
+import argparse
+import os
+import random
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import calibracion  # noqa: E402
+import suelo  # noqa: E402
+
+METODOS = ('antirrebote', 'filtro')
+
+
+def traza_sintetica(umbral, margen, secado, episodios):
+    """
+    Episodios de: una hora quieto apenas por encima de la zona dudosa
+    (prueba de falsos disparos), secado parejo a `secado` %/h hasta 4
+    puntos por debajo del umbral y un riego que lo sube en un minuto.
+    Devuelve [(segundos, humedad)], lineal entre puntos.
+    """
+    alto = umbral + margen + 1
+    traza = []
+    t = 0
+    for _ in range(episodios):
+        traza.append((t, alto))
+        t += 3600
+        traza.append((t, alto))
+        t += (alto - (umbral - 4)) / secado * 3600
+        traza.append((t, umbral - 4))
+        t += 60
+    traza.append((t, alto))
+    return traza
+
+
+def leer_traza(ruta):
+    traza = []
+    with open(ruta) as f:
+        for linea in f:
+            try:
+                traza.append(tuple(float(p) for p in linea.strip().split(',')[:2]))
+            except ValueError:
+                continue  # encabezado o línea vacía
+    return sorted(traza)
+
+
+class ADCRuidoso:
+    """ADC falso: la humedad de la traza pasada a cuentas, con ruido y picos."""
+
+    def __init__(self, rng, sigma, prob_pico, pico):
+        self.rng = rng
+        self.sigma = sigma
+        self.prob_pico = prob_pico
+        self.pico = pico
+        self.cuentas = 0
+
+    def fijar(self, humedad):
+        seco, humedo = calibracion.SECO_DEFECTO, calibracion.HUMEDO_DEFECTO
+        self.cuentas = seco + (humedo - seco) * humedad / 100
+
+    def read(self):
+        v = self.cuentas + self.rng.gauss(0, self.sigma)
+        if self.rng.random() < self.prob_pico:
+            v += self.pico if self.rng.random() < 0.5 else -self.pico
+        return min(calibracion.MAX_ADC, max(0, int(v)))
+
+
+class Antirrebote:
+    def __init__(self, adc, cal, a):
+        self.adc = adc
+        self.cal = cal
+        self.umbral = a.umbral
+        self.secas = 0
+
+    def seco(self):
+        if self.cal.porcentaje(self.adc.read()) < self.umbral:
+            self.secas += 1
+        else:
+            self.secas = 0
+        return self.secas >= 3
+
+
+class Filtro(Antirrebote):
+    def __init__(self, adc, cal, a):
+        super().__init__(adc, cal, a)
+        self.sensor = suelo.SensorSuelo(adc)
+        self.ruido_maximo = a.ruido_maximo
+
+    def seco(self):
+        if self.cal.porcentaje(self.sensor.leer()) < self.umbral:
+            self.secas += 1
+        else:
+            self.secas = 0
+        return self.secas >= (1 if self.sensor.ruido <= self.ruido_maximo else 3)
+
+
+def reproducir(traza, metodo, sigma, a):
+    rng = random.Random(a.semilla)
+    adc = ADCRuidoso(rng, sigma, a.picos, a.pico)
+    cal = calibracion.Calibracion(os.devnull)  # curva de fábrica
+    detector = (Filtro if metodo == 'filtro' else Antirrebote)(adc, cal, a)
+    latencias = []
+    tempranos = falsos = perdidos = 0
+    bloqueado_hasta = -1
+    entrada = None  # cuándo bajó de umbral + margen (desde ahí no es falso)
+    cruce = None    # cuándo cruzó el umbral
+    disparo = None  # primer disparo con el suelo debajo del umbral
+    previa = traza[0][1]
+    k = 0
+    t = traza[0][0]
+    while t <= traza[-1][0]:
+        while traza[k + 1][0] < t:
+            k += 1
+        (t0, h0), (t1, h1) = traza[k], traza[k + 1]
+        h = h0 + (h1 - h0) * (t - t0) / (t1 - t0) if t1 > t0 else h1
+        if h >= a.umbral + a.margen:
+            # Volvió a subir: se cierra el episodio
+            if cruce is not None:
+                if disparo is None:
+                    perdidos += 1
+                else:
+                    latencias.append(disparo - cruce)
+            entrada = cruce = disparo = None
+        elif entrada is None:
+            entrada = t
+        if h < a.umbral <= previa:
+            cruce = t
+        previa = h
+
+        adc.fijar(h)
+        if detector.seco() and t >= bloqueado_hasta:
+            detector.secas = 0
+            bloqueado_hasta = t + a.bloqueo
+            if entrada is None:
+                falsos += 1
+            elif h >= a.umbral:
+                tempranos += 1
+            elif disparo is None:
+                disparo = t
+        t += a.periodo
+    if cruce is not None and disparo is not None:
+        latencias.append(disparo - cruce)
+    latencias.sort()
+    return {
+        'horas': (traza[-1][0] - traza[0][0]) / 3600,
+        'cruces': len(latencias) + perdidos,
+        'tempranos': tempranos,
+        'falsos': falsos,
+        'perdidos': perdidos,
+        'latencia_p50': latencias[len(latencias) // 2] if latencias else None,
+        'latencia_p95': latencias[int(len(latencias) * 0.95)] if latencias else None,
+        'latencia_max': latencias[-1] if latencias else None,
+    }
+
+
+def segundos(v):
+    return '%9s' % '-' if v is None else '%9.1f' % v
+
+
+def main():
+    p = argparse.ArgumentParser(description='Filtro del suelo contra el antirrebote de 3 lecturas')
+    p.add_argument('--traza', help='CSV con segundos,humedad (humedad real del suelo)')
+    p.add_argument('--episodios', type=int, default=8, help='episodios de la traza sintética')
+    p.add_argument('--secado', type=float, default=3, help='%%/h que se seca en la traza sintética')
+    p.add_argument('--ruido', type=float, nargs='+', default=[30, 90],
+                   help='desvío del ruido del ADC en cuentas (se prueba cada uno)')
+    p.add_argument('--picos', type=float, default=0.01, help='probabilidad de un pico por conversión')
+    p.add_argument('--pico', type=float, default=500, help='altura de los picos en cuentas')
+    p.add_argument('--umbral', type=int, default=52, help='LOW_THRESHOLD - 3 de control_bomba')
+    p.add_argument('--margen', type=float, default=2,
+                   help='puntos sobre el umbral desde los que un disparo cuenta como falso')
+    p.add_argument('--ruido-maximo', type=float, default=60, help='RUIDO_MAXIMO de riego.py')
+    p.add_argument('--periodo', type=float, default=0.5, help='PERIODO_CONTROL en segundos')
+    p.add_argument('--bloqueo', type=float, default=60, help='MIN_TIEMPO_APAGADA en segundos')
+    p.add_argument('--semilla', type=int, default=1)
+    a = p.parse_args()
+
+    traza = leer_traza(a.traza) if a.traza else traza_sintetica(a.umbral, a.margen, a.secado, a.episodios)
+    print('%6s %-12s %7s %9s %7s %9s %9s %9s %9s %9s' % ('ruido', '', 'cruces', 'tempranos', 'falsos',
+                                                         'falsos/h', 'perdidos', 'lat p50 s', 'lat p95 s', 'lat máx s'))
+    for sigma in a.ruido:
+        for metodo in METODOS:
+            r = reproducir(traza, metodo, sigma, a)
+            print('%6g %-12s %7d %9d %7d %9.2f %9d %s %s %s'
+                  % (sigma, metodo, r['cruces'], r['tempranos'], r['falsos'], r['falsos'] / r['horas'], r['perdidos'],
+                     segundos(r['latencia_p50']), segundos(r['latencia_p95']), segundos(r['latencia_max'])))
+    print('(%.1f h de traza; umbral %d %%, falso = %g puntos o más por encima)'
+          % (r['horas'], a.umbral, a.margen))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Riego predictivo (MODO_PREDICTIVO) contra la histéresis sola, sobre una traza de secado.
+
+Corre riego.py en el simulador con y sin MODO_PREDICTIVO sobre la misma
+maceta: el secado (%/h) sale de la traza y cada riego llega al sensor
+con demora, como en la tierra real. Sin predicción la bomba arranca por
+debajo de LOW_THRESHOLD - 3 y corta pasando HIGH_THRESHOLD + 3; con
+predicción se adelanta cuando el modelo ve que va a cruzar el umbral y
+el pulso se calcula con la respuesta medida a los riegos anteriores
+(ver prediccion.py). Para cada variante muestra el agua usada, los
+riegos y el tiempo con el suelo fuera de la banda
+LOW_THRESHOLD..HIGH_THRESHOLD (muestreado cada minuto).
+
+Uso:
+    python tools/evaluar_prediccion.py                     # 4 días sintéticos
+    python tools/evaluar_prediccion.py --traza secado.csv  # hora,secado por línea
+
+Cada variante corre en su propio proceso (el simulador deja estado en
+los módulos falsos).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import simulador  # noqa: E402
+
+VARIANTES = (('histéresis', 0), ('predictivo', 1))
+
+
+def traza_sintetica():
+    """
+    Cuatro días con ciclo diario (casi nada de noche, el máximo a las 14):
+    uno templado, uno de calor, uno nublado y otro templado. (hora, %/h)
+    cada hora.
+    """
+    picos = (3.0, 6.0, 1.2, 3.0)
+    traza = []
+    for d, pico in enumerate(picos):
+        for h in range(24):
+            sol = max(0.0, math.cos((h - 14) / 24 * 2 * math.pi))
+            traza.append((d * 24 + h, pico * (0.15 + 0.85 * sol)))
+    return traza
+
+
+def leer_traza(ruta):
+    traza = []
+    with open(ruta) as f:
+        for linea in f:
+            try:
+                traza.append(tuple(float(p) for p in linea.strip().split(',')[:2]))
+            except ValueError:
+                continue  # encabezado o línea vacía
+    return sorted(traza)
+
+
+def interpolar(traza, hora):
+    """Secado en `hora`, lineal entre los puntos de la traza."""
+    if hora <= traza[0][0]:
+        return traza[0][1]
+    for (h0, s0), (h1, s1) in zip(traza, traza[1:]):
+        if hora <= h1:
+            return s0 + (s1 - s0) * ((hora - h0) / (h1 - h0) if h1 > h0 else 0)
+    return traza[-1][1]
+
+
+def correr_variante(a, predictivo):
+    simulador.instalar(a.semilla)
+    import machine
+    from simulador import planta
+
+    traza = leer_traza(a.traza) if a.traza else traza_sintetica()
+    horas = a.horas or traza[-1][0]
+
+    def preparar(m):
+        import bitacora
+        bitacora.nivel = bitacora.AVISO
+        # MODO_PREDICTIVO es un ajuste de /config: iniciar() lo toma de config.valores
+        m.config.valores = dict(m.config.valores, predictive=bool(predictivo))
+
+    import riego
+    preparar(riego)
+    maceta = planta.Maceta(riego.ZONAS[0][1], riego.ZONAS[0][2], a.humedad,
+                           lambda: interpolar(traza, simulador.reloj.segundos() / 3600),
+                           a.riego, a.demora, a.humedad_plena)
+    fuera = {'debajo_min': 0, 'encima_min': 0, 'minima': 100.0}
+
+    async def muestrear():
+        for _ in range(int(horas * 60)):
+            await asyncio.sleep(60)
+            maceta.actualizar()
+            fuera['minima'] = min(fuera['minima'], maceta.humedad)
+            if maceta.humedad < riego.LOW_THRESHOLD:
+                fuera['debajo_min'] += 1
+            elif maceta.humedad > riego.HIGH_THRESHOLD:
+                fuera['encima_min'] += 1
+
+    simulador.ejecutar(duracion=horas * 3600, tareas=[muestrear], preparar=preparar)
+    maceta.actualizar()
+    riegos = sum(1 for _, pin, v in machine.transiciones if pin == riego.ZONAS[0][2] and v)
+    print(json.dumps(dict(fuera, horas=horas, agua_ml=riego.consumo_bomba.ml_total,
+                          bomba_s=maceta.agua_s, riegos=riegos)))
+
+
+def main():
+    p = argparse.ArgumentParser(description='Riego con y sin MODO_PREDICTIVO sobre una traza de secado')
+    p.add_argument('--traza', help='CSV con hora,secado (horas desde el inicio, %%/h)')
+    p.add_argument('--horas', type=float, help='por defecto, lo que dura la traza')
+    p.add_argument('--semilla', type=int, default=1)
+    p.add_argument('--humedad', type=float, default=65, help='humedad inicial del suelo (%%)')
+    p.add_argument('--riego', type=float, default=1.5, help='%% por segundo de bomba')
+    p.add_argument('--demora', type=float, default=300, help='segundos hasta que el agua llega al sensor')
+    p.add_argument('--humedad-plena', type=float, default=70,
+                   help='debajo de esta humedad la maceta transpira menos (0 = nunca)')
+    p.add_argument('--variante', type=int, choices=(0, 1), help=argparse.SUPPRESS)
+    a = p.parse_args()
+
+    if a.variante is not None:
+        correr_variante(a, a.variante)
+        return
+
+    # Las dos variantes a la vez, cada una en su proceso
+    procesos = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--variante', str(predictivo)]
+                                 + sys.argv[1:], stdout=subprocess.PIPE, text=True)
+                for _, predictivo in VARIANTES]
+    print('%-12s %9s %8s %7s %10s %10s %8s' % ('', 'agua ml', 'bomba s', 'riegos',
+                                             '< LOW h', '> HIGH h', 'mín %'))
+    base = None
+    for (nombre, _), proceso in zip(VARIANTES, procesos):
+        salida, _ = proceso.communicate()
+        if proceso.returncode:
+            sys.exit('%s: falló la simulación' % nombre)
+        r = json.loads(salida.strip().splitlines()[-1])
+        print('%-12s %9d %8.0f %7d %10.1f %10.1f %8.1f'
+              % (nombre, r['agua_ml'], r['bomba_s'], r['riegos'], r['debajo_min'] / 60,
+                 r['encima_min'] / 60, r['minima']))
+        if base is None:
+            base = r
+        elif base['agua_ml']:
+            print('Agua: %+.1f %%, fuera de la banda: %+.1f h'
+                  % ((r['agua_ml'] / base['agua_ml'] - 1) * 100,
+                     (r['debajo_min'] + r['encima_min'] - base['debajo_min'] - base['encima_min']) / 60))
+    print('(%.0f h simuladas; banda LOW_THRESHOLD..HIGH_THRESHOLD)' % r['horas'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Prueba de la central (central/) contra una flota simulada en la PC.
+
+Levanta N procesos de tools/simular.py en tiempo real, cada uno en su
+puerto y con otra maceta (humedad inicial y secado distintos), los
+sondea con la central y muestra las consultas. Necesita NumPy.
+
+Uso:
+    python tools/flota.py --equipos 20 --vueltas 15
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from central import consultas  # noqa: E402
+from central.almacen import Almacen  # noqa: E402
+from central.sondeo import Sondeador  # noqa: E402
+
+
+def levantar(n, puerto):
+    procesos = []
+    for i in range(n):
+        procesos.append(subprocess.Popen(
+            [sys.executable, os.path.join(RAIZ, 'tools', 'simular.py'), '--tiempo-real',
+             '--horas', '24', '--puerto', str(puerto + i), '--semilla', str(i + 1),
+             '--humedad', str(40 + (i * 7) % 40), '--secado', str(1 + i % 5)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    return procesos
+
+
+def main():
+    p = argparse.ArgumentParser(description='Central contra una flota simulada')
+    p.add_argument('--equipos', type=int, default=10)
+    p.add_argument('--puerto', type=int, default=9100, help='puerto del primer equipo')
+    p.add_argument('--vueltas', type=int, default=10)
+    p.add_argument('--periodo', type=float, default=1)
+    p.add_argument('--umbral', type=int, default=55)
+    a = p.parse_args()
+
+    procesos = levantar(a.equipos, a.puerto)
+    try:
+        # El simulador tarda unos segundos en "conectarse al Wi-Fi"
+        time.sleep(5)
+        almacen = Almacen(tempfile.mkdtemp(prefix='riego-central-'))
+        sondeador = Sondeador(['127.0.0.1:%d' % (a.puerto + i) for i in range(a.equipos)],
+                              almacen, a.periodo)
+        inicio = time.perf_counter()
+        asyncio.run(sondeador.correr(a.vueltas))
+        total = time.perf_counter() - inicio
+    finally:
+        for proceso in procesos:
+            proceso.terminate()
+        for proceso in procesos:
+            proceso.wait()
+
+    pedidos = sum(e.pedidos for e in sondeador.equipos)
+    conexiones = sum(e.conexiones for e in sondeador.equipos)
+    fallas = sum(e.fallas for e in sondeador.equipos)
+    print('%d pedidos, %d conexiones, %d fallas en %.1f s; %d muestras en %s'
+          % (pedidos, conexiones, fallas, total, almacen.cantidad, almacen.directorio))
+    print('Zonas debajo de %d %%:' % a.umbral)
+    for f in consultas.zonas_secas(almacen, a.umbral):
+        print('  %(device)s zona %(zone)d: %(soil)s %%' % f)
+    print('Resumen por equipo:')
+    for f in consultas.resumen(almacen, paso=3600):
+        print('  %(device)s: %(samples)d muestras, suelo %(soil_min).0f/%(soil_mean).1f/%(soil_max).0f, '
+              'bomba %(pump_fraction).1f%%' % dict(f, pump_fraction=f['pump_fraction'] * 100))
+
+
+if __name__ == '__main__':
+    main()
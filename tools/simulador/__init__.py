@@ -0,0 +1,292 @@
+"""
+Simulador para correr riego.py en la PC (no se sube al ESP32).
+
+En falsos/ hay reemplazos de machine, dht, network y uasyncio: un ADC al
+que se le programa la lectura, un DHT11 al que se le pueden inyectar
+fallas, relés que anotan cada cambio y un reloj virtual detrás de
+time.ticks_ms/ticks_diff (con la vuelta a cero cada 2**30 ms, igual
+que en MicroPython).
+
+Con acelerado=True el reloj salta directo al próximo evento en vez de
+esperar, así una hora de riego se simula en segundos y siempre da lo
+mismo para la misma semilla.
+
+machine.deepsleep() también se simula: el reloj avanza lo que dura el
+sueño (las tareas extra, como un colector, siguen andando), los ticks
+vuelven a 0 y riego.py se importa de nuevo con la RAM en blanco; solo la
+memoria del RTC, la flash (la carpeta de trabajo) y los falsos siguen.
+
+Uso típico (ver tools/simular.py y tools/bench.py):
+
+    import simulador
+    simulador.instalar(semilla=1)
+    simulador.ejecutar(duracion=3600)
+"""
+import asyncio
+import importlib
+import os
+import selectors
+import shutil
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FALSOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'falsos')
+
+PERIODO_TICKS = 1 << 30   # time.ticks_ms() de MicroPython da la vuelta acá
+EPOCA_DEFECTO = 1704067200  # 2024-01-01 00:00:00 UTC
+ARRANQUE_S = 0.3            # del despertar de un deepsleep hasta que corre main.py
+
+# Estado de la simulación (lo leen los módulos de falsos/)
+reloj = None
+semilla = 1
+puerto = 8080        # riego.py escucha en el 80; acá se remapea
+servidores = []
+despertares = 0      # veces que riego.py volvió de un deepsleep
+
+
+class Reloj:
+    """
+    Tiempo virtual en segundos desde que arrancó la simulación.
+
+    acelerado=False lo ata al reloj real (para abrir el dashboard en el
+    navegador); ticks_inicio permite arrancar cerca de la vuelta a cero.
+    """
+
+    def __init__(self, acelerado=True, ticks_inicio=0, epoca=EPOCA_DEFECTO):
+        self.acelerado = acelerado
+        self.t = 0.0
+        self.ticks_inicio = ticks_inicio
+        self.epoca = epoca
+        self._real = time.monotonic()
+
+    def segundos(self):
+        if not self.acelerado:
+            return time.monotonic() - self._real
+        return self.t
+
+    def avanzar(self, s):
+        if s > 0:
+            if self.acelerado:
+                self.t += s
+            else:
+                _dormir_real(s)
+
+    def ticks_ms(self):
+        return (self.ticks_inicio + int(self.segundos() * 1000)) % PERIODO_TICKS
+
+    def ticks_us(self):
+        return (self.ticks_inicio * 1000 + int(self.segundos() * 1000000)) % PERIODO_TICKS
+
+    def time(self):
+        # Como en MicroPython: segundos enteros
+        return self.epoca + int(self.segundos())
+
+    def fijar_hora(self, t):
+        """Lo usa RTC().datetime(): cambia la hora sin tocar los ticks."""
+        self.epoca = int(t) - int(self.segundos())
+
+
+class ReinicioProfundo(BaseException):
+    """Lo tira machine.deepsleep(): como SystemExit, no lo ataja un except Exception."""
+
+    def __init__(self, ms):
+        super().__init__(ms)
+        self.ms = ms
+
+
+def ticks_diff(a, b):
+    return ((a - b + PERIODO_TICKS // 2) % PERIODO_TICKS) - PERIODO_TICKS // 2
+
+
+def ticks_add(a, b):
+    return (a + b) % PERIODO_TICKS
+
+
+_dormir_real = time.sleep
+
+
+class _SelectorVirtual:
+    """
+    Envuelve el selector del event loop: primero mira si hay sockets
+    listos sin esperar y, si no hay, adelanta el reloj virtual lo que
+    el loop pensaba dormir.
+    """
+
+    def __init__(self, selector, reloj):
+        self._selector = selector
+        self._reloj = reloj
+
+    def select(self, timeout=None):
+        eventos = self._selector.select(0)
+        if eventos or timeout == 0:
+            return eventos
+        if timeout is None:
+            # Sin timers pendientes solo puede despertarlo la red
+            return self._selector.select(None)
+        self._reloj.avanzar(timeout)
+        return []
+
+    def __getattr__(self, nombre):
+        return getattr(self._selector, nombre)
+
+
+class BucleVirtual(asyncio.SelectorEventLoop):
+    def __init__(self, reloj):
+        if reloj.acelerado:
+            super().__init__(_SelectorVirtual(selectors.DefaultSelector(), reloj))
+        else:
+            super().__init__()
+        self._reloj = reloj
+
+    def time(self):
+        return self._reloj.segundos()
+
+
+def instalar(semilla=1, acelerado=True, ticks_inicio=0, puerto=8080):
+    """
+    Pone falsos/ primero en sys.path y cuelga el reloj virtual del
+    módulo time (ticks_ms, ticks_us, ticks_diff, ticks_add, sleep_ms,
+    sleep, time). Hay que llamarlo antes de importar riego.
+    """
+    global reloj
+    reloj = Reloj(acelerado, ticks_inicio)
+    globals().update(semilla=semilla, puerto=puerto)
+    for ruta in (RAIZ, FALSOS):
+        if ruta in sys.path:
+            sys.path.remove(ruta)
+        sys.path.insert(0, ruta)
+
+    time.ticks_ms = reloj.ticks_ms
+    time.ticks_us = reloj.ticks_us
+    time.ticks_diff = ticks_diff
+    time.ticks_add = ticks_add
+    time.time = reloj.time
+    time.sleep = reloj.avanzar
+    time.sleep_ms = lambda ms: reloj.avanzar(ms / 1000)
+    time.sleep_us = lambda us: reloj.avanzar(us / 1000000)
+    return reloj
+
+
+def directorio_trabajo():
+    """
+    Carpeta temporal con una copia de www/, para que log/ y la
+    calibración de la simulación no ensucien el repositorio.
+    """
+    destino = tempfile.mkdtemp(prefix='riego-sim-')
+    shutil.copytree(os.path.join(RAIZ, 'www'), os.path.join(destino, 'www'))
+    return destino
+
+
+# Lo que ejecutar() le pasa a uasyncio.run() (ver falsos/uasyncio.py)
+_duracion = None
+_tareas = ()
+_modulo = 'riego'
+_preparar = None
+
+
+def ejecutar(modulo='riego', duracion=None, tareas=(), directorio=None, preparar=None):
+    """
+    Corre `modulo`.app (la Aplicacion de riego.py) dentro del loop
+    virtual. Termina a los `duracion` segundos virtuales o cuando
+    terminan todas las `tareas` (funciones async sin argumentos que
+    corren a la par). Se puede importar riego antes para ajustar app.
+    preparar(m) se llama con riego recién importado, también después de
+    cada deepsleep (para volver a poner lo que se cambió a mano).
+    """
+    global _duracion, _tareas, _modulo, _preparar
+    if reloj is None:
+        instalar()
+    _duracion = duracion
+    _tareas = tareas
+    _modulo = modulo
+    _preparar = preparar
+    m = importlib.import_module(modulo)
+    if preparar is not None:
+        preparar(m)
+    anterior = os.getcwd()
+    os.chdir(directorio or directorio_trabajo())
+    try:
+        m.app.run()
+    finally:
+        os.chdir(anterior)
+    return m
+
+
+def _reiniciar_modulos():
+    """Saca de sys.modules los módulos de la placa (los de la raíz del repositorio)."""
+    for nombre, modulo in list(sys.modules.items()):
+        archivo = getattr(modulo, '__file__', None)
+        if archivo and os.path.dirname(os.path.abspath(archivo)) == RAIZ:
+            del sys.modules[nombre]
+    importlib.invalidate_caches()
+
+
+async def _supervisar(coro):
+    """Corre riego y, después de cada deepsleep, lo vuelve a arrancar de cero."""
+    global despertares
+    propias = asyncio.all_tasks()  # esta y las tareas extra
+    while True:
+        try:
+            return await coro
+        except ReinicioProfundo as e:
+            ms = e.ms
+        # Todo lo que había creado riego muere con el reinicio
+        otras = [t for t in asyncio.all_tasks() if t not in propias]
+        for t in otras:
+            t.cancel()
+        await asyncio.gather(*otras, return_exceptions=True)
+        for s in servidores:
+            s.close()
+        del servidores[:]
+        import network
+        network._interfaces.clear()
+        await asyncio.sleep(ms / 1000)
+        # Al despertar ticks_ms vuelve a 0 y el arranque de MicroPython ya cuenta
+        reloj.ticks_inicio = -int(reloj.segundos() * 1000) % PERIODO_TICKS
+        await asyncio.sleep(ARRANQUE_S)
+        despertares += 1
+        _reiniciar_modulos()
+        m = importlib.import_module(_modulo)
+        if _preparar is not None:
+            _preparar(m)
+        coro = m.app.principal()
+
+
+def correr(coro):
+    """Reemplazo de asyncio.run() con el loop virtual."""
+    bucle = BucleVirtual(reloj)
+    asyncio.set_event_loop(bucle)
+    principal = bucle.create_task(_supervisar(coro))
+    extras = [bucle.create_task(f()) for f in _tareas]
+
+    async def esperar():
+        # Sin tareas extra se corre hasta la duración (o para siempre)
+        pendientes = set(extras) or {principal}
+        limite = None if _duracion is None else bucle.time() + _duracion
+        while pendientes:
+            espera = None if limite is None else limite - bucle.time()
+            if espera is not None and espera <= 0:
+                break
+            listas, _ = await asyncio.wait(pendientes | {principal}, timeout=espera,
+                                           return_when=asyncio.FIRST_COMPLETED)
+            if principal in listas:
+                break  # riego terminó o se cayó
+            pendientes -= listas
+
+    try:
+        bucle.run_until_complete(esperar())
+        for t in extras + [principal]:
+            if t.done() and not t.cancelled() and t.exception():
+                raise t.exception()
+    finally:
+        pendientes = [t for t in asyncio.all_tasks(bucle) if not t.done()]
+        for t in pendientes:
+            t.cancel()
+        bucle.run_until_complete(asyncio.gather(*pendientes, return_exceptions=True))
+        for s in servidores:
+            s.close()
+        del servidores[:]
+        bucle.close()
+        asyncio.set_event_loop(None)
@@ -0,0 +1,54 @@
+"""
+dht falso para el simulador.
+
+temperatura y humedad pueden ser números o funciones sin argumentos.
+Para inyectar fallas: prob_falla (0 a 1) o fallas_pendientes (las
+próximas N lecturas fallan con OSError, como un DHT11 que no contesta).
+"""
+import random
+
+import simulador
+
+temperatura = 24
+humedad = 50
+prob_falla = 0.0
+fallas_pendientes = 0
+lecturas = 0
+fallas = 0
+
+_azar = random.Random(simulador.semilla + 1)
+
+
+def _valor(v):
+    return v() if callable(v) else v
+
+
+class DHT11:
+    def __init__(self, pin):
+        self.pin = pin
+        self._t = None
+        self._h = None
+
+    def measure(self):
+        global lecturas, fallas, fallas_pendientes
+        lecturas += 1
+        if fallas_pendientes > 0 or (prob_falla and _azar.random() < prob_falla):
+            fallas_pendientes = max(0, fallas_pendientes - 1)
+            fallas += 1
+            raise OSError(116)  # ETIMEDOUT
+        self._t = _valor(temperatura)
+        self._h = _valor(humedad)
+
+    def temperature(self):
+        return int(self._t)
+
+    def humidity(self):
+        return int(self._h)
+
+
+class DHT22(DHT11):
+    def temperature(self):
+        return float(self._t)
+
+    def humidity(self):
+        return float(self._h)
@@ -0,0 +1,126 @@
+"""
+machine falso para el simulador.
+
+- entradas[pin]: lo que lee ADC(Pin(pin)), un entero de 12 bits o una
+  función sin argumentos que lo devuelve (ver simulador/planta.py).
+- ruido_adc: desvío en cuentas que se suma a cada lectura.
+- transiciones: (ticks_ms, pin, valor) cada vez que una salida cambia.
+- al_cambiar[pin]: funciones a llamar antes de que cambie esa salida.
+"""
+import random
+import time
+
+import simulador
+
+entradas = {}
+ruido_adc = 5
+transiciones = []
+al_cambiar = {}
+pines = {}
+
+_azar = random.Random(simulador.semilla)
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 2
+    PULL_DOWN = 3
+
+    def __init__(self, numero, modo=IN, pull=None, value=None):
+        self.numero = numero
+        self.modo = modo
+        self.v = 0 if value is None else value
+        pines[numero] = self
+
+    def value(self, v=None):
+        if v is None:
+            return self.v
+        v = 1 if v else 0
+        if v != self.v:
+            for f in al_cambiar.get(self.numero, ()):
+                f(v)
+            transiciones.append((time.ticks_ms(), self.numero, v))
+            self.v = v
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    __call__ = value
+
+
+class ADC:
+    ATTN_0DB = 0
+    ATTN_2_5DB = 1
+    ATTN_6DB = 2
+    ATTN_11DB = 3
+    WIDTH_9BIT = 0
+    WIDTH_10BIT = 1
+    WIDTH_11BIT = 2
+    WIDTH_12BIT = 3
+
+    def __init__(self, pin):
+        self.pin = pin.numero
+        self.bits = 12
+
+    def atten(self, a):
+        pass
+
+    def width(self, w):
+        self.bits = 9 + w
+
+    def read(self):
+        v = entradas.get(self.pin, 0)
+        if callable(v):
+            v = v()
+        if ruido_adc:
+            v += int(_azar.gauss(0, ruido_adc))
+        v = min(max(int(v), 0), 4095)
+        return v >> (12 - self.bits)
+
+    def read_u16(self):
+        return self.read() << (16 - self.bits)
+
+
+class RTC:
+    _memoria = b''
+
+    def datetime(self, dt=None):
+        if dt is None:
+            a = time.localtime(time.time())
+            return (a[0], a[1], a[2], a[6], a[3], a[4], a[5], 0)
+        simulador.reloj.fijar_hora(time.mktime((dt[0], dt[1], dt[2], dt[4], dt[5], dt[6], 0, 0, -1)))
+
+    def memory(self, datos=None):
+        if datos is None:
+            return RTC._memoria
+        RTC._memoria = bytes(datos)
+
+
+def freq(*args):
+    return 240000000
+
+
+def reset():
+    raise SystemExit('machine.reset()')
+
+
+def idle():
+    pass
+
+
+def lightsleep(ms=0):
+    time.sleep_ms(ms)
+
+
+def deepsleep(ms=0):
+    # La placa se reinicia al despertar: lo atiende simulador.correr()
+    raise simulador.ReinicioProfundo(ms)
+
+
+def unique_id():
+    # Uno distinto por puerto: en tools/flota.py cada proceso es otro equipo
+    return b'\x24\x0a\xc4\x00' + bytes((simulador.puerto >> 8 & 255, simulador.puerto & 255))
@@ -0,0 +1,77 @@
+"""
+network falso para el simulador.
+
+disponible=False simula que el router no está; demora_conexion son los
+segundos (virtuales) que tarda en asociarse después de connect().
+"""
+import time
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 1010
+
+disponible = True
+demora_conexion = 3
+ip = '192.168.0.50'
+ip_ap = '192.168.4.1'
+
+_interfaces = {}
+
+
+class WLAN:
+    def __new__(cls, interfaz=STA_IF):
+        # Como en la placa, cada interfaz es una sola
+        if interfaz not in _interfaces:
+            w = object.__new__(cls)
+            w.interfaz = interfaz
+            w._activa = False
+            w._desde = None
+            w._config = {'essid': 'ESP32', 'password': ''}
+            _interfaces[interfaz] = w
+        return _interfaces[interfaz]
+
+    def active(self, v=None):
+        if v is None:
+            return self._activa
+        self._activa = bool(v)
+        if not v:
+            self._desde = None
+
+    def connect(self, ssid=None, password=None):
+        self._config['ssid'] = ssid
+        self._desde = time.time()
+
+    def disconnect(self):
+        self._desde = None
+
+    def isconnected(self):
+        if self.interfaz == AP_IF:
+            return self._activa
+        return (self._activa and disponible and self._desde is not None
+                and time.time() - self._desde >= demora_conexion)
+
+    def status(self, *args):
+        if self.isconnected():
+            return STAT_GOT_IP
+        if self._desde is None:
+            return STAT_IDLE
+        return STAT_CONNECTING if disponible else STAT_NO_AP_FOUND
+
+    def ifconfig(self, *args):
+        if self.interfaz == AP_IF:
+            return (ip_ap, '255.255.255.0', ip_ap, ip_ap)
+        if not self.isconnected():
+            return ('0.0.0.0', '0.0.0.0', '0.0.0.0', '0.0.0.0')
+        return (ip, '255.255.255.0', '192.168.0.1', '192.168.0.1')
+
+    def config(self, *args, **kwargs):
+        if kwargs:
+            self._config.update(kwargs)
+            return None
+        return self._config.get(args[0]) if args else None
@@ -0,0 +1,24 @@
+"""
+uasyncio falso: el asyncio de CPython más lo que usa riego.py de
+MicroPython, corriendo sobre el loop virtual del simulador.
+"""
+from asyncio import *  # noqa: F401,F403
+import asyncio as _asyncio
+
+import simulador
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+async def start_server(cb, host, port, backlog=5):
+    # El 80 necesita root en la PC
+    servidor = await _asyncio.start_server(cb, host, simulador.puerto if port == 80 else port,
+                                           backlog=backlog)
+    simulador.servidores.append(servidor)
+    return servidor
+
+
+def run(coro):
+    return simulador.correr(coro)
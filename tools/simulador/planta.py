@@ -0,0 +1,60 @@
+"""
+Modelo muy simple de una maceta para el simulador.
+
+La humedad baja a ritmo `secado` (%/h, fijo o según el clima) y cada
+segundo de bomba agrega agua que llega al sensor de a poco (con
+constante de tiempo demora_s), como pasa en la tierra real. La lectura del ADC sale
+de invertir la calibración de fábrica (4095 seco, 1720 húmedo).
+
+Con humedad_plena, por debajo de esa humedad la planta transpira menos
+(el coeficiente de estrés de FAO-56): el secado se multiplica por
+humedad / humedad_plena. Así regar de más gasta agua de verdad.
+"""
+import math
+
+import machine
+import simulador
+
+SECO = 4095
+HUMEDO = 1720
+
+
+class Maceta:
+    def __init__(self, pin_adc, pin_rele, humedad=60.0, secado=2.0,
+                 riego=1.5, demora_s=120.0, humedad_plena=None):
+        self.humedad = humedad      # % que ve el sensor
+        self.pendiente = 0.0        # % que todavía no llegó al sensor
+        self.secado = secado        # %/h, o una función sin argumentos que lo da
+        self.riego = riego          # % por segundo de bomba
+        self.demora_s = demora_s
+        self.humedad_plena = humedad_plena
+        self.bomba = False
+        self.agua_s = 0.0           # segundos de bomba en total
+        # El reloj del simulador, no ticks_ms: esos vuelven a 0 con cada deepsleep
+        self._t = simulador.reloj.segundos()
+        machine.entradas[pin_adc] = self.lectura
+        machine.al_cambiar.setdefault(pin_rele, []).append(self._rele)
+
+    def actualizar(self):
+        ahora = simulador.reloj.segundos()
+        dt = ahora - self._t
+        self._t = ahora
+        if dt <= 0:
+            return
+        if self.bomba:
+            self.pendiente += self.riego * dt
+            self.agua_s += dt
+        llega = self.pendiente * (1 - math.exp(-dt / self.demora_s))
+        self.pendiente -= llega
+        secado = self.secado() if callable(self.secado) else self.secado
+        if self.humedad_plena:
+            secado *= min(1.0, self.humedad / self.humedad_plena)
+        self.humedad = min(100.0, max(0.0, self.humedad + llega - secado * dt / 3600))
+
+    def _rele(self, valor):
+        self.actualizar()
+        self.bomba = bool(valor)
+
+    def lectura(self):
+        self.actualizar()
+        return SECO - self.humedad * (SECO - HUMEDO) / 100
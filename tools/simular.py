@@ -0,0 +1,127 @@
+"""
+Corre riego.py en la PC con el simulador (no se sube al ESP32).
+
+Uso:
+    python tools/simular.py --horas 24 --secado 3
+    python tools/simular.py --tiempo-real --puerto 8080   # y abrir el dashboard
+    python tools/simular.py --colector --sin-wifi 2 5     # envío por lotes con un corte
+    python tools/simular.py --bajo-consumo profundo --horas 48 --colector
+
+Al terminar muestra cada encendido/apagado de la bomba y un resumen.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import simulador  # noqa: E402
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('--horas', type=float, default=6, help='tiempo a simular')
+    p.add_argument('--semilla', type=int, default=1)
+    p.add_argument('--puerto', type=int, default=8080, help='puerto del servidor (en vez del 80)')
+    p.add_argument('--tiempo-real', action='store_true', help='no acelerar el reloj')
+    p.add_argument('--vuelta-ticks', action='store_true',
+                   help='arrancar un minuto antes de que ticks_ms dé la vuelta')
+    p.add_argument('--humedad', type=float, default=60, help='humedad inicial (%%)')
+    p.add_argument('--secado', type=float, default=2, help='secado de la maceta (%%/h)')
+    p.add_argument('--riego', type=float, default=1.5, help='%% por segundo de bomba')
+    p.add_argument('--demora', type=float, default=120, help='segundos hasta que el agua llega al sensor')
+    p.add_argument('--fallas-dht', type=float, default=0, help='probabilidad de falla del DHT11')
+    p.add_argument('--colector', action='store_true',
+                   help='mandar los lotes a un colector (central/colector.py) en el puerto siguiente')
+    p.add_argument('--sin-wifi', type=float, nargs=2, metavar=('DESDE', 'HASTA'),
+                   help='cortar el Wi-Fi entre esas horas de la simulación')
+    p.add_argument('--bajo-consumo', choices=('liviano', 'profundo'),
+                   help='dormir entre ciclos con lightsleep o deepsleep (ver bajo_consumo.py)')
+    p.add_argument('--ciclo', type=float, default=60, help='segundos entre despertares en bajo consumo')
+    p.add_argument('--ciclos-wifi', type=int, default=15, help='prender el Wi-Fi uno de cada tantos ciclos')
+    p.add_argument('--verboso', action='store_true', help='mostrar los mensajes de riego.py')
+    a = p.parse_args()
+
+    reloj = simulador.instalar(a.semilla, not a.tiempo_real,
+                               simulador.PERIODO_TICKS - 60000 if a.vuelta_ticks else 0, a.puerto)
+    import dht
+    import machine
+    from simulador import planta
+    dht.prob_falla = a.fallas_dht
+    colector_url = 'http://127.0.0.1:%d/ingest' % (a.puerto + 1) if a.colector else None
+
+    def preparar(m):
+        # Con deepsleep riego.py se importa de nuevo en cada despertar
+        import bitacora
+        bitacora.nivel = bitacora.INFO if a.verboso else bitacora.AVISO
+        m.COLECTOR = colector_url
+        m.MODO_BAJO_CONSUMO = a.bajo_consumo
+        m.PERIODO_BAJO_CONSUMO = int(a.ciclo * 1000)
+        m.CICLOS_WIFI = a.ciclos_wifi
+
+    import riego
+    # Importar riego no toca el hardware: las macetas quedan listas antes
+    # de que app.start() lea el ADC por primera vez
+    macetas = [planta.Maceta(adc, rele, a.humedad, a.secado, a.riego, a.demora)
+               for _, adc, rele in riego.ZONAS]
+
+    tareas = []
+    colector = None
+    if a.colector:
+        import tempfile
+        from central.almacen import Almacen
+        from central.colector import Colector
+        colector = Colector(Almacen(tempfile.mkdtemp(prefix='riego-colector-')))
+
+        async def servir_colector():
+            servidor = await colector.servir('127.0.0.1', a.puerto + 1)
+            try:
+                await asyncio.sleep(a.horas * 3600)
+            finally:
+                servidor.close()
+        tareas.append(servir_colector)
+    if a.sin_wifi:
+        import network
+
+        async def cortar_wifi():
+            await asyncio.sleep(a.sin_wifi[0] * 3600)
+            network.disponible = False
+            await asyncio.sleep((a.sin_wifi[1] - a.sin_wifi[0]) * 3600)
+            network.disponible = True
+            await asyncio.sleep((a.horas - a.sin_wifi[1]) * 3600)
+        tareas.append(cortar_wifi)
+
+    inicio = time.perf_counter()
+    simulador.ejecutar(duracion=a.horas * 3600, tareas=tareas, preparar=preparar)
+    real = time.perf_counter() - inicio
+    riego = sys.modules['riego']  # después de un deepsleep es otro módulo
+
+    print('Relés (ticks_ms, pin, valor):')
+    for t, pin, v in machine.transiciones:
+        print('  %10d  %3d  %s' % (t, pin, 'ON' if v else 'off'))
+    for i, m in enumerate(macetas):
+        m.actualizar()
+        print('Zona %d: humedad final %.1f %%, bomba %.0f s' % (i + 1, m.humedad, m.agua_s))
+    print('DHT11: %d lecturas, %d fallas' % (dht.lecturas, dht.fallas))
+    if colector is not None:
+        c = riego.cola_envio
+        print('Envío: %d lotes confirmados, %d pendientes, %d descartados, %d fallas'
+              % (c.enviadas, c.pendientes(), c.descartadas, c.fallas))
+        print('Colector: %d lotes, %d repetidos, %d muestras, %d reinicios de secuencia'
+              % (colector.tramas, colector.repetidas, colector.muestras, colector.reinicios))
+    if a.bajo_consumo:
+        e = riego.estado_rtc
+        corriente = riego.corriente_promedio_ma()
+        print('Bajo consumo (%s): %d ciclos, %d despertares de deepsleep'
+              % (a.bajo_consumo, e.ciclo, simulador.despertares))
+        print('  despierto %.0f s, con Wi-Fi %.0f s, dormido %.0f s'
+              % (e.despierto_ms / 1000, e.wifi_ms / 1000, e.dormido_ms / 1000))
+        print('  ciclo de trabajo %.3f %%, corriente promedio %.3f mA, ~%.0f días con %d mAh'
+              % (e.ciclo_trabajo() * 100, corriente, riego.BATERIA_MAH / corriente / 24, riego.BATERIA_MAH))
+    print('%.1f h simuladas en %.1f s (%.0fx)' % (reloj.segundos() / 3600, real,
+                                                 reloj.segundos() / max(real, 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Conexión Wi-Fi en segundo plano.
+
+El riego no necesita la red, así que no se la espera para arrancar:
+tarea() conecta mientras el control ya está andando, reintenta con
+espera exponencial (ESPERA_MINIMA, el doble cada vez, hasta
+ESPERA_MAXIMA) y vuelve a conectar sola si se corta. Cada vez que cambia
+la IP se llama a al_cambiar_ip(ip) (riego.py reabre el servidor ahí).
+Un error inesperado en una vuelta (p. ej. el servidor que no se pudo
+abrir) se anota y se reintenta con la misma espera exponencial: la
+tarea no muere.
+
+Si se pasa ap_ssid y no hay red durante espera_ap segundos, levanta un
+punto de acceso propio para poder ver el dashboard igual (en
+192.168.4.1); se apaga cuando vuelve la red del router.
+
+En el modo de bajo consumo no corre tarea(): riego.py prende la radio con
+conectar_una_vez() solo en algunos ciclos y la corta con apagar().
+"""
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import network
+import time
+import bitacora
+
+ESPERA_MINIMA = 1000      # ms antes del primer reintento
+ESPERA_MAXIMA = 60000     # tope de la espera entre intentos
+TIMEOUT_CONEXION = 15000  # ms que se le da a cada connect()
+PERIODO_REVISION = 2000   # cada cuánto se mira si sigue conectada
+
+
+class ConexionWiFi:
+    def __init__(self, ssid, password, ap_ssid=None, ap_password='', espera_ap=60):
+        self.ssid = ssid
+        self.password = password
+        self.ap_ssid = ap_ssid
+        self.ap_password = ap_password
+        self.espera_ap = espera_ap * 1000
+        self.al_cambiar_ip = None   # función (o async) que recibe la IP nueva
+        self.ip = None
+        self.intentos = 0           # connect() desde el arranque
+        self.caidas = 0             # veces que se perdió la conexión
+        self.errores = 0            # vueltas de tarea() que terminaron en excepción
+        self.modo_ap = False
+        self._sta = None            # las interfaces se crean en tarea()
+        self._ap = None
+
+    def conectada(self):
+        return self._sta is not None and self._sta.isconnected()
+
+    async def _nueva_ip(self, ip):
+        if ip == self.ip:
+            return
+        self.ip = ip
+        if self.al_cambiar_ip is not None:
+            try:
+                r = self.al_cambiar_ip(ip)
+                if r is not None:
+                    await r
+            except Exception:
+                self.ip = None  # que la próxima vuelta avise de nuevo
+                raise
+
+    async def _activar_ap(self):
+        bitacora.aviso("📡 Sin Wi-Fi: levantando el punto de acceso", self.ap_ssid)
+        self._ap = network.WLAN(network.AP_IF)
+        self._ap.active(True)
+        if self.ap_password:
+            self._ap.config(essid=self.ap_ssid, password=self.ap_password, authmode=3)  # WPA2
+        else:
+            self._ap.config(essid=self.ap_ssid)
+        self.modo_ap = True
+        await self._nueva_ip(self._ap.ifconfig()[0])
+
+    def _desactivar_ap(self):
+        self._ap.active(False)
+        self.modo_ap = False
+        bitacora.info("📡 Punto de acceso apagado")
+
+    async def _conectar(self):
+        """Un intento: connect() y esperar sin bloquear hasta TIMEOUT_CONEXION."""
+        self.intentos += 1
+        try:
+            self._sta.connect(self.ssid, self.password)
+        except OSError as e:
+            # El ESP32 tira error si ya estaba intentando; se espera igual
+            bitacora.debug("Wi-Fi connect:", e)
+        inicio = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), inicio) < TIMEOUT_CONEXION:
+            if self._sta.isconnected():
+                return True
+            await asyncio.sleep_ms(250)
+        return False
+
+    async def conectar_una_vez(self):
+        """Prende la radio y hace un solo intento. Devuelve True si conectó."""
+        if self._sta is None:
+            self._sta = network.WLAN(network.STA_IF)
+        self._sta.active(True)
+        if not self._sta.isconnected() and not await self._conectar():
+            return False
+        await self._nueva_ip(self._sta.ifconfig()[0])
+        return True
+
+    def apagar(self):
+        """Corta la radio (la radio prendida es lo que más gasta)."""
+        if self._sta is not None:
+            self._sta.active(False)
+        self.ip = None
+
+    async def tarea(self):
+        self._sta = network.WLAN(network.STA_IF)
+        self._sta.active(True)
+        espera = ESPERA_MINIMA
+        sin_red = time.ticks_ms()  # desde cuándo no hay conexión (None = conectada)
+        while True:
+            try:
+                if self._sta.isconnected():
+                    if sin_red is not None:
+                        sin_red = None
+                        bitacora.info("📶 Wi-Fi conectado:", self._sta.ifconfig())
+                        if self.modo_ap:
+                            self._desactivar_ap()
+                    await self._nueva_ip(self._sta.ifconfig()[0])
+                    espera = ESPERA_MINIMA
+                    await asyncio.sleep_ms(PERIODO_REVISION)
+                    continue
+
+                if sin_red is None:
+                    sin_red = time.ticks_ms()
+                    self.caidas += 1
+                    bitacora.aviso("⚠️ Se perdió el Wi-Fi, reconectando...")
+                    if not self.modo_ap:
+                        await self._nueva_ip(None)
+                if (self.ap_ssid and not self.modo_ap
+                        and time.ticks_diff(time.ticks_ms(), sin_red) >= self.espera_ap):
+                    await self._activar_ap()
+
+                if await self._conectar():
+                    continue
+                bitacora.debug("Wi-Fi: sin conexión, próximo intento en", espera, "ms")
+                await asyncio.sleep_ms(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA)
+            except Exception as e:
+                self.errores += 1
+                bitacora.error("❌ Error en la tarea de Wi-Fi, reintento en", espera, "ms:", e)
+                await asyncio.sleep_ms(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA)
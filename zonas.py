@@ -0,0 +1,39 @@
+"""
+Zonas de riego: cada una tiene su sensor de suelo, su calibración y su relé.
+
+El estado de cada zona vive en un objeto con __slots__ (sin __dict__),
+así agregar zonas cuesta pocos bytes y recorrerlas en cada tick es O(zonas).
+"""
+
+
+class Zona:
+    __slots__ = ('numero', 'nombre', 'sensor', 'cal', 'rele',
+                 'humedad', 'encendida', 'tiempo', 'muestras_secas', 'ultimo_riego',
+                 'ciclos', 'tiempo_total', 'apagada', 'modelo', 'pulso')
+
+    def __init__(self, numero, nombre, sensor, cal, rele, modelo=None):
+        self.numero = numero
+        self.nombre = nombre
+        self.sensor = sensor          # suelo.SensorSuelo
+        self.cal = cal                # calibracion.Calibracion
+        self.rele = rele              # Pin de salida
+        self.humedad = 0              # último % filtrado
+        self.encendida = False
+        self.tiempo = 0               # ticks_ms del encendido
+        self.muestras_secas = 0
+        self.ultimo_riego = 0         # time.time() del último encendido
+        self.ciclos = 0               # encendidos desde el arranque
+        self.tiempo_total = 0         # ms encendida desde el arranque
+        self.apagada = None           # ticks_ms del último apagado (None = nunca)
+        self.modelo = modelo          # prediccion.Modelo (opcional)
+        self.pulso = 0                # ms de riego calculados por el modelo (0 = por sensor)
+        rele.value(0)  # apagado al iniciar
+
+    def leer(self):
+        """Ráfaga filtrada del sensor pasada a % con la tabla de calibración."""
+        self.humedad = self.cal.porcentaje(self.sensor.leer())
+        return self.humedad
+
+    def ruido(self):
+        """Ruido del sensor en puntos de humedad (%)."""
+        return self.sensor.ruido / self.cal.cuentas_por_punto()